@@ -91,13 +91,30 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'catalog-cache',
+        # Per-item stock/product entries are retained for the stale fallback;
+        # keep room for them so they never evict the catalog itself.
+        'OPTIONS': {'MAX_ENTRIES': 5000},
     }
 }
+# "shared": one SQLite-file cache for all workers on the host, with an
+# in-process L1 in front (web.shared_cache) — the catalog is fetched and
+# stored once per host instead of once per worker.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "locmem")
+if CACHE_BACKEND == "shared":
+    CACHES['default'] = {
+        'BACKEND': 'web.shared_cache.SharedCache',
+        'LOCATION': os.getenv("CACHE_LOCATION", ""),  # default: <tmp>/hdstore-cache.sqlite3
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv("CACHE_MAX_ENTRIES", "20000")),
+            'L1_MAX_ENTRIES': int(os.getenv("CACHE_L1_MAX_ENTRIES", "2000")),
+        },
+    }
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # WhiteNoise for static files in production
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'web.middleware.CatalogMemoMiddleware',  # one catalog cache read per key per request
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -120,6 +137,7 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 'web.context_processors.cart_context',
                 'web.context_processors.translations_context',
+                'web.context_processors.catalog_status_context',
             ],
         },
     },
@@ -207,6 +225,41 @@ ERPNEXT_DEFAULT_CUSTOMER_GROUP = os.getenv("ERPNEXT_DEFAULT_CUSTOMER_GROUP", "Al
 ERPNEXT_DEFAULT_TERRITORY = os.getenv("ERPNEXT_DEFAULT_TERRITORY", "All Territories")
 ERPNEXT_DEFAULT_WAREHOUSE = os.getenv("ERPNEXT_DEFAULT_WAREHOUSE")
 ERPNEXT_WEBHOOK_SECRET = os.getenv("ERPNEXT_WEBHOOK_SECRET", "")  # Optional: verify webhook requests
+# Keep-alive pool shared by all threads of a worker; never smaller than
+# ERPNEXT_MAX_IN_FLIGHT (see integration.erp_client.pool_maxsize)
+ERPNEXT_POOL_MAXSIZE = int(os.getenv("ERPNEXT_POOL_MAXSIZE", "8"))
+ERPNEXT_POOL_BLOCK = os.getenv("ERPNEXT_POOL_BLOCK", "1") == "1"
+# Traffic governor: cap concurrent ERPNext requests per worker process (and
+# the share background threads may use), optionally rate-limit request starts.
+ERPNEXT_MAX_IN_FLIGHT = int(os.getenv("ERPNEXT_MAX_IN_FLIGHT", "8"))
+ERPNEXT_BACKGROUND_MAX_IN_FLIGHT = int(os.getenv("ERPNEXT_BACKGROUND_MAX_IN_FLIGHT", "2"))
+ERPNEXT_RATE_LIMIT_RPS = float(os.getenv("ERPNEXT_RATE_LIMIT_RPS", "0"))  # 0 = unlimited
+ERPNEXT_RATE_LIMIT_BURST = int(os.getenv("ERPNEXT_RATE_LIMIT_BURST", "10"))
+ERPNEXT_INTERACTIVE_RESERVE = float(os.getenv("ERPNEXT_INTERACTIVE_RESERVE", "0.5"))
+ERPNEXT_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ERPNEXT_QUEUE_TIMEOUT_SECONDS", "10"))
+# Per-worker ERPNext call metrics are written here for cross-worker reports
+# (default: <tmp>/hdstore-erp-metrics)
+ERPNEXT_METRICS_DIR = os.getenv("ERPNEXT_METRICS_DIR", "")
+ERPNEXT_METRICS_FLUSH_SECONDS = float(os.getenv("ERPNEXT_METRICS_FLUSH_SECONDS", "10"))
+# List endpoints are paged with limit_start/limit_page_length
+ERPNEXT_PAGE_LENGTH = int(os.getenv("ERPNEXT_PAGE_LENGTH", "500"))
+# Pages of the Item list fetched in parallel during a catalog refresh
+CATALOG_FETCH_WORKERS = int(os.getenv("CATALOG_FETCH_WORKERS", "2"))
+# Per-endpoint circuit breaker: open when >= FAILURE_RATE of the last WINDOW
+# calls failed (once MIN_CALLS are recorded), probe again after COOLDOWN.
+ERPNEXT_CIRCUIT_WINDOW = int(os.getenv("ERPNEXT_CIRCUIT_WINDOW", "20"))
+ERPNEXT_CIRCUIT_MIN_CALLS = int(os.getenv("ERPNEXT_CIRCUIT_MIN_CALLS", "5"))
+ERPNEXT_CIRCUIT_FAILURE_RATE = float(os.getenv("ERPNEXT_CIRCUIT_FAILURE_RATE", "0.5"))
+ERPNEXT_CIRCUIT_COOLDOWN_SECONDS = float(os.getenv("ERPNEXT_CIRCUIT_COOLDOWN_SECONDS", "30"))
+# Offline benchmarking: answer ERPNext calls from an in-process stand-in
+# (synthetic catalog, or a recording made with `manage.py erp_standin --record`)
+ERPNEXT_STANDIN = os.getenv("ERPNEXT_STANDIN", "0") == "1"
+ERPNEXT_STANDIN_RECORDING = os.getenv("ERPNEXT_STANDIN_RECORDING", "")
+ERPNEXT_STANDIN_CATALOG_SIZE = int(os.getenv("ERPNEXT_STANDIN_CATALOG_SIZE", "500"))
+ERPNEXT_STANDIN_LATENCY_MS = float(os.getenv("ERPNEXT_STANDIN_LATENCY_MS", "0"))
+ERPNEXT_STANDIN_JITTER_MS = float(os.getenv("ERPNEXT_STANDIN_JITTER_MS", "0"))
+ERPNEXT_STANDIN_ERROR_RATE = float(os.getenv("ERPNEXT_STANDIN_ERROR_RATE", "0"))
+ERPNEXT_STANDIN_SEED = int(os.getenv("ERPNEXT_STANDIN_SEED", "0"))
 
 # WhatsApp automation via WasenderAPI
 WHATSAPP_AUTOMATION_ENABLED = os.getenv("WHATSAPP_AUTOMATION_ENABLED", "0") == "1"
@@ -217,8 +270,43 @@ WHATSAPP_WELCOME_TEMPLATE = os.getenv(
     "Hi {name}, your order {order_no} is received. We will contact you soon. Thank you for choosing HD Store.",
 )
 
+# Catalog / stock caches are stale-while-revalidate: past *_CACHE_SECONDS the
+# cached value is served while a background refresh runs; past
+# *_MAX_STALE_SECONDS requests wait for the refresh.
 CATALOG_CACHE_SECONDS = int(os.getenv("CATALOG_CACHE_SECONDS", "300"))
+CATALOG_MAX_STALE_SECONDS = int(os.getenv("CATALOG_MAX_STALE_SECONDS", "3600"))
+# Catalog refreshes fetch only Items modified since the last sync; a full
+# resync (which also drops deleted Items) runs at most this often.
+CATALOG_FULL_SYNC_SECONDS = int(os.getenv("CATALOG_FULL_SYNC_SECONDS", "3600"))
 STOCK_CACHE_SECONDS = int(os.getenv("STOCK_CACHE_SECONDS", "30"))
+STOCK_MAX_STALE_SECONDS = int(os.getenv("STOCK_MAX_STALE_SECONDS", "300"))
+STOCK_BULK_CHUNK = int(os.getenv("STOCK_BULK_CHUNK", "100"))
+# Push stock: Bin / Stock Ledger Entry webhooks write stock into the cache and
+# the local ProductStock table, and cache misses read that table instead of
+# ERPNext (keep it complete with `manage.py reconcile_stock --interval ...`).
+STOCK_PUSH = os.getenv("STOCK_PUSH", "0") == "1"
+# Webhook calls arriving within this window are refreshed with one Bin query
+STOCK_PUSH_BATCH_SECONDS = float(os.getenv("STOCK_PUSH_BATCH_SECONDS", "0.5"))
+# How long the last good values are kept as a fallback while ERPNext is down
+CATALOG_STALE_SECONDS = int(os.getenv("CATALOG_STALE_SECONDS", "86400"))
+CATALOG_DEGRADED_RETRY_SECONDS = int(os.getenv("CATALOG_DEGRADED_RETRY_SECONDS", "30"))
+# Last known good catalog (web.catalog_lkg), served when ERPNext is down and
+# nothing is cached; put it on persistent storage (empty = temp dir).
+CATALOG_LKG_PATH = os.getenv("CATALOG_LKG_PATH", "")
+# Max time one worker holds the cross-process fetch lock for a catalog key
+CATALOG_FETCH_LOCK_SECONDS = int(os.getenv("CATALOG_FETCH_LOCK_SECONDS", "60"))
+# Catalog / stock source: "erpnext" (live API), "db" (local mirror filled by
+# `manage.py sync_catalog_mirror`) or "sql" (mirror, filtered/sorted in SQL)
+CATALOG_SOURCE = os.getenv("CATALOG_SOURCE", "erpnext")
+# Directory for the memory-mapped catalog snapshot shared by all workers
+# (web.catalog_snapshot); empty = each worker indexes its own cached copy.
+CATALOG_SNAPSHOT_DIR = os.getenv("CATALOG_SNAPSHOT_DIR", "")
+# Warm the catalog, indexes and translations when the WSGI app is loaded
+# (web.warmup): once in the master with gunicorn --preload, else per worker.
+CATALOG_WARM_ON_BOOT = os.getenv("CATALOG_WARM_ON_BOOT", "0") == "1"
+# Boot warm-up gives ERPNext this long to accept a connection, without
+# retries, before starting from the last known good catalog.
+CATALOG_WARM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("CATALOG_WARM_CONNECT_TIMEOUT_SECONDS", "3"))
 
 
 
@@ -16,13 +16,19 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include 
-from orders.webhooks import ERPNextSalesInvoiceWebhook
+from integration.views import ERPNextMetricsView, ERPNextStatusView
+from orders.webhooks import ERPNextItemWebhook, ERPNextSalesInvoiceWebhook, ERPNextStockWebhook
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('allauth.urls')),
     # ERPNext webhook endpoint (production critical)
     path('api/webhooks/erpnext/sales-invoice/', ERPNextSalesInvoiceWebhook.as_view(), name='erpnext-sales-invoice-webhook'),
+    path('api/webhooks/erpnext/item/', ERPNextItemWebhook.as_view(), name='erpnext-item-webhook'),
+    path('api/webhooks/erpnext/stock/', ERPNextStockWebhook.as_view(), name='erpnext-stock-webhook'),
+    # ERPNext client monitoring (staff only)
+    path('api/erpnext/status/', ERPNextStatusView.as_view(), name='erpnext-status'),
+    path('api/erpnext/metrics/', ERPNextMetricsView.as_view(), name='erpnext-metrics'),
     # Web frontend (Django templates)
     path('', include('web.urls')),
 ]
@@ -1,10 +1,27 @@
+import contextvars
+import json as jsonlib
+import logging
+import os
+import re
+import threading
 import time
-import requests
-from dataclasses import dataclass
-from typing import Any, Dict, Optional, List
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.cookiejar import DefaultCookiePolicy
+from typing import Any, Dict, Iterator, Optional, List
 
+import requests
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from . import erp_metrics
+from .erp_standin import StandInAdapter, get_standin
 
+logger = logging.getLogger(__name__)
 
 class ERPNextError(Exception):
     pass
@@ -18,6 +35,550 @@ class ERPNextUnavailable(ERPNextError):
     pass
 
 
+class ERPNextNotFound(ERPNextError):
+    """404: the document (or endpoint) does not exist."""
+
+
+# ---------------------------------------------------------------------------
+# Pooled HTTP session (one per process, shared by every ERPNextClient)
+# ---------------------------------------------------------------------------
+
+class _PoolStats:
+    """Thread-safe counters for the ERPNext connection pool."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "new_connections": 0, "waits": 0}
+        self._wait_seconds = 0.0
+
+    def incr(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def add_wait(self, seconds: float) -> None:
+        with self._lock:
+            self._counts["waits"] += 1
+            self._wait_seconds += seconds
+
+    def reset(self) -> None:
+        with self._lock:
+            for k in self._counts:
+                self._counts[k] = 0
+            self._wait_seconds = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+            wait_seconds = self._wait_seconds
+        counts["hits"] = max(counts["requests"] - counts["new_connections"], 0)
+        counts["wait_seconds"] = round(wait_seconds, 6)
+        return counts
+
+
+_pool_stats = _PoolStats()
+
+
+class _CountingPoolMixin:
+    """Records connection reuse / creation / waits on a urllib3 pool."""
+
+    def _get_conn(self, timeout=None):
+        _pool_stats.incr("requests")
+        pool = getattr(self, "pool", None)
+        if self.block and pool is not None and pool.empty():
+            started = time.monotonic()
+            try:
+                return super()._get_conn(timeout=timeout)
+            finally:
+                _pool_stats.add_wait(time.monotonic() - started)
+        return super()._get_conn(timeout=timeout)
+
+    def _new_conn(self):
+        _pool_stats.incr("new_connections")
+        return super()._new_conn()
+
+
+class _CountingHTTPConnectionPool(_CountingPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class _CountingHTTPSConnectionPool(_CountingPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class _PooledAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+_session_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+
+
+def pool_maxsize() -> int:
+    """Keep-alive connections per worker: at least ``ERPNEXT_MAX_IN_FLIGHT``.
+
+    With ``ERPNEXT_POOL_BLOCK`` a request that finds every connection
+    checked out waits — without a timeout — for one to be returned, so the
+    pool must hold a connection for every slot the traffic governor grants.
+    """
+    return max(
+        getattr(settings, "ERPNEXT_POOL_MAXSIZE", 8),
+        getattr(settings, "ERPNEXT_MAX_IN_FLIGHT", 8),
+    )
+
+
+def _build_session() -> requests.Session:
+    if getattr(settings, "ERPNEXT_STANDIN", False):
+        # Offline benchmarking: answer from the in-process stand-in.
+        adapter = StandInAdapter(get_standin())
+    else:
+        adapter = _PooledAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_maxsize(),
+            pool_block=getattr(settings, "ERPNEXT_POOL_BLOCK", True),
+            max_retries=0,  # retries are handled by ERPNextClient itself
+        )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    # The session is shared between threads: never let ERPNext responses
+    # (e.g. Frappe's ``sid`` cookie) leak into the shared cookie jar.
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """Return the process-wide pooled session used for ERPNext calls.
+
+    A new session is built lazily after ``fork()`` so gunicorn workers
+    never share sockets inherited from a ``--preload`` master.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+    with _session_lock:
+        if _session is None or _session_pid != pid:
+            _session = _build_session()
+            _session_pid = pid
+        return _session
+
+
+def close_http_session() -> None:
+    """Close pooled connections (tests, shutdown hooks)."""
+    global _session, _session_pid
+    with _session_lock:
+        if _session is not None and _session_pid == os.getpid():
+            _session.close()
+        _session = None
+        _session_pid = None
+
+
+def _reset_after_fork() -> None:
+    # Drop the parent's session without closing it: the sockets belong to
+    # the parent process.  Locks may have been held mid-fork, so recreate.
+    global _session, _session_pid, _session_lock
+    _session_lock = threading.Lock()
+    _session = None
+    _session_pid = None
+    _pool_stats.__init__()
+    _reset_breakers()
+    _reset_governor()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Connection pool counters for this process (for monitoring)."""
+    stats = _pool_stats.snapshot()
+    stats["pid"] = os.getpid()
+    stats["maxsize"] = pool_maxsize()
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Circuit breakers (one per method + endpoint, shared by all threads)
+# ---------------------------------------------------------------------------
+
+_DOC_NAME_RE = re.compile(r"^(/api/resource/[^/]+)/.+$")
+
+
+def endpoint_key(method: str, path: str) -> str:
+    """Collapse a request path into its endpoint template.
+
+    ``GET /api/resource/Item/LAP-001`` → ``GET /api/resource/Item/{name}``
+    so all single-document reads of a doctype share one breaker.
+    """
+    path = path.split("?", 1)[0]
+    path = _DOC_NAME_RE.sub(r"\1/{name}", path)
+    return f"{method.upper()} {path}"
+
+
+class CircuitBreaker:
+    """Closed → open → half-open breaker over a sliding window of calls.
+
+    * closed: calls pass; once ``min_calls`` outcomes are in the window and
+      the failure rate reaches ``failure_rate`` the circuit opens.
+    * open: calls fail immediately with ``ERPNextUnavailable`` until
+      ``cooldown`` seconds have passed.
+    * half-open: a single probe call is let through; success closes the
+      circuit, failure re-opens it for another cool-down.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        cooldown: float = 30.0,
+    ) -> None:
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._outcomes: deque = deque(maxlen=window)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._rejected = 0
+        self._transitions = 0
+
+    def _transition(self, state: str) -> None:
+        # Caller holds the lock.
+        previous, self._state = self._state, state
+        self._transitions += 1
+        if state == self.OPEN:
+            self._opened_at = time.monotonic()
+            logger.warning(
+                "ERPNext circuit %s: %s -> open (cool-down %.0fs)",
+                self.name, previous, self.cooldown,
+            )
+        else:
+            logger.info("ERPNext circuit %s: %s -> %s", self.name, previous, state)
+        if state == self.CLOSED:
+            self._outcomes.clear()
+
+    def before_call(self) -> bool:
+        """Admit or reject a call.  Returns True when the call is a probe."""
+        with self._lock:
+            if self._state == self.OPEN:
+                remaining = self.cooldown - (time.monotonic() - self._opened_at)
+                if remaining > 0:
+                    self._rejected += 1
+                    raise ERPNextUnavailable(
+                        f"ERPNext circuit open for {self.name}; retry in {remaining:.1f}s"
+                    )
+                self._transition(self.HALF_OPEN)
+            if self._state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self._rejected += 1
+                    raise ERPNextUnavailable(
+                        f"ERPNext circuit half-open for {self.name}; probe in flight"
+                    )
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def cancel_call(self, probe: bool) -> None:
+        """Forget an admitted call that never reached ERPNext."""
+        if probe:
+            with self._lock:
+                self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                self._transition(self.CLOSED)
+                return
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                self._transition(self.OPEN)
+                return
+            self._outcomes.append(False)
+            if self._state == self.CLOSED and len(self._outcomes) >= self.min_calls:
+                failures = self._outcomes.count(False)
+                if failures / len(self._outcomes) >= self.failure_rate:
+                    self._transition(self.OPEN)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                return self.HALF_OPEN
+            return self._state
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            calls = len(self._outcomes)
+            failures = self._outcomes.count(False)
+            return {
+                "endpoint": self.name,
+                "state": state,
+                "window_calls": calls,
+                "window_failures": failures,
+                "failure_rate": round(failures / calls, 3) if calls else 0.0,
+                "rejected": self._rejected,
+                "transitions": self._transitions,
+            }
+
+
+_breakers_lock = threading.Lock()
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(key: str) -> CircuitBreaker:
+    breaker = _breakers.get(key)
+    if breaker is not None:
+        return breaker
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                key,
+                window=getattr(settings, "ERPNEXT_CIRCUIT_WINDOW", 20),
+                min_calls=getattr(settings, "ERPNEXT_CIRCUIT_MIN_CALLS", 5),
+                failure_rate=getattr(settings, "ERPNEXT_CIRCUIT_FAILURE_RATE", 0.5),
+                cooldown=getattr(settings, "ERPNEXT_CIRCUIT_COOLDOWN_SECONDS", 30),
+            )
+            _breakers[key] = breaker
+        return breaker
+
+
+def get_circuit_states() -> List[Dict[str, Any]]:
+    """Snapshot of every circuit this process has seen (for monitoring)."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return sorted((b.snapshot() for b in breakers), key=lambda s: s["endpoint"])
+
+
+def _reset_breakers() -> None:
+    global _breakers_lock, _breakers
+    _breakers_lock = threading.Lock()
+    _breakers = {}
+
+
+# ---------------------------------------------------------------------------
+# Traffic governor (per-process concurrency cap + token-bucket rate limit)
+# ---------------------------------------------------------------------------
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+_priority: contextvars.ContextVar = contextvars.ContextVar("erp_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def erp_priority(priority: str):
+    """Tag ERPNext calls made inside the block as ``interactive`` or ``background``.
+
+    Request threads are interactive by default; webhook, WhatsApp and cache
+    refresh threads should wrap their work in ``erp_priority(BACKGROUND)``.
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+_fail_fast: contextvars.ContextVar = contextvars.ContextVar("erp_fail_fast", default=None)
+
+
+@contextmanager
+def erp_fail_fast(connect_timeout: float):
+    """Give up quickly on an unreachable ERPNext for calls made inside the block.
+
+    Each call gets one attempt (no retries) and ``connect_timeout`` seconds
+    to connect; the read timeout is unchanged.  Used at process start
+    (``web.warmup``), where retrying a dead ERPNext would stall worker boot.
+    """
+    token = _fail_fast.set(connect_timeout)
+    try:
+        yield
+    finally:
+        _fail_fast.reset(token)
+
+
+class TrafficGovernor:
+    """Bounds ERPNext traffic from this process.
+
+    * at most ``max_in_flight`` requests run at once, of which at most
+      ``background_max_in_flight`` may be background requests;
+    * background requests never take a slot while an interactive request
+      is queued;
+    * when ``rate`` > 0 a token bucket (``burst`` tokens, ``rate`` per
+      second) limits request starts; background requests leave
+      ``reserve`` tokens in the bucket for interactive traffic.
+
+    Callers that cannot start within ``queue_timeout`` get
+    ``ERPNextUnavailable``.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        background_max_in_flight: int = 2,
+        rate: float = 0.0,
+        burst: int = 10,
+        reserve: float = 0.5,
+        queue_timeout: float = 10.0,
+    ) -> None:
+        self.max_in_flight = max(1, max_in_flight)
+        self.background_max_in_flight = max(1, min(background_max_in_flight, self.max_in_flight))
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.reserve = reserve * self.burst
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._in_flight = {INTERACTIVE: 0, BACKGROUND: 0}
+        self._waiting_interactive = 0
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._stats = {
+            p: {"acquired": 0, "timeouts": 0, "waited": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+            for p in (INTERACTIVE, BACKGROUND)
+        }
+
+    def _refill(self, now: float) -> None:
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _wait_time(self, priority: str, now: float) -> Optional[float]:
+        """0 when the caller may start now, else seconds to wait (None = until notified)."""
+        total = self._in_flight[INTERACTIVE] + self._in_flight[BACKGROUND]
+        if total >= self.max_in_flight:
+            return None
+        if priority == BACKGROUND and (
+            self._in_flight[BACKGROUND] >= self.background_max_in_flight
+            or self._waiting_interactive
+        ):
+            return None
+        if self.rate <= 0:
+            return 0
+        self._refill(now)
+        needed = 1 + (self.reserve if priority == BACKGROUND else 0)
+        if self._tokens >= needed:
+            return 0
+        return (needed - self._tokens) / self.rate
+
+    def acquire(self, priority: Optional[str] = None) -> str:
+        priority = priority or _priority.get()
+        if priority != BACKGROUND:
+            priority = INTERACTIVE
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        with self._cond:
+            if priority == INTERACTIVE:
+                self._waiting_interactive += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._wait_time(priority, now)
+                    if wait == 0:
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats[priority]["timeouts"] += 1
+                        raise ERPNextUnavailable(
+                            f"ERPNext {priority} request queue full "
+                            f"(waited {self.queue_timeout:.1f}s)"
+                        )
+                    self._cond.wait(remaining if wait is None else min(wait, remaining))
+            finally:
+                if priority == INTERACTIVE:
+                    self._waiting_interactive -= 1
+            if self.rate > 0:
+                self._tokens -= 1
+            self._in_flight[priority] += 1
+            waited = time.monotonic() - started
+            stats = self._stats[priority]
+            stats["acquired"] += 1
+            if waited > 0.001:
+                stats["waited"] += 1
+                stats["wait_seconds"] += waited
+                stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+            # A waiting background caller may be unblocked by the interactive
+            # queue draining.
+            self._cond.notify_all()
+        return priority
+
+    def release(self, priority: str) -> None:
+        with self._cond:
+            self._in_flight[priority] -= 1
+            self._cond.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "background_max_in_flight": self.background_max_in_flight,
+                "rate_per_second": self.rate,
+                "in_flight": dict(self._in_flight),
+                "queued_interactive": self._waiting_interactive,
+                "tokens": round(self._tokens, 2) if self.rate > 0 else None,
+                "stats": {
+                    p: {k: round(v, 6) if isinstance(v, float) else v for k, v in s.items()}
+                    for p, s in self._stats.items()
+                },
+            }
+
+
+_governor_lock = threading.Lock()
+_governor: Optional[TrafficGovernor] = None
+
+
+def get_governor() -> TrafficGovernor:
+    global _governor
+    if _governor is not None:
+        return _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = TrafficGovernor(
+                max_in_flight=getattr(settings, "ERPNEXT_MAX_IN_FLIGHT", 8),
+                background_max_in_flight=getattr(settings, "ERPNEXT_BACKGROUND_MAX_IN_FLIGHT", 2),
+                rate=getattr(settings, "ERPNEXT_RATE_LIMIT_RPS", 0),
+                burst=getattr(settings, "ERPNEXT_RATE_LIMIT_BURST", 10),
+                reserve=getattr(settings, "ERPNEXT_INTERACTIVE_RESERVE", 0.5),
+                queue_timeout=getattr(settings, "ERPNEXT_QUEUE_TIMEOUT_SECONDS", 10),
+            )
+        return _governor
+
+
+def get_limiter_stats() -> Dict[str, Any]:
+    """Governor state and queue-wait counters for this process."""
+    return get_governor().snapshot()
+
+
+def _reset_governor() -> None:
+    global _governor_lock, _governor
+    _governor_lock = threading.Lock()
+    _governor = None
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
 @dataclass
 class ERPNextClient:
     base_url: str
@@ -26,6 +587,7 @@ class ERPNextClient:
     timeout: int = 15
     max_retries: int = 2
     backoff_seconds: float = 0.6
+    session: Optional[requests.Session] = field(default=None, repr=False, compare=False)
 
     def _headers(self) -> Dict[str, str]:
         return {
@@ -34,6 +596,76 @@ class ERPNextClient:
             "Authorization": f"token {self.api_key}:{self.api_secret}",
         }
 
+    def _http(self) -> requests.Session:
+        return self.session or get_http_session()
+
+    def _send(self, method: str, url: str, endpoint: str, **kwargs: Any) -> requests.Response:
+        """Send one logical call through the endpoint's circuit breaker.
+
+        Timeouts / connection errors are retried with backoff, except for
+        half-open probes which get a single attempt so a recovering ERPNext
+        is not hammered.  5xx responses count as breaker failures.
+        Each attempt takes a slot from the process-wide traffic governor.
+        Latency, status, retries and response size are recorded in
+        ``integration.erp_metrics``.
+        """
+        breaker = get_circuit_breaker(endpoint)
+        try:
+            probe = breaker.before_call()
+        except ERPNextUnavailable:
+            erp_metrics.reject(endpoint)
+            raise
+        fail_fast = _fail_fast.get()
+        attempts = 1 if probe or fail_fast is not None else self.max_retries + 1
+        timeout = self.timeout if fail_fast is None else (min(fail_fast, self.timeout), self.timeout)
+        governor = get_governor()
+        started = time.perf_counter()
+
+        for attempt in range(attempts):
+            try:
+                priority = governor.acquire()
+            except ERPNextUnavailable:
+                breaker.cancel_call(probe)
+                erp_metrics.reject(endpoint)
+                raise
+            try:
+                try:
+                    r = self._http().request(
+                        method=method,
+                        url=url,
+                        headers=self._headers(),
+                        timeout=timeout,
+                        **kwargs,
+                    )
+                finally:
+                    governor.release(priority)  # never hold a slot during backoff
+            except (requests.Timeout, requests.ConnectionError) as e:
+                if attempt < attempts - 1:
+                    time.sleep(self.backoff_seconds * (attempt + 1))
+                    continue
+                breaker.record_failure()
+                erp_metrics.observe(
+                    endpoint, time.perf_counter() - started, None, attempt,
+                    timeout=isinstance(e, requests.Timeout),
+                )
+                raise ERPNextUnavailable(f"ERPNext unavailable: {e}") from e
+            except Exception:
+                breaker.record_failure()
+                erp_metrics.observe(endpoint, time.perf_counter() - started, None, attempt)
+                raise
+
+            if r.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            erp_metrics.observe(
+                endpoint, time.perf_counter() - started, r.status_code, attempt,
+                nbytes=len(r.content or b""),
+            )
+            return r
+
+        raise ERPNextError(f"Unexpected ERPNext error calling {endpoint}")
+
     def request(
         self,
         method: str,
@@ -42,38 +674,18 @@ class ERPNextClient:
         json: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         url = f"{self.base_url}{path}"
+        r = self._send(method, url, endpoint_key(method, path), params=params, json=json)
 
-        last_exc: Optional[Exception] = None
-        for attempt in range(self.max_retries + 1):
-            try:
-                r = requests.request(
-                    method=method,
-                    url=url,
-                    headers=self._headers(),
-                    params=params,
-                    json=json,
-                    timeout=self.timeout,
-                )
-
-                if r.status_code in (401, 403):
-                    raise ERPNextAuthError(f"{r.status_code} auth error: {r.text}")
-
-                if r.status_code == 404:
-                    raise ERPNextError(f"Endpoint not found: {url}")
-
-                if r.status_code >= 400:
-                    raise ERPNextError(f"{r.status_code} ERPNext error: {r.text}")
+        if r.status_code in (401, 403):
+            raise ERPNextAuthError(f"{r.status_code} auth error: {r.text}")
 
-                return r.json()
+        if r.status_code == 404:
+            raise ERPNextNotFound(f"Endpoint not found: {url}")
 
-            except (requests.Timeout, requests.ConnectionError) as e:
-                last_exc = e
-                if attempt < self.max_retries:
-                    time.sleep(self.backoff_seconds * (attempt + 1))
-                    continue
-                raise ERPNextUnavailable(f"ERPNext unavailable: {e}") from e
+        if r.status_code >= 400:
+            raise ERPNextError(f"{r.status_code} ERPNext error: {r.text}")
 
-        raise ERPNextError(f"Unexpected ERPNext error: {last_exc}")
+        return r.json()
 
     def download_pdf(
         self,
@@ -85,10 +697,8 @@ class ERPNextClient:
 
         Returns raw PDF bytes.
         """
-        url = (
-            f"{self.base_url}/api/method/"
-            f"frappe.utils.print_format.download_pdf"
-        )
+        path = "/api/method/frappe.utils.print_format.download_pdf"
+        url = f"{self.base_url}{path}"
         params = {
             "doctype": doctype,
             "name": name,
@@ -96,44 +706,166 @@ class ERPNextClient:
             "no_letterhead": "1",
         }
 
-        last_exc: Optional[Exception] = None
-        for attempt in range(self.max_retries + 1):
-            try:
-                r = requests.get(
-                    url,
-                    headers=self._headers(),
-                    params=params,
-                    timeout=self.timeout,
-                )
+        r = self._send("GET", url, endpoint_key("GET", path), params=params)
 
-                if r.status_code in (401, 403):
-                    raise ERPNextAuthError(f"{r.status_code} auth error: {r.text}")
+        if r.status_code in (401, 403):
+            raise ERPNextAuthError(f"{r.status_code} auth error: {r.text}")
 
-                if r.status_code == 404:
-                    raise ERPNextError(f"PDF not found for {doctype}/{name}")
+        if r.status_code == 404:
+            raise ERPNextNotFound(f"PDF not found for {doctype}/{name}")
 
-                if r.status_code >= 400:
-                    raise ERPNextError(f"{r.status_code} ERPNext PDF error: {r.text}")
+        if r.status_code >= 400:
+            raise ERPNextError(f"{r.status_code} ERPNext PDF error: {r.text}")
 
-                return r.content
+        return r.content
 
-            except (requests.Timeout, requests.ConnectionError) as e:
-                last_exc = e
-                if attempt < self.max_retries:
-                    time.sleep(self.backoff_seconds * (attempt + 1))
-                    continue
-                raise ERPNextUnavailable(f"ERPNext unavailable: {e}") from e
+    def list_page(
+        self,
+        doctype: str,
+        *,
+        fields: Optional[List[str]] = None,
+        filters: Optional[List[Any]] = None,
+        order_by: Optional[str] = None,
+        start: int = 0,
+        page_length: int = 500,
+    ) -> List[Dict[str, Any]]:
+        """Fetch one page of ``/api/resource/<doctype>`` rows."""
+        params: Dict[str, Any] = {
+            "limit_start": str(start),
+            "limit_page_length": str(page_length),
+        }
+        if fields:
+            params["fields"] = jsonlib.dumps(fields)
+        if filters:
+            params["filters"] = jsonlib.dumps(filters)
+        if order_by:
+            params["order_by"] = order_by
+        data = self.request("GET", f"/api/resource/{doctype}", params=params)
+        return data.get("data") or []
 
-        raise ERPNextError(f"Unexpected ERPNext PDF error: {last_exc}")
+    def count(self, doctype: str, *, filters: Optional[List[Any]] = None) -> int:
+        """Number of ``doctype`` rows matching ``filters`` (``frappe.client.get_count``)."""
+        params: Dict[str, Any] = {"doctype": doctype}
+        if filters:
+            params["filters"] = jsonlib.dumps(filters)
+        data = self.request("GET", "/api/method/frappe.client.get_count", params=params)
+        return int(data.get("message") or 0)
+
+    def iter_resource(
+        self,
+        doctype: str,
+        *,
+        fields: Optional[List[str]] = None,
+        filters: Optional[List[Any]] = None,
+        order_by: Optional[str] = None,
+        page_length: Optional[int] = None,
+        limit: Optional[int] = None,
+        workers: int = 1,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield every row of a doctype list, one page at a time.
+
+        Pages are requested with ``limit_start``/``limit_page_length`` until
+        a short page comes back, so lists are never truncated and only one
+        page (per worker) is held in memory.  With ``workers > 1`` up to that
+        many pages are fetched ahead in parallel; rows are still yielded in
+        order.  Parallel paging reads at fixed offsets, so rows modified
+        mid-scan may be skipped or repeated — callers that care should
+        de-duplicate or re-sync.  ``limit`` stops after that many rows.
+        """
+        page_length = page_length or getattr(settings, "ERPNEXT_PAGE_LENGTH", 500)
+        if limit is not None:
+            page_length = min(page_length, limit)
+
+        def fetch(start: int) -> List[Dict[str, Any]]:
+            return self.list_page(
+                doctype,
+                fields=fields,
+                filters=filters,
+                order_by=order_by,
+                start=start,
+                page_length=page_length,
+            )
+
+        pages = self._iter_pages_parallel(fetch, page_length, workers) if workers > 1 \
+            else self._iter_pages(fetch, page_length)
+        yielded = 0
+        for rows in pages:
+            for row in rows:
+                yield row
+                yielded += 1
+                if limit is not None and yielded >= limit:
+                    pages.close()
+                    return
+
+    @staticmethod
+    def _iter_pages(fetch, page_length: int) -> Iterator[List[Dict[str, Any]]]:
+        start = 0
+        while True:
+            rows = fetch(start)
+            yield rows
+            if len(rows) < page_length:
+                return
+            start += page_length
+
+    @staticmethod
+    def _iter_pages_parallel(fetch, page_length: int, workers: int) -> Iterator[List[Dict[str, Any]]]:
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="erp-page")
+        pending = deque()
+        next_start = 0
+        try:
+            # Run each page in a copy of the caller's context so the
+            # interactive/background priority carries over to the workers.
+            def submit(start: int):
+                return pool.submit(contextvars.copy_context().run, fetch, start)
+
+            for _ in range(workers):
+                pending.append(submit(next_start))
+                next_start += page_length
+            while pending:
+                rows = pending.popleft().result()
+                yield rows
+                if len(rows) < page_length:
+                    return
+                pending.append(submit(next_start))
+                next_start += page_length
+        finally:
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+
+_client_lock = threading.Lock()
+_client: Optional[ERPNextClient] = None
 
 
 def get_erp_client() -> ERPNextClient:
+    global _client
     if not settings.ERPNEXT_API_KEY or not settings.ERPNEXT_API_SECRET:
         raise ERPNextAuthError("Missing ERPNEXT_API_KEY/ERPNEXT_API_SECRET in .env")
 
-    return ERPNextClient(
-        base_url=settings.ERPNEXT_BASE_URL,
-        api_key=settings.ERPNEXT_API_KEY,
-        api_secret=settings.ERPNEXT_API_SECRET,
-        timeout=settings.ERPNEXT_TIMEOUT_SECONDS,
+    config = (
+        settings.ERPNEXT_BASE_URL,
+        settings.ERPNEXT_API_KEY,
+        settings.ERPNEXT_API_SECRET,
+        settings.ERPNEXT_TIMEOUT_SECONDS,
     )
+    client = _client
+    if client is not None and (
+        client.base_url, client.api_key, client.api_secret, client.timeout
+    ) == config:
+        return client
+
+    with _client_lock:
+        in_flight = get_governor().max_in_flight
+        if in_flight > pool_maxsize():
+            raise ImproperlyConfigured(
+                f"ERPNext pool ({pool_maxsize()} connections) is smaller than "
+                f"ERPNEXT_MAX_IN_FLIGHT ({in_flight}); blocked requests would wait forever"
+            )
+        _client = ERPNextClient(
+            base_url=settings.ERPNEXT_BASE_URL,
+            api_key=settings.ERPNEXT_API_KEY,
+            api_secret=settings.ERPNEXT_API_SECRET,
+            timeout=settings.ERPNEXT_TIMEOUT_SECONDS,
+        )
+        return _client
@@ -0,0 +1,304 @@
+"""
+In-process latency / error instrumentation for ERPNextClient.
+
+Every logical ERPNext call is recorded against its endpoint template
+(``GET /api/resource/Item/{name}``): a latency histogram, status codes,
+retries, timeouts, response bytes and calls rejected before reaching the
+network (open circuit, full request queue).
+
+Each worker keeps its own counters and periodically writes them to
+``ERPNEXT_METRICS_DIR/<pid>.json`` so the ``erp_metrics`` management
+command and the staff metrics endpoint can report across all workers.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+# Upper bounds in seconds; the last bucket is +Inf.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _new_series() -> Dict[str, Any]:
+    return {
+        "count": 0,
+        "sum": 0.0,
+        "buckets": [0] * (len(BUCKETS) + 1),
+        "status": {},
+        "retries": 0,
+        "timeouts": 0,
+        "errors": 0,
+        "rejected": 0,
+        "bytes": 0,
+    }
+
+
+class _Metrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._series: Dict[str, Dict[str, Any]] = {}
+        self._flushed_at = 0.0
+
+    def _get(self, endpoint: str) -> Dict[str, Any]:
+        series = self._series.get(endpoint)
+        if series is None:
+            series = self._series[endpoint] = _new_series()
+        return series
+
+    def observe(
+        self,
+        endpoint: str,
+        seconds: float,
+        status: Optional[int],
+        retries: int,
+        nbytes: int = 0,
+        timeout: bool = False,
+    ) -> None:
+        with self._lock:
+            s = self._get(endpoint)
+            s["count"] += 1
+            s["sum"] += seconds
+            s["buckets"][bisect_left(BUCKETS, seconds)] += 1
+            s["retries"] += retries
+            s["bytes"] += nbytes
+            if status is None:
+                s["errors"] += 1
+            else:
+                code = str(status)
+                s["status"][code] = s["status"].get(code, 0) + 1
+            if timeout:
+                s["timeouts"] += 1
+        self._maybe_flush()
+
+    def reject(self, endpoint: str) -> None:
+        with self._lock:
+            self._get(endpoint)["rejected"] += 1
+        self._maybe_flush()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return json.loads(json.dumps(self._series))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series = {}
+
+    def _maybe_flush(self) -> None:
+        interval = getattr(settings, "ERPNEXT_METRICS_FLUSH_SECONDS", 10)
+        now = time.monotonic()
+        if now - self._flushed_at >= interval:
+            self._flushed_at = now
+            flush()
+
+
+_metrics = _Metrics()
+
+
+def observe(
+    endpoint: str,
+    seconds: float,
+    status: Optional[int],
+    retries: int,
+    nbytes: int = 0,
+    timeout: bool = False,
+) -> None:
+    """Record one completed call (``status`` None = no response)."""
+    _metrics.observe(endpoint, seconds, status, retries, nbytes, timeout)
+
+
+def reject(endpoint: str) -> None:
+    """Record a call refused before reaching the network."""
+    _metrics.reject(endpoint)
+
+
+def local_snapshot() -> Dict[str, Dict[str, Any]]:
+    """Counters recorded by this process only."""
+    return _metrics.snapshot()
+
+
+def reset() -> None:
+    _metrics.reset()
+
+
+def _reset_after_fork() -> None:
+    global _metrics
+    _metrics = _Metrics()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# ---------------------------------------------------------------------------
+# Cross-worker files
+# ---------------------------------------------------------------------------
+
+def metrics_dir() -> str:
+    return getattr(settings, "ERPNEXT_METRICS_DIR", "") or os.path.join(
+        tempfile.gettempdir(), "hdstore-erp-metrics"
+    )
+
+
+def flush() -> None:
+    """Atomically write this process's counters to ``<metrics_dir>/<pid>.json``."""
+    series = _metrics.snapshot()
+    if not series:
+        return
+    directory = metrics_dir()
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"pid": os.getpid(), "written_at": time.time(), "series": series}, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # metrics must never break ERPNext calls
+
+
+def _merge(into: Dict[str, Any], series: Dict[str, Any]) -> None:
+    for endpoint, s in series.items():
+        target = into.setdefault(endpoint, _new_series())
+        for key in ("count", "sum", "retries", "timeouts", "errors", "rejected", "bytes"):
+            target[key] += s.get(key, 0)
+        for i, n in enumerate(s.get("buckets", [])):
+            target["buckets"][i] += n
+        for code, n in s.get("status", {}).items():
+            target["status"][code] = target["status"].get(code, 0) + n
+
+
+def collect(prune: bool = False) -> Dict[str, Dict[str, Any]]:
+    """Merge the counters of every worker that has written a metrics file.
+
+    The calling process is flushed first so its own numbers are current.
+    With ``prune`` files of processes that are no longer running are removed
+    after being merged.
+    """
+    flush()
+    merged: Dict[str, Dict[str, Any]] = {}
+    directory = metrics_dir()
+    if not os.path.isdir(directory):
+        return merged
+    for name in os.listdir(directory):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            with open(path) as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            continue
+        _merge(merged, payload.get("series", {}))
+        if prune and not _pid_alive(payload.get("pid")):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return merged
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def quantile(series: Dict[str, Any], q: float) -> Optional[float]:
+    """Estimate a latency quantile by interpolating within histogram buckets."""
+    total = series["count"]
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    lower = 0.0
+    for i, n in enumerate(series["buckets"]):
+        upper = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+        if n and seen + n >= rank:
+            return lower + (upper - lower) * ((rank - seen) / n)
+        seen += n
+        lower = upper
+    return BUCKETS[-1]
+
+
+def summarize(series_by_endpoint: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One row per endpoint with count, mean and p50/p95/p99 (milliseconds)."""
+    rows = []
+    for endpoint, s in sorted(series_by_endpoint.items()):
+        row = {
+            "endpoint": endpoint,
+            "count": s["count"],
+            "mean_ms": round(s["sum"] / s["count"] * 1000, 1) if s["count"] else None,
+        }
+        for q in QUANTILES:
+            value = quantile(s, q)
+            row[f"p{int(q * 100)}_ms"] = round(value * 1000, 1) if value is not None else None
+        row.update({
+            "status": s["status"],
+            "retries": s["retries"],
+            "timeouts": s["timeouts"],
+            "errors": s["errors"],
+            "rejected": s["rejected"],
+            "bytes": s["bytes"],
+        })
+        rows.append(row)
+    return rows
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def render_prometheus(series_by_endpoint: Dict[str, Dict[str, Any]]) -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = [
+        "# HELP erpnext_request_duration_seconds ERPNext call latency including retries.",
+        "# TYPE erpnext_request_duration_seconds histogram",
+    ]
+    for endpoint, s in sorted(series_by_endpoint.items()):
+        method, _, path = endpoint.partition(" ")
+        labels = f'method="{_label(method)}",endpoint="{_label(path)}"'
+        cumulative = 0
+        for i, n in enumerate(s["buckets"]):
+            cumulative += n
+            le = f"{BUCKETS[i]}" if i < len(BUCKETS) else "+Inf"
+            lines.append(f'erpnext_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f"erpnext_request_duration_seconds_sum{{{labels}}} {s['sum']:.6f}")
+        lines.append(f"erpnext_request_duration_seconds_count{{{labels}}} {s['count']}")
+
+    counters = [
+        ("erpnext_responses_total", "Responses by HTTP status.", None),
+        ("erpnext_retries_total", "Retried attempts.", "retries"),
+        ("erpnext_timeouts_total", "Calls that ended in a timeout.", "timeouts"),
+        ("erpnext_errors_total", "Calls that ended without a response.", "errors"),
+        ("erpnext_rejected_total", "Calls rejected by the circuit breaker or limiter.", "rejected"),
+        ("erpnext_response_bytes_total", "Response body bytes.", "bytes"),
+    ]
+    for name, help_text, key in counters:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for endpoint, s in sorted(series_by_endpoint.items()):
+            method, _, path = endpoint.partition(" ")
+            labels = f'method="{_label(method)}",endpoint="{_label(path)}"'
+            if key is None:
+                for code, n in sorted(s["status"].items()):
+                    lines.append(f'{name}{{{labels},status="{code}"}} {n}')
+            else:
+                lines.append(f"{name}{{{labels}}} {s[key]}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,612 @@
+"""
+Offline ERPNext stand-in for benchmarks and load tests.
+
+``ERPNextStandIn`` answers the subset of the Frappe REST API this project
+uses — ``/api/resource/<doctype>`` lists (fields / filters / order_by /
+paging), single documents, creates and updates for Item, Bin, Customer,
+Address, Contact, Sales Order and Sales Invoice, plus ``download_pdf`` and
+``get_count`` —
+from an in-memory dataset with configurable latency, jitter and error rate.
+
+The dataset is either synthetic (``catalog_size`` laptops with Bin rows,
+deterministic for a given ``seed``) or replayed from a recording made
+against a live ERPNext with ``manage.py erp_standin --record``.
+
+It can be used two ways:
+
+* in-process, via ``StandInAdapter`` mounted on the ERPNext session
+  (``ERPNEXT_STANDIN=True``) — no sockets at all;
+* as a real HTTP server (``manage.py erp_standin``) that gunicorn workers
+  reach through ``ERPNEXT_BASE_URL``, so the full client stack is exercised.
+"""
+
+import itertools
+import json
+import logging
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+DOCTYPES = (
+    "Item",
+    "Bin",
+    "Customer",
+    "Address",
+    "Contact",
+    "Sales Order",
+    "Sales Invoice",
+)
+
+# Naming series for doctypes ERPNext names automatically.
+_SERIES = {
+    "Sales Order": "SAL-ORD-{year}-{n:05d}",
+    "Sales Invoice": "ACC-SINV-{year}-{n:05d}",
+}
+
+_PDF_PATH = "/api/method/frappe.utils.print_format.download_pdf"
+_COUNT_PATH = "/api/method/frappe.client.get_count"
+_RESOURCE_RE = re.compile(r"^/api/resource/([^/]+)(?:/(.+))?$")
+
+Response = Tuple[int, str, bytes]
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+# ---------------------------------------------------------------------------
+# Synthetic dataset
+# ---------------------------------------------------------------------------
+
+_BRANDS = {
+    "Dell": ["Latitude 5420", "Latitude 7490", "XPS 13 9310", "Precision 5550", "Vostro 3510"],
+    "HP": ["EliteBook 840 G7", "ProBook 450 G8", "ZBook Firefly 15", "Pavilion 15"],
+    "Lenovo": ["ThinkPad T14", "ThinkPad X1 Carbon Gen 9", "IdeaPad 5", "Legion 5"],
+    "Apple": ["MacBook Air M1", "MacBook Pro 14 M1 Pro"],
+    "ASUS": ["ZenBook 14", "ROG Strix G15", "VivoBook 15"],
+}
+_CPUS = ["Intel Core i5-1135G7", "Intel Core i7-1185G7", "Intel Core i7-10850H", "AMD Ryzen 7 5800H", "Apple M1"]
+_RAM = [8, 16, 32]
+_STORAGE = ["256GB SSD", "512GB SSD", "1TB SSD"]
+_GPUS = ["Intel Iris Xe", "NVIDIA GeForce RTX 3060", "NVIDIA Quadro T1000", "AMD Radeon Graphics"]
+_SCREENS = ["13.3", "14", "15.6"]
+_TAGS = ["Hot Deal", "Best Seller", "New Arrival"]
+_GRADES = ["A+", "A", "B"]
+_CONDITIONS = ["Used - Like New", "Used - Good", "New"]
+_KEYBOARDS = ["English", "Arabic/English"]
+_WAREHOUSES = ["Stores - HD", "Showroom - HD"]
+
+
+def synthetic_dataset(catalog_size: int = 500, seed: int = 0) -> Dict[str, List[Dict[str, Any]]]:
+    """Build a deterministic laptop catalog with one or two Bin rows per item."""
+    rng = random.Random(seed)
+    base = datetime(2025, 1, 1)
+    items: List[Dict[str, Any]] = []
+    bins: List[Dict[str, Any]] = []
+    brand_names = sorted(_BRANDS)
+
+    for i in range(catalog_size):
+        brand = brand_names[i % len(brand_names)]
+        model = rng.choice(_BRANDS[brand])
+        cpu, ram, storage = rng.choice(_CPUS), rng.choice(_RAM), rng.choice(_STORAGE)
+        gpu, screen = rng.choice(_GPUS), rng.choice(_SCREENS)
+        code = f"LAP-{i + 1:05d}"
+        name = f"{brand} {model} {cpu} {ram}GB {storage}"
+        rate = rng.randrange(8000, 90000, 250)
+        modified = (base + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S.%f")
+        items.append({
+            "name": code,
+            "item_code": code,
+            "item_name": name,
+            "custom_name_ar": f"لابتوب {brand} {model} رام {ram} جيجا",
+            "description": (
+                f"<p>{name}</p><ul><li>CPU: {cpu}</li><li>RAM: {ram}GB</li>"
+                f"<li>Storage: {storage}</li><li>GPU: {gpu}</li><li>Screen: {screen} inch</li></ul>"
+            ),
+            "image": "",
+            "item_group": "Laptops",
+            "brand": brand,
+            "standard_rate": float(rate),
+            "custom_old_price": float(rate + rng.randrange(1000, 8000, 250)) if rng.random() < 0.3 else None,
+            "custom_tags": ", ".join(t for t in _TAGS if rng.random() < 0.15),
+            "custom_condition": rng.choice(_CONDITIONS),
+            "custom_grade": rng.choice(_GRADES),
+            "custom_includes_charger": 1 if rng.random() < 0.8 else 0,
+            "custom_keyboard_layout": rng.choice(_KEYBOARDS),
+            "is_stock_item": 1,
+            "disabled": 1 if rng.random() < 0.02 else 0,
+            "stock_uom": "Nos",
+            "modified": modified,
+        })
+        for wh in _WAREHOUSES[: rng.randint(1, len(_WAREHOUSES))]:
+            bins.append({
+                "name": f"{code}-{wh}",
+                "item_code": code,
+                "warehouse": wh,
+                "actual_qty": float(rng.randint(0, 12)),
+                "modified": modified,
+            })
+
+    return {"Item": items, "Bin": bins}
+
+
+# ---------------------------------------------------------------------------
+# Query evaluation (the subset of frappe.get_list this project relies on)
+# ---------------------------------------------------------------------------
+
+def _compare(value: Any, op: str, operand: Any) -> bool:
+    op = op.lower()
+    if op in ("in", "not in"):
+        if isinstance(operand, str):
+            operand = [v.strip() for v in operand.split(",")]
+        hit = value in operand or str(value) in [str(v) for v in operand]
+        return hit if op == "in" else not hit
+    if op in ("like", "not like"):
+        pattern = "^" + re.escape(str(operand)).replace("%", ".*").replace("_", ".") + "$"
+        hit = re.match(pattern, str(value or ""), re.IGNORECASE) is not None
+        return hit if op == "like" else not hit
+    if op == "is":
+        is_set = value not in (None, "")
+        return is_set if operand == "set" else not is_set
+
+    if isinstance(value, (int, float)) and not isinstance(operand, (int, float)):
+        try:
+            operand = float(operand)
+        except (TypeError, ValueError):
+            value = str(value)
+    elif isinstance(operand, (int, float)) and not isinstance(value, (int, float)):
+        try:
+            value = float(value or 0)
+        except (TypeError, ValueError):
+            operand = str(operand)
+    if value is None:
+        value = ""
+
+    if op in ("=", "=="):
+        return value == operand
+    if op == "!=":
+        return value != operand
+    if op == ">":
+        return value > operand
+    if op == ">=":
+        return value >= operand
+    if op == "<":
+        return value < operand
+    if op == "<=":
+        return value <= operand
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    if value is None or value == "":
+        return (0, "")
+    if isinstance(value, (int, float)):
+        return (1, value)
+    return (2, str(value))
+
+
+def _normalize_filters(filters: Any) -> List[Tuple[str, str, Any]]:
+    if not filters:
+        return []
+    if isinstance(filters, dict):
+        out = []
+        for f, v in filters.items():
+            if isinstance(v, (list, tuple)) and len(v) == 2:
+                out.append((f, v[0], v[1]))
+            else:
+                out.append((f, "=", v))
+        return out
+    out = []
+    for flt in filters:
+        if len(flt) == 4:  # [doctype, field, op, value]
+            flt = flt[1:]
+        out.append((flt[0], flt[1], flt[2]))
+    return out
+
+
+def query(
+    rows: List[Dict[str, Any]],
+    *,
+    fields: Optional[List[str]] = None,
+    filters: Any = None,
+    order_by: Optional[str] = None,
+    start: int = 0,
+    page_length: int = 20,
+) -> List[Dict[str, Any]]:
+    """Evaluate a ``/api/resource`` list request against in-memory rows."""
+    conds = _normalize_filters(filters)
+    matched = [r for r in rows if all(_compare(r.get(f), op, v) for f, op, v in conds)]
+
+    for clause in reversed([c.strip() for c in (order_by or "modified desc").split(",") if c.strip()]):
+        parts = clause.replace("`", "").split()
+        key = parts[0].split(".")[-1]
+        desc = len(parts) > 1 and parts[1].lower() == "desc"
+        matched.sort(key=lambda r: _sort_key(r.get(key)), reverse=desc)
+
+    if page_length:
+        matched = matched[start:start + page_length]
+    else:
+        matched = matched[start:]
+
+    fields = fields or ["name"]
+    if "*" in fields:
+        return [dict(r) for r in matched]
+    return [{f: r.get(f) for f in fields} for r in matched]
+
+
+# ---------------------------------------------------------------------------
+# Stand-in
+# ---------------------------------------------------------------------------
+
+class ERPNextStandIn:
+    """In-memory ERPNext answering the REST calls this project makes.
+
+    ``latency_ms`` / ``jitter_ms`` delay every response (a uniform
+    ``± jitter`` around the mean); ``error_rate`` is the fraction of calls
+    answered with a 503.  All randomness comes from ``seed``.
+    """
+
+    def __init__(
+        self,
+        *,
+        catalog_size: int = 500,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        recording: Optional[str] = None,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counters: Dict[str, itertools.count] = {}
+        self.calls = 0
+
+        if recording:
+            with open(recording, encoding="utf-8") as fh:
+                dataset = json.load(fh)
+        else:
+            dataset = synthetic_dataset(catalog_size, seed)
+        self._docs: Dict[str, Dict[str, Dict[str, Any]]] = {dt: {} for dt in DOCTYPES}
+        for doctype, rows in dataset.items():
+            table = self._docs.setdefault(doctype, {})
+            for row in rows:
+                table[row.get("name") or row.get("item_code")] = row
+
+    # -- simulation ---------------------------------------------------------
+
+    def delay(self) -> float:
+        """Seconds the next response should take."""
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(self.latency_ms + jitter, 0.0) / 1000.0
+
+    def _fails(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    # -- documents ----------------------------------------------------------
+
+    def _new_name(self, doctype: str, doc: Dict[str, Any]) -> str:
+        series = _SERIES.get(doctype)
+        if series:
+            counter = self._counters.setdefault(doctype, itertools.count(1))
+            return series.format(year=datetime.now().year, n=next(counter))
+        if doctype == "Customer":
+            base = doc.get("customer_name") or "Customer"
+        elif doctype == "Address":
+            base = f"{doc.get('address_title') or 'Address'}-{doc.get('address_type') or 'Billing'}"
+        elif doctype == "Contact":
+            base = doc.get("first_name") or "Contact"
+        else:
+            base = doc.get("item_code") or doctype
+        name, n = base, 1
+        while name in self._docs.get(doctype, {}):
+            name = f"{base}-{n}"
+            n += 1
+        return name
+
+    def insert(self, doctype: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            doc = dict(doc, doctype=doctype)
+            doc["name"] = doc.get("name") or self._new_name(doctype, doc)
+            doc.setdefault("docstatus", 0)
+            doc["creation"] = doc["modified"] = _now()
+            self._docs.setdefault(doctype, {})[doc["name"]] = doc
+            return dict(doc)
+
+    def update(self, doctype: str, name: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            doc = self._docs.get(doctype, {}).get(name)
+            if doc is None:
+                return None
+            submitted = doc.get("docstatus") == 0 and changes.get("docstatus") == 1
+            doc.update(changes)
+            doc["modified"] = _now()
+            result = dict(doc)
+        if doctype == "Sales Order" and submitted:
+            self._invoice_sales_order(result)
+        return result
+
+    def _invoice_sales_order(self, so: Dict[str, Any]) -> None:
+        """Submitting a Sales Order bills it, so invoice webhooks can be replayed."""
+        items = [
+            {"item_code": row.get("item_code"), "qty": row.get("qty"), "sales_order": so["name"]}
+            for row in so.get("items") or []
+        ]
+        self.insert("Sales Invoice", {
+            "customer": so.get("customer"),
+            "items": items,
+            "docstatus": 1,
+        })
+
+    def get(self, doctype: str, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            doc = self._docs.get(doctype, {}).get(name)
+            return dict(doc) if doc is not None else None
+
+    def delete(self, doctype: str, name: str) -> bool:
+        with self._lock:
+            return self._docs.get(doctype, {}).pop(name, None) is not None
+
+    def rows(self, doctype: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._docs.get(doctype, {}).values())
+
+    # -- HTTP ---------------------------------------------------------------
+
+    def handle(self, method: str, path: str, params: Dict[str, str], body: bytes) -> Response:
+        """Answer one request; returns ``(status, content_type, body)``."""
+        with self._lock:
+            self.calls += 1
+        if self._fails():
+            return _json(503, {"exc_type": "ServiceUnavailable", "message": "stand-in injected error"})
+
+        path = unquote(path)
+        if path == _PDF_PATH:
+            return self._pdf(params)
+        if path == _COUNT_PATH:
+            return self._count(params)
+
+        m = _RESOURCE_RE.match(path)
+        if not m:
+            return _json(404, {"exc_type": "DoesNotExistError", "message": f"Not found: {path}"})
+        doctype, name = m.group(1), m.group(2)
+        if doctype not in self._docs:
+            return _json(404, {"exc_type": "DoesNotExistError", "message": f"DocType {doctype} not found"})
+
+        method = method.upper()
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            return _json(400, {"exc_type": "ValidationError", "message": "Invalid JSON body"})
+        data = payload.get("data", payload) if isinstance(payload, dict) else {}
+
+        if name is None and method == "GET":
+            try:
+                rows = query(
+                    self.rows(doctype),
+                    fields=json.loads(params["fields"]) if params.get("fields") else None,
+                    filters=json.loads(params["filters"]) if params.get("filters") else None,
+                    order_by=params.get("order_by"),
+                    start=int(params.get("limit_start") or 0),
+                    page_length=int(params.get("limit_page_length") or params.get("limit") or 20),
+                )
+            except ValueError as exc:
+                return _json(417, {"exc_type": "DataError", "message": str(exc)})
+            return _json(200, {"data": rows})
+        if name is None and method == "POST":
+            return _json(200, {"data": self.insert(doctype, data)})
+
+        if method == "GET":
+            doc = self.get(doctype, name)
+        elif method == "PUT":
+            doc = self.update(doctype, name, data)
+        elif method == "DELETE":
+            doc = {"message": "ok"} if self.delete(doctype, name) else None
+            if doc:
+                return _json(202, doc)
+        else:
+            return _json(405, {"exc_type": "MethodNotAllowed", "message": method})
+        if doc is None:
+            return _json(404, {"exc_type": "DoesNotExistError", "message": f"{doctype} {name} not found"})
+        return _json(200, {"data": doc})
+
+    def _count(self, params: Dict[str, str]) -> Response:
+        doctype = params.get("doctype", "")
+        if doctype not in self._docs:
+            return _json(404, {"exc_type": "DoesNotExistError", "message": f"DocType {doctype} not found"})
+        try:
+            rows = query(
+                self.rows(doctype),
+                filters=json.loads(params["filters"]) if params.get("filters") else None,
+                page_length=0,
+            )
+        except ValueError as exc:
+            return _json(417, {"exc_type": "DataError", "message": str(exc)})
+        return _json(200, {"message": len(rows)})
+
+    def _pdf(self, params: Dict[str, str]) -> Response:
+        doctype, name = params.get("doctype", ""), params.get("name", "")
+        if self.get(doctype, name) is None:
+            return _json(404, {"exc_type": "DoesNotExistError", "message": f"{doctype} {name} not found"})
+        return 200, "application/pdf", _minimal_pdf(f"{doctype} {name}")
+
+
+def _json(status: int, payload: Dict[str, Any]) -> Response:
+    return status, "application/json", json.dumps(payload, default=str).encode()
+
+
+def _minimal_pdf(title: str) -> bytes:
+    text = title.replace("\\", "").replace("(", "").replace(")", "")
+    stream = f"BT /F1 18 Tf 72 720 Td ({text}) Tj ET".encode("latin-1", "replace")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (i, obj))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for off in offsets:
+        out.write(b"%010d 00000 n \n" % off)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# Transport adapter (in-process)
+# ---------------------------------------------------------------------------
+
+class StandInAdapter(BaseAdapter):
+    """requests adapter that answers from an ``ERPNextStandIn``.
+
+    Simulated latency longer than the read timeout raises
+    ``requests.ReadTimeout`` after the timeout, like a slow server would.
+    """
+
+    def __init__(self, standin: ERPNextStandIn) -> None:
+        super().__init__()
+        self.standin = standin
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        delay = self.standin.delay()
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+        if read_timeout is not None and delay > read_timeout:
+            time.sleep(read_timeout)
+            raise requests.ReadTimeout(f"stand-in read timed out after {read_timeout}s", request=request)
+        if delay:
+            time.sleep(delay)
+
+        parts = urlsplit(request.url)
+        body = request.body or b""
+        if isinstance(body, str):
+            body = body.encode()
+        status, content_type, content = self.standin.handle(
+            request.method, parts.path, dict(parse_qsl(parts.query)), body,
+        )
+
+        resp = requests.Response()
+        resp.status_code = status
+        resp.headers = CaseInsensitiveDict({
+            "Content-Type": content_type,
+            "Content-Length": str(len(content)),
+        })
+        resp._content = content
+        resp.encoding = "utf-8"
+        resp.url = request.url
+        resp.request = request
+        resp.reason = "OK" if status < 400 else "Error"
+        return resp
+
+    def close(self) -> None:
+        pass
+
+
+_standin_lock = threading.Lock()
+_standin: Optional[ERPNextStandIn] = None
+
+
+def standin_from_settings() -> ERPNextStandIn:
+    return ERPNextStandIn(
+        catalog_size=getattr(settings, "ERPNEXT_STANDIN_CATALOG_SIZE", 500),
+        latency_ms=getattr(settings, "ERPNEXT_STANDIN_LATENCY_MS", 0.0),
+        jitter_ms=getattr(settings, "ERPNEXT_STANDIN_JITTER_MS", 0.0),
+        error_rate=getattr(settings, "ERPNEXT_STANDIN_ERROR_RATE", 0.0),
+        seed=getattr(settings, "ERPNEXT_STANDIN_SEED", 0),
+        recording=getattr(settings, "ERPNEXT_STANDIN_RECORDING", "") or None,
+    )
+
+
+def get_standin() -> ERPNextStandIn:
+    """Process-wide stand-in used when ``ERPNEXT_STANDIN`` is enabled."""
+    global _standin
+    with _standin_lock:
+        if _standin is None:
+            _standin = standin_from_settings()
+        return _standin
+
+
+# ---------------------------------------------------------------------------
+# HTTP server
+# ---------------------------------------------------------------------------
+
+def make_server(standin: ERPNextStandIn, host: str = "127.0.0.1", port: int = 8001) -> ThreadingHTTPServer:
+    """Return a threaded HTTP server serving ``standin`` (call ``serve_forever``)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like ERPNext behind nginx
+
+        def _dispatch(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            delay = standin.delay()
+            if delay:
+                time.sleep(delay)
+            parts = urlsplit(self.path)
+            status, content_type, content = standin.handle(
+                self.command, parts.path, dict(parse_qsl(parts.query)), body,
+            )
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        do_GET = do_POST = do_PUT = do_DELETE = _dispatch
+
+        def log_message(self, format, *args):
+            logger.debug("stand-in %s", format % args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+# ---------------------------------------------------------------------------
+# Recording
+# ---------------------------------------------------------------------------
+
+_RECORD_FIELDS = {
+    "Item": ["*"],
+    "Bin": ["name", "item_code", "warehouse", "actual_qty", "modified"],
+}
+
+
+def record(client, path: str, doctypes=("Item", "Bin")) -> Dict[str, int]:
+    """Snapshot ``doctypes`` from a live ERPNext into a replayable JSON file."""
+    dataset: Dict[str, List[Dict[str, Any]]] = {}
+    for doctype in doctypes:
+        dataset[doctype] = list(client.iter_resource(
+            doctype,
+            fields=_RECORD_FIELDS.get(doctype, ["*"]),
+            order_by="modified desc",
+        ))
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(dataset, fh, ensure_ascii=False, default=str)
+    return {doctype: len(rows) for doctype, rows in dataset.items()}
@@ -0,0 +1,50 @@
+import pickle
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from integration.erp_standin import synthetic_dataset
+from web.erp_services import _map_erp_item
+
+
+def _measure(products, repeat):
+    blob = pickle.dumps(products, pickle.HIGHEST_PROTOCOL)
+    dumps = loads = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pickle.dumps(products, pickle.HIGHEST_PROTOCOL)
+        dumps = min(dumps, time.perf_counter() - start)
+        start = time.perf_counter()
+        pickle.loads(blob)
+        loads = min(loads, time.perf_counter() - start)
+    tracemalloc.start()
+    loaded = pickle.loads(blob)
+    heap = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del loaded
+    n = len(products) or 1
+    return len(blob) / n, heap / n, dumps * 1000, loads * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the cached size and pickle cost of the catalog as plain product "
+        "dicts versus ProductRecords, over a synthetic catalog."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=10000)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--repeat", type=int, default=5, help="Best of N timings.")
+
+    def handle(self, *args, **options):
+        items = synthetic_dataset(options["items"], seed=options["seed"])["Item"]
+        records = [_map_erp_item(i) for i in items]
+        layouts = {"dict": [p.to_dict() for p in records], "record": records}
+
+        self.stdout.write(f"{len(records)} products, best of {options['repeat']}")
+        self.stdout.write(f"{'layout':<8} {'pickle B/item':>14} {'heap B/item':>12} {'dumps ms':>9} {'loads ms':>9}")
+        for name, products in layouts.items():
+            size, heap, dumps, loads = _measure(products, options["repeat"])
+            self.stdout.write(f"{name:<8} {size:>14.0f} {heap:>12.0f} {dumps:>9.1f} {loads:>9.1f}")
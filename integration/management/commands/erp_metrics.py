@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from integration import erp_metrics
+
+
+class Command(BaseCommand):
+    help = "Report ERPNext call latency / error metrics merged across all workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            choices=["table", "json", "prometheus"],
+            default="table",
+        )
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help="Remove metrics files of workers that are no longer running.",
+        )
+
+    def handle(self, *args, **options):
+        series = erp_metrics.collect(prune=options["prune"])
+        fmt = options["format"]
+
+        if fmt == "prometheus":
+            self.stdout.write(erp_metrics.render_prometheus(series), ending="")
+            return
+        rows = erp_metrics.summarize(series)
+        if fmt == "json":
+            self.stdout.write(json.dumps(rows, indent=2))
+            return
+
+        if not rows:
+            self.stdout.write(f"No ERPNext metrics recorded in {erp_metrics.metrics_dir()}")
+            return
+        header = f"{'endpoint':<52} {'count':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'retry':>6} {'tmo':>5} {'err':>5} {'rej':>5} {'KiB':>9}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for r in rows:
+            fmt_ms = lambda v: f"{v:.0f}ms" if v is not None else "-"
+            self.stdout.write(
+                f"{r['endpoint'][:52]:<52} {r['count']:>7} {fmt_ms(r['p50_ms']):>8} "
+                f"{fmt_ms(r['p95_ms']):>8} {fmt_ms(r['p99_ms']):>8} {r['retries']:>6} "
+                f"{r['timeouts']:>5} {r['errors']:>5} {r['rejected']:>5} {r['bytes'] / 1024:>9.1f}"
+            )
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from integration.erp_client import ERPNextError, get_erp_client
+from integration.erp_standin import ERPNextStandIn, make_server, record
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve an offline ERPNext stand-in over HTTP (point ERPNEXT_BASE_URL at it), "
+        "or --record a replayable snapshot of Items and Bins from the live ERPNext."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8001)
+        parser.add_argument(
+            "--catalog-size",
+            type=int,
+            default=settings.ERPNEXT_STANDIN_CATALOG_SIZE,
+            help="Number of synthetic Items (ignored with --recording).",
+        )
+        parser.add_argument("--latency-ms", type=float, default=settings.ERPNEXT_STANDIN_LATENCY_MS)
+        parser.add_argument("--jitter-ms", type=float, default=settings.ERPNEXT_STANDIN_JITTER_MS)
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=settings.ERPNEXT_STANDIN_ERROR_RATE,
+            help="Fraction of calls answered with 503 (0-1).",
+        )
+        parser.add_argument("--seed", type=int, default=settings.ERPNEXT_STANDIN_SEED)
+        parser.add_argument(
+            "--recording",
+            default=settings.ERPNEXT_STANDIN_RECORDING,
+            help="Replay Items/Bins from this recording instead of a synthetic catalog.",
+        )
+        parser.add_argument(
+            "--record",
+            metavar="PATH",
+            help="Record Items and Bins from the configured ERPNext to PATH and exit.",
+        )
+
+    def handle(self, *args, **options):
+        if options["record"]:
+            try:
+                counts = record(get_erp_client(), options["record"])
+            except ERPNextError as exc:
+                raise CommandError(f"Recording failed: {exc}") from exc
+            summary = ", ".join(f"{n} {doctype}" for doctype, n in counts.items())
+            self.stdout.write(self.style.SUCCESS(f"Recorded {summary} to {options['record']}"))
+            return
+
+        standin = ERPNextStandIn(
+            catalog_size=options["catalog_size"],
+            latency_ms=options["latency_ms"],
+            jitter_ms=options["jitter_ms"],
+            error_rate=options["error_rate"],
+            seed=options["seed"],
+            recording=options["recording"] or None,
+        )
+        server = make_server(standin, options["host"], options["port"])
+        source = options["recording"] or f"synthetic catalog of {options['catalog_size']}"
+        self.stdout.write(
+            f"ERPNext stand-in ({source}) on http://{options['host']}:{options['port']} "
+            f"latency={options['latency_ms']}±{options['jitter_ms']}ms error_rate={options['error_rate']}"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
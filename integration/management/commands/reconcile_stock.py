@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from integration.erp_client import ERPNextError
+from web import erp_services
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every item's stock from all ERPNext Bins and fix the local "
+        "ProductStock table and stock cache where they drifted (STOCK_PUSH)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Keep running, reconciling every INTERVAL seconds.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            try:
+                stats = erp_services.reconcile_stock()
+            except ERPNextError as exc:
+                if not options["interval"]:
+                    raise CommandError(f"ERPNext stock fetch failed: {exc}") from exc
+                self.stderr.write(f"ERPNext stock fetch failed: {exc}")
+            else:
+                self.stdout.write(
+                    f"stock reconciled: {stats['items']} items, {stats['changed']} changed "
+                    f"in {time.monotonic() - started:.1f}s"
+                )
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from integration.erp_client import ERPNextError
+from web import erp_services
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy ERPNext Items and stock into the local Product / ProductStock mirror "
+        "(read by the site when CATALOG_SOURCE is db or sql)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Fetch every Item and drop mirrored Items deleted in ERPNext "
+                 "(default: only Items modified since the last sync).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Keep running, syncing incrementally every INTERVAL seconds.",
+        )
+
+    def handle(self, *args, **options):
+        full = options["full"]
+        while True:
+            started = time.monotonic()
+            try:
+                stats = erp_services.sync_mirror(full=full)
+            except ERPNextError as exc:
+                if not options["interval"]:
+                    raise CommandError(f"ERPNext sync failed: {exc}") from exc
+                self.stderr.write(f"ERPNext sync failed: {exc}")
+            else:
+                self.stdout.write(
+                    f"{stats['mode']} sync: {stats['fetched']} fetched, {stats['upserted']} upserted, "
+                    f"{stats['removed']} removed in {time.monotonic() - started:.1f}s"
+                )
+            if not options["interval"]:
+                return
+            full = False
+            time.sleep(options["interval"])
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from web import warmup
+
+
+class Command(BaseCommand):
+    help = (
+        "Fetch the catalog and build every index, derived cache and translation "
+        "table a first request needs, reporting how long each stage took."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Refetch the catalog from ERPNext even if a cached copy is fresh.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        for stage, seconds, detail in warmup.warm(force=options["force"]):
+            self.stdout.write(f"{stage:<15} {seconds * 1000:>9.1f} ms  {detail}")
+        self.stdout.write(f"{'total':<15} {(time.perf_counter() - started) * 1000:>9.1f} ms")
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_code', models.CharField(max_length=140, unique=True)),
+                ('actual_qty', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_code', models.CharField(max_length=140, unique=True)),
+                ('item_name', models.CharField(blank=True, max_length=255)),
+                ('name_ar', models.CharField(blank=True, max_length=255)),
+                ('brand', models.CharField(blank=True, db_index=True, max_length=140)),
+                ('item_group', models.CharField(blank=True, db_index=True, max_length=140)),
+                ('price', models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=12)),
+                ('disabled', models.BooleanField(db_index=True, default=False)),
+                ('modified', models.CharField(blank=True, max_length=32)),
+                ('grade', models.CharField(blank=True, max_length=20)),
+                ('keyboard_layout', models.CharField(blank=True, max_length=20)),
+                ('includes_charger', models.BooleanField(default=False)),
+                ('cpu_family', models.CharField(blank=True, max_length=40)),
+                ('ram_gb', models.PositiveIntegerField(blank=True, null=True)),
+                ('storage_gb', models.PositiveIntegerField(blank=True, null=True)),
+                ('gpu_class', models.CharField(blank=True, max_length=20)),
+                ('screen_inches', models.DecimalField(blank=True, decimal_places=1, max_digits=4, null=True)),
+                ('search_text', models.TextField(blank=True)),
+                ('sort_name_en', models.CharField(blank=True, max_length=255)),
+                ('sort_name_ar', models.CharField(blank=True, max_length=255)),
+                ('data', models.JSONField(default=dict)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['disabled', '-modified'], name='product_listing_idx'), models.Index(fields=['disabled', 'price'], name='product_price_idx'), models.Index(fields=['disabled', 'sort_name_en'], name='product_name_en_idx'), models.Index(fields=['disabled', 'sort_name_ar'], name='product_name_ar_idx')],
+            },
+        ),
+    ]
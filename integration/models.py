@@ -1,3 +1,59 @@
 from django.db import models
 
-# Create your models here.
+
+class Product(models.Model):
+    """Local mirror of an ERPNext Item (see ``web.catalog_mirror``).
+
+    ``data`` holds the product in dict layout (``dict(_map_erp_item(...))``); the
+    other columns copy the parts of it that are filtered / sorted in SQL.
+    """
+
+    item_code = models.CharField(max_length=140, unique=True)
+    item_name = models.CharField(max_length=255, blank=True)
+    name_ar = models.CharField(max_length=255, blank=True)
+    brand = models.CharField(max_length=140, blank=True, db_index=True)
+    item_group = models.CharField(max_length=140, blank=True, db_index=True)
+    price = models.DecimalField(max_digits=12, decimal_places=2, default=0, db_index=True)  # type: ignore
+    disabled = models.BooleanField(default=False, db_index=True)
+    modified = models.CharField(max_length=32, blank=True)  # ERPNext "YYYY-MM-DD HH:MM:SS.ffffff"
+
+    # Facet columns
+    grade = models.CharField(max_length=20, blank=True)
+    keyboard_layout = models.CharField(max_length=20, blank=True)
+    includes_charger = models.BooleanField(default=False)
+    cpu_family = models.CharField(max_length=40, blank=True)
+    ram_gb = models.PositiveIntegerField(null=True, blank=True)
+    storage_gb = models.PositiveIntegerField(null=True, blank=True)
+    gpu_class = models.CharField(max_length=20, blank=True)
+    screen_inches = models.DecimalField(max_digits=4, decimal_places=1, null=True, blank=True)
+
+    # Normalized text (web.search_index.normalize) for search and name sorts
+    search_text = models.TextField(blank=True)
+    sort_name_en = models.CharField(max_length=255, blank=True)
+    sort_name_ar = models.CharField(max_length=255, blank=True)
+
+    data = models.JSONField(default=dict)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Listing order and the per-sort plans of the products page
+            models.Index(fields=["disabled", "-modified"], name="product_listing_idx"),
+            models.Index(fields=["disabled", "price"], name="product_price_idx"),
+            models.Index(fields=["disabled", "sort_name_en"], name="product_name_en_idx"),
+            models.Index(fields=["disabled", "sort_name_ar"], name="product_name_ar_idx"),
+        ]
+
+    def __str__(self):
+        return self.item_code
+
+
+class ProductStock(models.Model):
+    """Aggregated Bin ``actual_qty`` of one item across warehouses."""
+
+    item_code = models.CharField(max_length=140, unique=True)
+    actual_qty = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.item_code}: {self.actual_qty:g}"
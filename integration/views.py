@@ -1,3 +1,46 @@
-from django.shortcuts import render
+from django.http import HttpResponse
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from web.catalog_cache import get_cache_stats, get_layer_stats
+from web.erp_services import catalog_version, get_sync_stats
+
+from . import erp_metrics
+from .erp_client import get_circuit_states, get_limiter_stats, get_pool_stats
+
+
+class ERPNextStatusView(APIView):
+    """Staff-only snapshot of this worker's ERPNext client state."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            "pool": get_pool_stats(),
+            "circuits": get_circuit_states(),
+            "limiter": get_limiter_stats(),
+            "catalog_cache": get_cache_stats(),
+            "cache_layers": get_layer_stats(),
+            "catalog_sync": {**get_sync_stats(), "version": catalog_version()},
+        })
+
+
+class ERPNextMetricsView(APIView):
+    """Staff-only ERPNext latency / error metrics merged across workers.
+
+    ``?output=prometheus`` returns the Prometheus text format (scrape with
+    HTTP basic auth as a staff user); the default is a JSON summary with
+    p50/p95/p99 per endpoint.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        series = erp_metrics.collect()
+        if request.query_params.get("output") == "prometheus":
+            return HttpResponse(
+                erp_metrics.render_prometheus(series),
+                content_type="text/plain; version=0.0.4; charset=utf-8",
+            )
+        return Response({"endpoints": erp_metrics.summarize(series)})
@@ -18,8 +18,14 @@ from rest_framework.response import Response
 from rest_framework import permissions, status
 from rest_framework.parsers import JSONParser, BaseParser
 
-from integration.erp_client import ERPNextError, get_erp_client
+from integration.erp_client import BACKGROUND, ERPNextError, erp_priority, get_erp_client
 from .models import Order
+from web.erp_services import (
+    apply_item_change,
+    catalog_patches_are_shared,
+    queue_stock_refresh,
+    stock_pushes_are_shared,
+)
 from web.whatsapp import send_sales_invoice_pdf
 
 logger = logging.getLogger(__name__)
@@ -33,8 +39,24 @@ class PlainTextJSONParser(BaseParser):
         return json.loads(stream.read())
 
 
+def _secret_mismatch(request):
+    """403 response when ERPNEXT_WEBHOOK_SECRET is set and not sent, else None."""
+    webhook_secret = getattr(settings, "ERPNEXT_WEBHOOK_SECRET", "")
+    if webhook_secret:
+        received_sig = request.headers.get("X-Webhook-Secret", "")
+        if not hmac.compare_digest(webhook_secret, received_sig):
+            logger.warning("ERPNext webhook secret mismatch")
+            return Response({"error": "Invalid signature"}, status=status.HTTP_403_FORBIDDEN)
+    return None
+
+
 def _process_sales_invoice_webhook(invoice_name: str) -> None:
     """Background task: fetch Sales Invoice details, find linked Order, send PDF."""
+    with erp_priority(BACKGROUND):
+        _handle_sales_invoice(invoice_name)
+
+
+def _handle_sales_invoice(invoice_name: str) -> None:
     try:
         client = get_erp_client()
 
@@ -98,12 +120,9 @@ class ERPNextSalesInvoiceWebhook(APIView):
 
     def post(self, request):
         # Verify webhook secret (optional but recommended)
-        webhook_secret = getattr(settings, "ERPNEXT_WEBHOOK_SECRET", "")
-        if webhook_secret:
-            received_sig = request.headers.get("X-Webhook-Secret", "")
-            if not hmac.compare_digest(webhook_secret, received_sig):
-                logger.warning("ERPNext webhook secret mismatch")
-                return Response({"error": "Invalid signature"}, status=status.HTTP_403_FORBIDDEN)
+        denied = _secret_mismatch(request)
+        if denied:
+            return denied
 
         invoice_name = request.data.get("name")
         if not invoice_name:
@@ -120,3 +139,130 @@ class ERPNextSalesInvoiceWebhook(APIView):
         thread.start()
 
         return Response({"status": "accepted", "invoice": invoice_name})
+
+
+ITEM_EVENTS = ("on_update", "on_trash")
+
+
+def _process_item_webhook(item_code: str, event: str) -> None:
+    """Background task: apply a changed / deleted Item to the cached catalog."""
+    try:
+        with erp_priority(BACKGROUND):
+            apply_item_change(item_code, deleted=event == "on_trash")
+    except ERPNextError as exc:
+        # The next catalog poll picks the change up.
+        logger.warning("Failed to process Item webhook (%s): %s", item_code, exc)
+    except Exception as exc:
+        logger.exception("Unexpected error processing Item webhook: %s", exc)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class ERPNextItemWebhook(APIView):
+    """Receives webhooks from ERPNext when an Item is saved or deleted.
+
+    Prices and availability reach the site within seconds, so the catalog
+    poll (CATALOG_CACHE_SECONDS) can be raised to hours.  Needs a catalog
+    shared by all workers (CACHE_BACKEND=shared or CATALOG_SNAPSHOT_DIR):
+    otherwise the webhook answers 503 rather than patch just the worker
+    that received it.
+
+    Configure in ERPNext (one webhook per event):
+      Webhook Doctype: Item
+      DocType Event: on_update / on_trash
+      Request URL: https://your-domain.com/api/webhooks/erpnext/item/
+      Request Method: POST
+      Webhook Headers: X-Webhook-Secret = <your secret>
+      Webhook Data: { "name": "{{ doc.name }}", "event": "on_update" }   (or "on_trash")
+    """
+
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []  # No auth required, we verify via secret
+    parser_classes = [JSONParser, PlainTextJSONParser]  # Accept both JSON and text/plain
+
+    def post(self, request):
+        denied = _secret_mismatch(request)
+        if denied:
+            return denied
+
+        item_code = request.data.get("name")
+        event = request.data.get("event") or "on_update"
+        if not item_code:
+            return Response({"error": "Missing 'name' in payload"}, status=status.HTTP_400_BAD_REQUEST)
+        if event not in ITEM_EVENTS:
+            return Response({"error": f"Unsupported event '{event}'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not catalog_patches_are_shared():
+            logger.error(
+                "Item webhook for %s refused: set CACHE_BACKEND=shared or CATALOG_SNAPSHOT_DIR "
+                "so the patch reaches every worker", item_code,
+            )
+            return Response(
+                {"error": "Item webhook needs CACHE_BACKEND=shared or CATALOG_SNAPSHOT_DIR"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+        logger.info("Received Item webhook (%s) for: %s", event, item_code)
+
+        # Process in background thread so ERPNext doesn't timeout
+        thread = threading.Thread(
+            target=_process_item_webhook,
+            args=(item_code, event),
+            daemon=True,
+        )
+        thread.start()
+
+        return Response({"status": "accepted", "item": item_code, "event": event})
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class ERPNextStockWebhook(APIView):
+    """Receives webhooks from ERPNext when an item's stock changes.
+
+    The item's Bins are summed (batched with other calls arriving at the
+    same time) and the total written to the stock cache and ProductStock,
+    so product and cart pages read stock without calling ERPNext.  Answers
+    503 unless STOCK_PUSH is on and the cache is shared by all workers
+    (CACHE_BACKEND=shared), like the Item webhook.
+
+    Configure in ERPNext (either doctype works; Bin is the cheaper one):
+      Webhook Doctype: Bin  (or Stock Ledger Entry)
+      DocType Event: on_update  (on_submit / on_cancel for Stock Ledger Entry)
+      Request URL: https://your-domain.com/api/webhooks/erpnext/stock/
+      Request Method: POST
+      Webhook Headers: X-Webhook-Secret = <your secret>
+      Webhook Data: { "item_code": "{{ doc.item_code }}" }
+    """
+
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []  # No auth required, we verify via secret
+    parser_classes = [JSONParser, PlainTextJSONParser]  # Accept both JSON and text/plain
+
+    def post(self, request):
+        denied = _secret_mismatch(request)
+        if denied:
+            return denied
+
+        item_code = request.data.get("item_code")
+        if not item_code:
+            return Response({"error": "Missing 'item_code' in payload"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not getattr(settings, "STOCK_PUSH", False):
+            logger.error("Stock webhook for %s refused: STOCK_PUSH is off", item_code)
+            return Response(
+                {"error": "Stock webhook needs STOCK_PUSH=1"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        if not stock_pushes_are_shared():
+            logger.error(
+                "Stock webhook for %s refused: set CACHE_BACKEND=shared "
+                "so the update reaches every worker", item_code,
+            )
+            return Response(
+                {"error": "Stock webhook needs CACHE_BACKEND=shared"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+        # Queued: refreshed in the background with one Bin query per batch
+        queue_stock_refresh([item_code])
+
+        return Response({"status": "accepted", "item": item_code})
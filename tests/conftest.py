@@ -31,3 +31,27 @@ def auth_client(api_client, user):
 def staff_client(api_client, staff):
     api_client.force_authenticate(user=staff)
     return api_client
+
+
+@pytest.fixture(autouse=True)
+def erp_metrics_dir(settings, tmp_path):
+    """Keep ERPNext call metrics written by tests out of the shared temp dir."""
+    from integration import erp_metrics
+
+    settings.ERPNEXT_METRICS_DIR = str(tmp_path / "erp-metrics")
+    erp_metrics.reset()
+    yield settings.ERPNEXT_METRICS_DIR
+    erp_metrics.reset()
+
+
+@pytest.fixture(autouse=True)
+def catalog_lkg_path(settings, tmp_path):
+    """Keep the last known good catalog saved by tests out of the shared temp dir."""
+    from web import catalog_lkg, erp_services
+
+    settings.CATALOG_LKG_PATH = str(tmp_path / "catalog-lkg.pickle")
+    catalog_lkg.reset()
+    yield settings.CATALOG_LKG_PATH
+    if erp_services._lkg_thread is not None:
+        erp_services._lkg_thread.join()  # written before the setting is restored
+    catalog_lkg.reset()
@@ -0,0 +1,184 @@
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from integration.erp_client import ERPNextUnavailable
+from web import catalog_cache
+from web.catalog_cache import (
+    get_cache_stats,
+    get_many_or_fetch,
+    get_or_fetch,
+    get_stamp,
+    is_degraded,
+    request_memo,
+    store,
+)
+from web.middleware import CatalogMemoMiddleware
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    cache.clear()
+    catalog_cache._stats.reset()
+    yield
+    cache.clear()
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_concurrent_misses_share_one_fetch():
+    calls = []
+    started = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return ["catalog"]
+
+    results = []
+    get = lambda: results.append(get_or_fetch("k", fetch, soft_ttl=60, hard_ttl=600))
+    leader = threading.Thread(target=get)
+    leader.start()
+    started.wait(1)
+    followers = [threading.Thread(target=get) for _ in range(5)]
+    for t in followers:
+        t.start()
+    for t in [leader, *followers]:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [["catalog"]] * 6
+    stats = get_cache_stats()
+    assert stats["fetches"] == 1
+    assert stats["coalesced"] == 5
+
+
+def test_soft_expired_value_is_served_while_refreshing():
+    get_or_fetch("k", lambda: "v1", soft_ttl=0, hard_ttl=600)
+
+    assert get_or_fetch("k", lambda: "v2", soft_ttl=60, hard_ttl=600) == "v1"
+    assert _wait_for(lambda: cache.get("k")["value"] == "v2")
+    assert get_cache_stats()["served_stale"] == 1
+
+
+def test_hard_expired_value_blocks_on_refresh():
+    get_or_fetch("k", lambda: "v1", soft_ttl=0, hard_ttl=0)
+
+    assert get_or_fetch("k", lambda: "v2", soft_ttl=60, hard_ttl=600) == "v2"
+
+
+def test_failed_refresh_serves_stale_value_in_degraded_mode():
+    get_or_fetch("k", lambda: "v1", soft_ttl=0, hard_ttl=0)
+
+    def down():
+        raise ERPNextUnavailable("ERPNext circuit open")
+
+    assert get_or_fetch("k", down, soft_ttl=60, hard_ttl=600) == "v1"
+    assert is_degraded("k") and get_stamp("k")["degraded"]
+    # Degraded entries never block, even past their hard expiry.
+    assert get_or_fetch("k", down, soft_ttl=60, hard_ttl=600) == "v1"
+
+
+def test_errors_without_previous_value_propagate():
+    def down():
+        raise ERPNextUnavailable("down")
+
+    with pytest.raises(ERPNextUnavailable):
+        get_or_fetch("k", down, soft_ttl=60, hard_ttl=600)
+    assert cache.get("k") is None
+
+
+def test_other_worker_holding_lock_serves_previous_value():
+    get_or_fetch("k", lambda: "old", soft_ttl=0, hard_ttl=0)
+    cache.add("k:lock", "other-worker")
+
+    assert get_or_fetch("k", lambda: "new", soft_ttl=60, hard_ttl=600) == "old"
+    assert get_cache_stats()["served_previous"] == 1
+
+
+def test_request_memo_reads_each_key_once(monkeypatch):
+    store("k", ["catalog"], soft_ttl=60, hard_ttl=600)
+    reads = []
+    real_get = cache.get
+    monkeypatch.setattr(cache, "get", lambda key, *a, **kw: reads.append(key) or real_get(key, *a, **kw))
+
+    with request_memo() as memo:
+        first = get_or_fetch("k", lambda: "unused", soft_ttl=60, hard_ttl=600)
+        assert get_or_fetch("k", lambda: "unused", soft_ttl=60, hard_ttl=600) is first
+        assert get_stamp("k") == get_stamp("k")
+        assert get_stamp("missing") is None and get_stamp("missing") is None
+    assert sorted(reads) == ["k", "k:version", "missing:version"]
+    assert memo.saved == 3
+    assert get_cache_stats()["memo_hits"] == 3
+
+    # Outside a request every call reads the backend again.
+    get_or_fetch("k", lambda: "unused", soft_ttl=60, hard_ttl=600)
+    assert reads.count("k") == 2
+
+
+def test_request_memo_sees_writes_of_the_same_request():
+    with request_memo() as memo:
+        assert get_stamp("k") is None
+        assert get_or_fetch("k", lambda: "v1", soft_ttl=60, hard_ttl=600) == "v1"
+        assert get_stamp("k")["version"]
+        assert get_or_fetch("k", lambda: "v2", soft_ttl=60, hard_ttl=600) == "v1"
+
+        key = lambda code: f"stock:{code}"
+        fetch = lambda codes: {c: 1 for c in codes if c != "gone"}
+        assert get_many_or_fetch(["a", "gone"], key, fetch, soft_ttl=60, hard_ttl=600) == {"a": 1}
+        assert get_many_or_fetch(["a", "b"], key, fetch, soft_ttl=60, hard_ttl=600) == {"a": 1, "b": 1}
+    assert memo.saved == 3
+
+
+def test_memo_middleware_reports_saved_reads(rf, settings):
+    settings.DEBUG = True
+    store("k", "v", soft_ttl=60, hard_ttl=600)
+
+    def view(request):
+        get_or_fetch("k", lambda: "unused", soft_ttl=60, hard_ttl=600)
+        get_or_fetch("k", lambda: "unused", soft_ttl=60, hard_ttl=600)
+        return HttpResponse()
+
+    response = CatalogMemoMiddleware(view)(rf.get("/en/"))
+    assert response["X-Catalog-Reads-Saved"] == "1"
+
+
+def test_on_store_runs_after_each_fetched_value_is_stored():
+    seen = []
+    on_store = lambda value: seen.append((value, cache.get("k")["value"]))
+
+    get_or_fetch("k", lambda: "v1", soft_ttl=60, hard_ttl=600, on_store=on_store)
+    get_or_fetch("k", lambda: "unused", soft_ttl=60, hard_ttl=600, on_store=on_store)
+    get_or_fetch("k", lambda: "v2", soft_ttl=60, hard_ttl=600, force=True, on_store=on_store)
+    assert seen == [("v1", "v1"), ("v2", "v2")]
+
+
+def test_stale_batch_ids_are_refreshed_once_at_a_time():
+    key = lambda code: f"stock:{code}"
+    get_many_or_fetch(["a", "b"], key, lambda codes: {c: 0 for c in codes}, soft_ttl=0, hard_ttl=600)
+
+    release = threading.Event()
+    batches = []
+
+    def slow(codes):
+        batches.append(sorted(codes))
+        release.wait(2)
+        return {c: 1 for c in codes}
+
+    for _ in range(5):
+        assert get_many_or_fetch(["a", "b"], key, slow, soft_ttl=60, hard_ttl=600) == {"a": 0, "b": 0}
+    release.set()
+    assert _wait_for(lambda: cache.get("stock:a")["value"] == 1)
+    assert batches == [["a", "b"]]
+    assert get_cache_stats()["background_refreshes"] == 1
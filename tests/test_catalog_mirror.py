@@ -0,0 +1,164 @@
+import pytest
+from django.core.cache import cache
+
+from integration.models import Product, ProductStock
+from web import catalog_mirror, erp_services
+
+
+class FakeERPClient:
+    """Pages Item / Bin rows like ERPNext (offsets into a sorted list); ``on_page`` runs after each page."""
+
+    def __init__(self, items=(), bins=()):
+        self.items = list(items)
+        self.bins = list(bins)
+        self.queries = []
+        self.page_length = 500
+        self.on_page = None
+
+    def _rows(self, doctype, filters):
+        rows = []
+        for row in self.items if doctype == "Item" else self.bins:
+            ok = True
+            for field, op, value in filters or []:
+                ok &= row.get(field, "") >= value if op == ">=" else row.get(field) in value
+            if ok:
+                rows.append(dict(row))
+        return rows
+
+    def list_page(self, doctype, *, fields=None, filters=None, order_by=None, start=0, page_length=20):
+        self.queries.append((doctype, filters))
+        key = "modified" if (order_by or "").startswith("modified") else "item_code"
+        rows = sorted(self._rows(doctype, filters), key=lambda r: (r.get(key, ""), r.get("item_code", "")))
+        page = rows[start:start + page_length]
+        if self.on_page:
+            self.on_page()
+        return page
+
+    def iter_resource(self, doctype, *, fields=None, filters=None, order_by=None, **kwargs):
+        start = 0
+        while True:
+            rows = self.list_page(doctype, filters=filters, order_by=order_by, start=start, page_length=self.page_length)
+            yield from rows
+            if len(rows) < self.page_length:
+                return
+            start += self.page_length
+
+    def count(self, doctype, *, filters=None):
+        return len(self._rows(doctype, filters))
+
+
+def _item(code, modified, **extra):
+    return {
+        "item_code": code,
+        "item_name": f"Laptop {code}",
+        "brand": "Dell",
+        "standard_rate": 1000,
+        "disabled": 0,
+        "modified": modified,
+        **extra,
+    }
+
+
+@pytest.fixture
+def erp(db, monkeypatch):
+    cache.clear()
+    client = FakeERPClient()
+    monkeypatch.setattr(erp_services, "get_erp_client", lambda: client)
+    yield client
+    cache.clear()
+
+
+def test_full_then_incremental_sync(erp):
+    erp.items = [_item("A", "2026-01-01 10:00:00"), _item("B", "2026-01-01 09:00:00")]
+    erp.bins = [{"item_code": "A", "actual_qty": 2}, {"item_code": "A", "actual_qty": 1}]
+    assert erp_services.sync_mirror()["mode"] == "full"
+    assert ProductStock.objects.get(item_code="A").actual_qty == 3
+
+    erp.items = [
+        _item("A", "2026-01-01 10:00:00"),
+        _item("B", "2026-01-02 08:00:00", disabled=1),
+        _item("C", "2026-01-02 09:00:00", standard_rate=500),
+    ]
+    stats = erp_services.sync_mirror()
+
+    assert stats == {"mode": "delta", "fetched": 3, "upserted": 3, "removed": 0}
+    assert erp.queries[-2] == ("Item", [["modified", ">=", "2026-01-01 10:00:00"]])
+    assert Product.objects.get(item_code="B").disabled
+    assert [p["item_code"] for p in catalog_mirror.load_products()] == ["C", "A"]
+
+    erp.items = erp.items[1:]
+    assert erp_services.sync_mirror(full=True)["removed"] == 1
+    assert not Product.objects.filter(item_code="A").exists()
+
+
+def test_full_sync_keeps_items_modified_mid_scan(erp):
+    erp.page_length = 2
+    erp.items = [_item(code, "2026-01-01 10:00:00") for code in "ABCDE"]
+    erp_services.sync_mirror()
+
+    def save_e():
+        erp.on_page = None
+        erp.items[4] = _item("E", "2026-01-02 10:00:00", standard_rate=700)
+
+    erp.on_page = save_e
+    stats = erp_services.sync_mirror(full=True)
+
+    assert stats["fetched"] == 5 and stats["removed"] == 0
+    assert sorted(Product.objects.values_list("item_code", flat=True)) == list("ABCDE")
+    assert Product.objects.get(item_code="E").price == 700
+
+
+def test_full_sync_does_not_remove_items_when_the_scan_is_incomplete(erp):
+    erp.page_length = 2
+    erp.items = [_item(code, "2026-01-01 10:00:00") for code in "ABCD"]
+    erp_services.sync_mirror()
+
+    def delete_a():  # shifts C in front of the second page
+        erp.on_page = None
+        del erp.items[0]
+
+    erp.on_page = delete_a
+    stats = erp_services.sync_mirror(full=True)
+
+    assert stats["fetched"] == 3 and stats["removed"] == 0
+    assert Product.objects.filter(item_code="C").exists()
+
+    assert erp_services.sync_mirror(full=True)["removed"] == 1
+    assert sorted(Product.objects.values_list("item_code", flat=True)) == list("BCD")
+
+
+def test_db_source_reads_catalog_and_stock_from_the_mirror(erp, monkeypatch):
+    erp.items = [_item("A", "2026-01-01 10:00:00")]
+    erp.bins = [{"item_code": "A", "actual_qty": 4}]
+    erp_services.sync_mirror()
+    monkeypatch.setattr(erp_services, "CATALOG_SOURCE", "db")
+    cache.clear()
+    erp.queries.clear()
+
+    assert [p["item_code"] for p in erp_services.get_all_products()] == ["A"]
+    assert erp_services.fetch_stock_map(["A", "Z"]) == {"A": 4, "Z": 0}
+    assert erp_services.get_product_by_code("Z") is None
+    assert erp.queries == []
+
+
+def test_sql_source_filters_sorts_and_counts_in_sql(erp, monkeypatch):
+    erp.items = [
+        _item("A", "2026-01-03", standard_rate=300, item_name="Dell Latitude i7 16GB RAM 512GB SSD"),
+        _item("B", "2026-01-02", standard_rate=100, item_name="Dell Vostro i5 8GB RAM 256GB SSD"),
+        _item("C", "2026-01-01", standard_rate=200, brand="HP", item_name="HP EliteBook i7 16GB RAM 1TB SSD"),
+    ]
+    erp_services.sync_mirror()
+    monkeypatch.setattr(erp_services, "CATALOG_SOURCE", "sql")
+    cache.clear()
+
+    page = erp_services.faceted_search(ram=["16GB"], sort_by="price_asc", counts=True)
+    assert [p["item_code"] for p in page.products] == ["C", "A"] and page.total == 2
+    assert page.facet_counts["ram"] == {"8GB": 1, "16GB": 2}
+    assert page.facet_counts["brand"] == {"Dell": 1, "HP": 1}
+    assert page.facet_counts["storage"] == {"512GB": 1, "1TB": 1}
+
+    assert [p["item_code"] for p in erp_services.filter_products(q="elitebook", cpu="i7")] == ["C"]
+    assert erp_services.faceted_search(storage=["1TB"], brand=["Dell"]).total == 0
+    assert erp_services.faceted_search(offset=1, limit=1).products[0]["item_code"] == "B"
+    assert erp_services.get_product_by_code("B")["priceEGP"] == 100.0
+    assert erp_services.get_filter_options()["storages"] == ["256GB", "512GB", "1TB"]
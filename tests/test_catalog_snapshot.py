@@ -0,0 +1,133 @@
+import os
+
+import pytest
+from django.core.cache import cache
+
+from integration.erp_standin import synthetic_dataset
+from web import catalog_index, catalog_snapshot, erp_services
+from web.catalog_snapshot import CatalogSnapshot, publish
+from web.product_record import ProductRecord
+
+
+def _products(n=50):
+    products = [erp_services._map_erp_item(i) for i in synthetic_dataset(n, seed=7)["Item"]]
+    products[0] = ProductRecord.from_dict(
+        {**products[0], "oldPriceEGP": 999.0, "tags": ["Hot Deal", "Best Seller"], "custom_note": "kept"}
+    )
+    products[1] = ProductRecord.from_dict({**products[1], "images": ["/a.png", "/b.png"]})
+    return products
+
+
+@pytest.fixture(autouse=True)
+def _fresh():
+    catalog_snapshot.reset()
+    catalog_index.reset()
+    yield
+    catalog_snapshot.reset()
+    catalog_index.reset()
+
+
+def test_rows_round_trip(tmp_path):
+    products = _products()
+    publish(products, str(tmp_path))
+    snapshot = catalog_snapshot.current(str(tmp_path))
+
+    assert len(snapshot) == len(products)
+    assert [snapshot.product(i) for i in range(len(products))] == products
+    assert snapshot.price(0) == products[0]["priceEGP"]
+
+
+def test_rows_are_product_records(tmp_path):
+    products = _products(3)
+    publish(products, str(tmp_path))
+    row = catalog_snapshot.current(str(tmp_path)).products[0]
+
+    assert type(row) is ProductRecord
+    assert row.to_dict() == products[0].to_dict()
+    assert row.priceEGP == products[0].priceEGP and row.oldPriceEGP == 999.0
+    assert row.tags == ["Hot Deal", "Best Seller"] and row["custom_note"] == "kept"
+    assert row.specs == products[0].specs and row.spec_texts == products[0].spec_texts
+    assert row.brand is products[0].brand  # interned
+    assert catalog_snapshot.current(str(tmp_path)).products[1].image_url == "/a.png"
+
+
+def test_rows_are_materialized_lazily(tmp_path):
+    products = _products()
+    publish(products, str(tmp_path))
+    lazy = catalog_snapshot.current(str(tmp_path)).products
+
+    assert [p["item_code"] for p in lazy] == [p["item_code"] for p in products]
+    assert lazy.materialized() == 0
+    assert lazy[3] is lazy[3] and lazy[-1] == products[-1]
+    assert [p["item_code"] for p in lazy[:2]] == [p["item_code"] for p in products[:2]]
+    assert lazy.materialized() == 4
+
+
+def test_new_version_is_swapped_in_and_old_files_pruned(tmp_path):
+    directory = str(tmp_path)
+    first = publish(_products(5), directory)
+    assert catalog_snapshot.current(directory).version == first
+    assert catalog_snapshot.current(directory) is catalog_snapshot.current(directory)
+
+    for _ in range(catalog_snapshot.KEEP + 1):
+        latest = publish(_products(6), directory)
+    snapshot = catalog_snapshot.current(directory)
+    assert snapshot.version == latest and len(snapshot) == 6
+    assert len([f for f in os.listdir(directory) if f.endswith(".bin")]) == catalog_snapshot.KEEP
+
+
+def test_unchanged_catalog_is_not_republished(tmp_path, monkeypatch):
+    cache.clear()
+    items = [i for i in synthetic_dataset(10, seed=3)["Item"] if not i["disabled"]]
+
+    class Client:
+        def iter_resource(self, doctype, **kwargs):
+            return iter([dict(i) for i in items] if doctype == "Item" else [])
+
+        def list_page(self, doctype, *, filters, start=0, page_length=20, **kwargs):
+            since = filters[0][2]
+            rows = sorted((i for i in items if i["modified"] >= since), key=lambda i: (i["modified"], i["item_code"]))
+            return [dict(i) for i in rows[start:start + page_length]]
+
+    monkeypatch.setattr(erp_services, "get_erp_client", lambda: Client())
+    monkeypatch.setattr(erp_services, "CATALOG_SNAPSHOT_DIR", str(tmp_path))
+    erp_services.sync_catalog(full=True)
+    version = catalog_snapshot.current(str(tmp_path)).version
+    erp_services.sync_catalog(full=True)
+    erp_services.sync_catalog()
+
+    assert catalog_snapshot.current(str(tmp_path)).version == version
+    assert len([f for f in os.listdir(tmp_path) if f.endswith(".bin")]) == 1
+
+    items[0]["modified"] = "2099-01-01 00:00:00"
+    erp_services.sync_catalog()
+    assert catalog_snapshot.current(str(tmp_path)).version != version
+    cache.clear()
+
+
+def test_rejects_foreign_files(tmp_path):
+    path = tmp_path / "catalog-x.bin"
+    path.write_bytes(b"not a snapshot at all")
+    with pytest.raises(ValueError):
+        CatalogSnapshot(str(path))
+
+
+def test_catalog_index_serves_pages_from_the_snapshot(tmp_path, monkeypatch):
+    cache.clear()
+    items = synthetic_dataset(40, seed=1)["Item"]
+
+    class Client:
+        def iter_resource(self, doctype, **kwargs):
+            return iter([dict(i) for i in items] if doctype == "Item" else [])
+
+    monkeypatch.setattr(erp_services, "get_erp_client", lambda: Client())
+    monkeypatch.setattr(erp_services, "CATALOG_SNAPSHOT_DIR", str(tmp_path))
+    erp_services.sync_catalog(full=True)
+
+    index = erp_services.get_catalog_index()
+    assert isinstance(index.products, catalog_snapshot.SnapshotProducts)
+    page = erp_services.faceted_search(limit=5, counts=True, sort_by="price_asc")
+    assert page.total == 40 and len(page.products) == 5
+    assert erp_services.get_product_by_code(items[10]["item_code"])["item_code"] == items[10]["item_code"]
+    assert index.products.materialized() <= 6
+    cache.clear()
@@ -0,0 +1,301 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from django.core.exceptions import ImproperlyConfigured
+
+from integration import erp_client, erp_metrics
+from integration.erp_client import (
+    BACKGROUND,
+    CircuitBreaker,
+    ERPNextClient,
+    ERPNextUnavailable,
+    TrafficGovernor,
+    endpoint_key,
+    erp_fail_fast,
+    erp_priority,
+    get_circuit_states,
+    get_erp_client,
+    get_pool_stats,
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        body = json.dumps({"data": [{"path": self.path}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def erp_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fresh_session():
+    erp_client.close_http_session()
+    erp_client._pool_stats.reset()
+    yield
+    erp_client.close_http_session()
+
+
+def _client(base_url):
+    return ERPNextClient(base_url=base_url, api_key="k", api_secret="s", timeout=5)
+
+
+def test_requests_reuse_pooled_connection(erp_server, fresh_session):
+    client = _client(erp_server)
+    for _ in range(5):
+        assert client.request("GET", "/api/resource/Item")["data"]
+    stats = get_pool_stats()
+    assert stats["requests"] == 5
+    assert stats["new_connections"] == 1
+    assert stats["hits"] == 4
+
+
+def test_session_is_rebuilt_after_fork(fresh_session):
+    before = erp_client.get_http_session()
+    assert erp_client.get_http_session() is before
+    erp_client._reset_after_fork()
+    assert erp_client.get_http_session() is not before
+
+
+def test_get_erp_client_is_shared(settings):
+    settings.ERPNEXT_API_KEY = "key"
+    settings.ERPNEXT_API_SECRET = "secret"
+    assert get_erp_client() is get_erp_client()
+    settings.ERPNEXT_TIMEOUT_SECONDS = 3
+    assert get_erp_client().timeout == 3
+
+
+def test_pool_is_never_smaller_than_the_in_flight_limit(settings, fresh_session):
+    settings.ERPNEXT_POOL_MAXSIZE = 2
+    settings.ERPNEXT_MAX_IN_FLIGHT = 6
+    adapter = erp_client.get_http_session().get_adapter("http://erp.local/")
+    assert adapter._pool_maxsize == 6
+    assert get_pool_stats()["maxsize"] == 6
+
+
+def test_client_refuses_a_governor_larger_than_the_pool(settings):
+    settings.ERPNEXT_API_KEY = "key"
+    settings.ERPNEXT_API_SECRET = "other-secret"
+    erp_client._reset_governor()
+    settings.ERPNEXT_MAX_IN_FLIGHT = 12
+    erp_client.get_governor()
+    settings.ERPNEXT_MAX_IN_FLIGHT = 4
+    settings.ERPNEXT_POOL_MAXSIZE = 4
+    try:
+        with pytest.raises(ImproperlyConfigured):
+            get_erp_client()
+    finally:
+        erp_client._reset_governor()
+
+
+class _DownSession:
+    """Stands in for requests.Session while ERPNext is unreachable."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def request(self, **kwargs):
+        self.calls += 1
+        raise requests.ConnectionError("connection refused")
+
+
+@pytest.fixture
+def fresh_breakers(settings):
+    settings.ERPNEXT_CIRCUIT_MIN_CALLS = 2
+    settings.ERPNEXT_CIRCUIT_COOLDOWN_SECONDS = 60
+    erp_client._reset_breakers()
+    yield
+    erp_client._reset_breakers()
+
+
+def test_endpoint_key_collapses_document_names():
+    assert endpoint_key("get", "/api/resource/Item/LAP 001") == "GET /api/resource/Item/{name}"
+    assert endpoint_key("GET", "/api/resource/Bin") == "GET /api/resource/Bin"
+
+
+def test_open_circuit_fails_fast_without_network(fresh_breakers):
+    down = _DownSession()
+    client = ERPNextClient(
+        base_url="http://erp", api_key="k", api_secret="s",
+        max_retries=0, session=down,
+    )
+    for _ in range(2):
+        with pytest.raises(ERPNextUnavailable):
+            client.request("GET", "/api/resource/Item")
+    assert down.calls == 2
+
+    with pytest.raises(ERPNextUnavailable, match="circuit open"):
+        client.request("GET", "/api/resource/Item")
+    assert down.calls == 2
+
+    (state,) = get_circuit_states()
+    assert state["endpoint"] == "GET /api/resource/Item"
+    assert state["state"] == "open"
+    assert state["rejected"] == 1
+
+
+def test_fail_fast_makes_one_attempt_with_a_short_connect_timeout(fresh_breakers):
+    down = _DownSession()
+    timeouts = []
+    request = down.request
+    down.request = lambda **kwargs: timeouts.append(kwargs["timeout"]) or request(**kwargs)
+    client = ERPNextClient(
+        base_url="http://erp", api_key="k", api_secret="s",
+        timeout=15, backoff_seconds=0, session=down,
+    )
+    with erp_fail_fast(0.5), pytest.raises(ERPNextUnavailable):
+        client.request("GET", "/api/resource/Item")
+    assert timeouts == [(0.5, 15)]
+
+    with pytest.raises(ERPNextUnavailable):
+        client.request("GET", "/api/resource/Bin")
+    assert timeouts[1:] == [15, 15, 15]
+
+
+def test_half_open_probe_closes_circuit_on_success():
+    breaker = CircuitBreaker("GET /x", min_calls=1, cooldown=0)
+    assert breaker.before_call() is False
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    assert breaker.before_call() is True
+    with pytest.raises(ERPNextUnavailable, match="probe in flight"):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+class _FakeResponse:
+    status_code = 200
+    content = b"{}"
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class _ListSession:
+    """Serves ``total`` rows of a doctype list honouring limit_start/page_length."""
+
+    def __init__(self, total):
+        self.total = total
+        self.pages = []
+
+    def request(self, method, url, params=None, **kwargs):
+        start = int(params["limit_start"])
+        length = int(params["limit_page_length"])
+        self.pages.append(start)
+        rows = [{"name": f"ITEM-{i}"} for i in range(start, min(start + length, self.total))]
+        return _FakeResponse({"data": rows})
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_iter_resource_pages_past_first_page(fresh_breakers, workers):
+    session = _ListSession(total=1203)
+    client = ERPNextClient(base_url="http://erp", api_key="k", api_secret="s", session=session)
+
+    rows = list(client.iter_resource("Item", fields=["name"], page_length=500, workers=workers))
+
+    assert [r["name"] for r in rows] == [f"ITEM-{i}" for i in range(1203)]
+    assert sorted(session.pages)[:3] == [0, 500, 1000]
+
+
+def test_iter_resource_limit_stops_early(fresh_breakers):
+    session = _ListSession(total=50)
+    client = ERPNextClient(base_url="http://erp", api_key="k", api_secret="s", session=session)
+
+    assert len(list(client.iter_resource("Customer", limit=1))) == 1
+    assert session.pages == [0]
+
+
+def test_governor_caps_in_flight_and_times_out():
+    governor = TrafficGovernor(max_in_flight=1, queue_timeout=0.05)
+    held = governor.acquire()
+
+    with pytest.raises(ERPNextUnavailable, match="queue full"):
+        governor.acquire()
+    governor.release(held)
+    governor.release(governor.acquire())
+
+    stats = governor.snapshot()["stats"]["interactive"]
+    assert stats["acquired"] == 2
+    assert stats["timeouts"] == 1
+
+
+def test_background_yields_to_queued_interactive_callers():
+    governor = TrafficGovernor(max_in_flight=1, background_max_in_flight=1, queue_timeout=2)
+    order = []
+    first = governor.acquire()
+
+    def worker(priority):
+        with erp_priority(priority):
+            p = governor.acquire()
+        order.append(p)
+        governor.release(p)
+
+    background = threading.Thread(target=worker, args=(BACKGROUND,))
+    background.start()
+    time.sleep(0.05)
+    interactive = threading.Thread(target=worker, args=("interactive",))
+    interactive.start()
+    time.sleep(0.05)
+    governor.release(first)
+    background.join()
+    interactive.join()
+
+    assert order == ["interactive", BACKGROUND]
+
+
+def test_token_bucket_keeps_reserve_for_interactive():
+    governor = TrafficGovernor(rate=0.001, burst=2, reserve=0.5, queue_timeout=0.05)
+    with erp_priority(BACKGROUND):
+        governor.release(governor.acquire())  # 2 tokens -> 1
+        with pytest.raises(ERPNextUnavailable):
+            governor.acquire()  # would dip into the interactive reserve
+    governor.release(governor.acquire())
+
+
+def test_calls_are_recorded_per_endpoint_template(erp_server, fresh_session, fresh_breakers, erp_metrics_dir):
+    client = _client(erp_server)
+    client.request("GET", "/api/resource/Item/A")
+    client.request("GET", "/api/resource/Item/B")
+
+    (row,) = erp_metrics.summarize(erp_metrics.collect())
+    assert row["endpoint"] == "GET /api/resource/Item/{name}"
+    assert row["count"] == 2
+    assert row["status"] == {"200": 2}
+    assert row["p50_ms"] is not None and row["bytes"] > 0
+    assert os.path.exists(os.path.join(erp_metrics_dir, f"{os.getpid()}.json"))
+
+    text = erp_metrics.render_prometheus(erp_metrics.collect())
+    assert 'erpnext_request_duration_seconds_count{method="GET",endpoint="/api/resource/Item/{name}"} 2' in text
+
+
+def test_quantile_interpolates_within_bucket():
+    series = erp_metrics._new_series()
+    series["count"] = 4
+    series["buckets"][erp_metrics.BUCKETS.index(0.1)] = 4  # all in (0.05, 0.1]
+    assert erp_metrics.quantile(series, 0.5) == pytest.approx(0.075)
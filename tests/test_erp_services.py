@@ -0,0 +1,449 @@
+import pytest
+from django.core.cache import cache
+
+from integration.erp_client import ERPNextNotFound
+from web import erp_services
+
+
+class FakeERPClient:
+    """Serves Item / Bin rows from in-memory lists, recording each query."""
+
+    def __init__(self, items=None, bins=None):
+        self.items = list(items or [])
+        self.bins = list(bins or [])
+        self.queries = []
+        self.on_page = None
+
+    def list_page(self, doctype, *, fields=None, filters=None, order_by=None, start=0, page_length=20):
+        self.queries.append((doctype, filters))
+        rows = [dict(r) for r in (self.items if doctype == "Item" else self.bins)
+                if all(_match(r, f) for f in filters or [])]
+        rows.sort(key=lambda r: (r.get("modified", ""), r.get("item_code", "")))
+        page = rows[start:start + page_length]
+        if self.on_page:
+            self.on_page()
+        return page
+
+    def iter_resource(self, doctype, *, fields=None, filters=None, order_by=None, **kwargs):
+        self.queries.append((doctype, filters))
+        rows = self.items if doctype == "Item" else self.bins
+        for row in rows:
+            if all(_match(row, f) for f in filters or []):
+                yield dict(row)
+
+    def request(self, method, path, **kwargs):
+        code = path.rsplit("/", 1)[-1]
+        self.queries.append(("GET Item", code))
+        item = next((dict(i) for i in self.items if i["item_code"] == code), None)
+        if item is None:
+            raise ERPNextNotFound(f"Endpoint not found: {path}")
+        return {"data": item}
+
+
+def _match(row, flt):
+    field, op, value = flt
+    if op == "=":
+        return row.get(field) == value
+    if op == ">=":
+        return row.get(field, "") >= value
+    if op == "in":
+        return row.get(field) in value
+    raise AssertionError(f"unsupported filter {flt}")
+
+
+def _item(code, modified, **extra):
+    return {
+        "item_code": code,
+        "item_name": code,
+        "standard_rate": 1000,
+        "disabled": 0,
+        "modified": modified,
+        **extra,
+    }
+
+
+@pytest.fixture
+def erp(monkeypatch):
+    cache.clear()
+    client = FakeERPClient()
+    monkeypatch.setattr(erp_services, "get_erp_client", lambda: client)
+    yield client
+    cache.clear()
+
+
+def test_delta_sync_fetches_only_modified_items(erp):
+    erp.items = [
+        _item("A", "2026-01-01 10:00:00"),
+        _item("B", "2026-01-01 09:00:00"),
+    ]
+    assert [p["item_code"] for p in erp_services.sync_catalog()] == ["A", "B"]
+
+    erp.items = [
+        _item("A", "2026-01-01 10:00:00"),
+        _item("B", "2026-01-02 08:00:00", standard_rate=900),
+        _item("C", "2026-01-02 09:00:00"),
+    ]
+    products = erp_services.sync_catalog()
+
+    assert [p["item_code"] for p in products] == ["C", "B", "A"]
+    assert products[1]["priceEGP"] == 900.0
+    assert erp.queries[-1] == ("Item", [["modified", ">=", "2026-01-01 10:00:00"]])
+    last = erp_services.get_sync_stats()["last"]
+    assert last["mode"] == "delta"
+    assert last["fetched"] == 3
+    assert last["upserted"] == 2
+
+
+def test_delta_sync_pages_by_modified_and_sees_items_saved_mid_fetch(erp, settings):
+    settings.ERPNEXT_PAGE_LENGTH = 2
+    erp.items = [_item(code, "2026-01-01 09:00:00") for code in "ABCDE"]
+    erp_services.sync_catalog()
+
+    erp.items = [
+        _item("A", "2026-01-02 01:00:00"),
+        _item("B", "2026-01-02 02:00:00"),
+        _item("C", "2026-01-02 03:00:00"),
+        _item("D", "2026-01-02 04:00:00"),
+        _item("E", "2026-01-01 09:00:00"),
+    ]
+
+    def save_a_again():
+        erp.on_page = None
+        erp.items[0] = _item("A", "2026-01-02 05:00:00", standard_rate=500)
+
+    erp.on_page = save_a_again
+    products = erp_services.sync_catalog()
+
+    assert [p["item_code"] for p in products] == ["A", "D", "C", "B", "E"]
+    assert products[0]["priceEGP"] == 500.0
+    assert cache.get(erp_services.CATALOG_SYNC_KEY)["high_water"] == "2026-01-02 05:00:00"
+
+
+def test_delta_high_water_stops_at_the_last_row_received(erp):
+    erp.items = [_item("A", "2026-01-01 10:00:00")]
+    erp_services.sync_catalog()
+    erp.items = [_item("A", "2026-01-01 10:00:00"), _item("B", "2026-01-01 11:00:00")]
+    erp_services.sync_catalog()
+    assert cache.get(erp_services.CATALOG_SYNC_KEY)["high_water"] == "2026-01-01 11:00:00"
+
+    erp.items = []  # nothing received: the mark stays where it was
+    erp_services.sync_catalog()
+    assert cache.get(erp_services.CATALOG_SYNC_KEY)["high_water"] == "2026-01-01 11:00:00"
+
+
+def test_delta_sync_without_changes_upserts_nothing(erp):
+    erp.items = [_item("A", "2026-01-01 10:00:00"), _item("B", "2026-01-01 09:00:00")]
+    first = erp_services.sync_catalog()
+    version = erp_services.catalog_version()
+
+    assert erp_services.sync_catalog() == first
+    last = erp_services.get_sync_stats()["last"]
+    assert (last["mode"], last["fetched"], last["upserted"], last["removed"]) == ("delta", 1, 0, 0)
+    assert erp_services.catalog_version() == version
+
+
+def test_delta_sync_drops_newly_disabled_items(erp):
+    erp.items = [_item("A", "2026-01-01 10:00:00"), _item("B", "2026-01-01 09:00:00")]
+    erp_services.sync_catalog()
+
+    erp.items[1] = _item("B", "2026-01-03 00:00:00", disabled=1)
+    products = erp_services.sync_catalog()
+
+    assert [p["item_code"] for p in products] == ["A"]
+    assert erp_services.get_sync_stats()["last"]["removed"] == 1
+
+
+def test_full_sync_when_requested(erp):
+    erp.items = [_item("A", "2026-01-01 10:00:00")]
+    erp_services.sync_catalog()
+    erp_services.sync_catalog(full=True)
+
+    assert erp.queries[-1] == ("Item", [["disabled", "=", 0]])
+    assert erp_services.get_sync_stats()["last"]["mode"] == "full"
+
+
+def test_full_sync_drops_rows_repeated_by_the_paged_scan(erp):
+    erp.items = [
+        _item("A", "2026-01-01 10:00:00"),
+        _item("B", "2026-01-01 09:00:00"),
+        _item("B", "2026-01-02 09:00:00", standard_rate=900),  # saved mid-scan
+        _item("C", "2026-01-01 11:00:00"),
+    ]
+    products = erp_services.sync_catalog(full=True)
+
+    assert [p["item_code"] for p in products] == ["B", "C", "A"]
+    assert products[0]["priceEGP"] == 900.0
+
+
+def test_fetch_stock_map_queries_only_uncached_codes(erp):
+    erp.bins = [
+        {"item_code": "A", "actual_qty": 2},
+        {"item_code": "A", "actual_qty": 3},
+        {"item_code": "B", "actual_qty": -1},
+    ]
+    assert erp_services.fetch_stock_qty("A") == 5
+
+    stock = erp_services.fetch_stock_map(["A", "B", "C"])
+
+    assert stock == {"A": 5, "B": 0, "C": 0}
+    assert erp.queries[-1] == ("Bin", [["item_code", "in", ["B", "C"]]])
+    assert len(erp.queries) == 2
+
+
+def test_fetch_stock_map_chunks_large_batches(erp, monkeypatch):
+    monkeypatch.setattr(erp_services, "STOCK_BULK_CHUNK", 2)
+    erp_services.fetch_stock_map(["A", "B", "C"])
+
+    assert [q[1] for q in erp.queries] == [
+        [["item_code", "in", ["A", "B"]]],
+        [["item_code", "in", ["C"]]],
+    ]
+
+
+def test_catalog_index_lookups(erp):
+    erp.items = [
+        _item("A", "2026-01-01 10:00:00", brand="Dell", custom_tags="Hot Deal, Best Seller"),
+        _item("B", "2026-01-01 09:00:00", brand="Dell"),
+        _item("C", "2026-01-01 08:00:00", brand="HP", custom_tags="Hot Deal"),
+    ]
+    erp_services.sync_catalog()
+
+    assert erp_services.get_product_by_code("B")["item_code"] == "B"
+    assert [p["item_code"] for p in erp_services.get_products_by_tag("Hot Deal")] == ["A", "C"]
+    a = erp_services.get_product_by_code("A")
+    assert [p["item_code"] for p in erp_services.get_related_products(a)] == ["B"]
+    assert erp_services.get_catalog_index().group("") and len(erp_services.get_catalog_index()) == 3
+
+
+def test_catalog_index_is_rebuilt_only_for_a_new_catalog_version(erp, monkeypatch):
+    erp.items = [_item("A", "2026-01-01 10:00:00")]
+    erp_services.sync_catalog()
+    index = erp_services.get_catalog_index()
+
+    loads = []
+    monkeypatch.setattr(erp_services, "get_all_products", lambda: loads.append(1) or [])
+    assert erp_services.get_catalog_index() is index
+    assert loads == []  # fresh catalog: only the version stamp was read
+    monkeypatch.undo()
+    monkeypatch.setattr(erp_services, "get_erp_client", lambda: erp)
+
+    erp.items.append(_item("B", "2026-01-02 10:00:00"))
+    erp_services.sync_catalog()
+    assert erp_services.get_catalog_index() is not index
+    assert erp_services.get_product_by_code("B") is not None
+
+
+def test_catalog_version_moves_only_when_the_catalog_changes(erp):
+    erp.items = [_item("A", "2026-01-01 10:00:00", brand="Dell")]
+    erp_services.sync_catalog()
+    first = erp_services.catalog_version()
+    index = erp_services.get_catalog_index()
+    assert first > 0
+    assert erp_services.get_filter_options()["brands"] == ["Dell"]
+
+    erp_services.sync_catalog()  # nothing changed: same version, same index
+    assert erp_services.catalog_version() == first
+    assert erp_services.get_catalog_index() is index
+
+    erp.items.append(_item("B", "2026-01-02 10:00:00", brand="HP"))
+    erp_services.sync_catalog()
+    second = erp_services.catalog_version()
+    assert second > first
+    # Derived entries of the new version were written with it.
+    assert cache.get(erp_services.versioned_key(erp_services.FILTER_OPTIONS_KEY))["value"]["brands"] == ["Dell", "HP"]
+    assert erp_services.get_filter_options()["brands"] == ["Dell", "HP"]
+
+
+def test_bumping_the_version_invalidates_derived_entries(erp, monkeypatch):
+    erp.items = [_item("A", "2026-01-01 10:00:00")]
+    erp_services.sync_catalog()
+    fetched = []
+    monkeypatch.setattr(
+        erp_services, "_fetch_product", lambda code: fetched.append(code) or {"item_code": code}
+    )
+
+    erp_services.get_product_by_code("X")
+    erp_services.get_product_by_code("X")
+    assert fetched == ["X"]
+
+    version = erp_services.catalog_version()
+    assert erp_services.bump_catalog_version() > version
+    erp_services.get_product_by_code("X")
+    assert fetched == ["X", "X"]
+
+
+def test_item_change_patches_the_cached_catalog(erp):
+    erp.items = [_item("A", "2026-01-01 10:00:00"), _item("B", "2026-01-01 09:00:00")]
+    erp_services.sync_catalog()
+    version = erp_services.catalog_version()
+
+    erp.items[1] = _item("B", "2026-01-02 08:00:00", standard_rate=750)
+    assert erp_services.apply_item_change("B") == "upserted"
+    assert erp.queries[-1] == ("GET Item", "B")
+    assert [p["item_code"] for p in erp_services.get_all_products()] == ["B", "A"]
+    assert erp_services.get_product_by_code("B")["priceEGP"] == 750.0
+    assert erp_services.catalog_version() > version
+
+    erp.items.append(_item("C", "2026-01-02 09:00:00", disabled=1))
+    assert erp_services.apply_item_change("C") == "unchanged"
+    assert erp_services.apply_item_change("A", deleted=True) == "removed"
+    assert [p["item_code"] for p in erp_services.get_all_products()] == ["B"]
+    assert erp_services.get_catalog_index().get("A") is None
+
+    erp.items = [i for i in erp.items if i["item_code"] != "B"]  # deleted before delivery
+    assert erp_services.apply_item_change("B") == "removed"
+    assert erp_services.get_all_products() == []
+
+
+def test_item_patches_need_a_catalog_shared_by_all_workers(monkeypatch):
+    assert not erp_services.catalog_patches_are_shared()  # per-process LocMemCache
+    monkeypatch.setattr(erp_services, "CATALOG_SNAPSHOT_DIR", "/tmp/snapshots")
+    assert erp_services.catalog_patches_are_shared()
+
+
+@pytest.mark.django_db
+def test_pushed_stock_is_served_without_erpnext(erp, monkeypatch):
+    monkeypatch.setattr(erp_services, "STOCK_PUSH", True)
+    monkeypatch.setattr(erp_services, "STOCK_PUSH_BATCH_SECONDS", 60)
+    erp.bins = [
+        {"item_code": "A", "actual_qty": 2},
+        {"item_code": "A", "actual_qty": 3},
+        {"item_code": "B", "actual_qty": 1},
+    ]
+    erp_services.queue_stock_refresh(["A"])
+    erp_services.queue_stock_refresh(["B", "A"])
+    assert erp_services.flush_stock_queue() == 2
+    assert erp.queries == [("Bin", [["item_code", "in", ["A", "B"]]])]
+
+    assert erp_services.fetch_stock_map(["A", "B", "C"]) == {"A": 5, "B": 1, "C": 0}
+    cache.clear()
+    assert erp_services.fetch_stock_qty("A") == 5  # from ProductStock
+    assert len(erp.queries) == 1
+
+
+@pytest.mark.django_db
+def test_reconcile_stock_fixes_drift(erp):
+    from web import catalog_mirror
+
+    catalog_mirror.save_stock({"A": 9, "Z": 3})
+    erp.bins = [
+        {"name": "BIN-1", "item_code": "A", "actual_qty": 2},
+        {"name": "BIN-2", "item_code": "A", "actual_qty": 1},
+        {"name": "BIN-2", "item_code": "A", "actual_qty": 1},  # repeated by the paged scan
+        {"name": "BIN-3", "item_code": "B", "actual_qty": -4},
+    ]
+    assert erp_services.reconcile_stock() == {"items": 3, "changed": 3}
+    assert catalog_mirror.stock_rows() == {"A": 3, "B": 0, "Z": 0}
+    assert cache.get(erp_services._stock_key("A"))["value"] == 3
+    assert erp_services.reconcile_stock() == {"items": 3, "changed": 0}
+
+
+def test_warm_catalog_builds_everything_up_front(erp):
+    from io import StringIO
+
+    from django.core.management import call_command
+
+    from web import catalog_index
+
+    catalog_index.reset()
+    erp.items = [_item("A", "2026-01-01", brand="Dell"), _item("B", "2026-01-02", brand="HP")]
+    out = StringIO()
+    call_command("warm_catalog", stdout=out)
+
+    stages = [line.split()[0] for line in out.getvalue().splitlines()]
+    assert stages == ["translations", "products", "index", "search", "facets", "sort", "filter", "total"]
+    index = erp_services.get_catalog_index()
+    assert index._search is not None and index._facets is not None and index._orders is not None
+    assert set(index._suggestions) == {"en", "ar"}
+
+    queries = len(erp.queries)
+    erp_services.faceted_search(q="dell", limit=5, counts=True)
+    assert len(erp.queries) == queries
+    catalog_index.reset()
+
+
+def test_last_known_good_catalog_is_served_when_erpnext_is_down_on_a_cold_cache(erp, monkeypatch, rf):
+    from integration.erp_client import ERPNextUnavailable
+    from web import catalog_index
+    from web.context_processors import catalog_status_context
+
+    erp.items = [_item("A", "2026-01-01", brand="Dell"), _item("B", "2026-01-02", brand="HP")]
+    erp_services.sync_catalog(full=True)
+    erp_services._lkg_thread.join()
+    assert not erp_services.catalog_degraded()
+
+    class Down:
+        calls = 0
+
+        def iter_resource(self, doctype, **kwargs):
+            Down.calls += 1
+            raise ERPNextUnavailable("ERPNext circuit open")
+
+    cache.clear()  # restart during the outage
+    catalog_index.reset()
+    monkeypatch.setattr(erp_services, "get_erp_client", lambda: Down())
+
+    assert [p["item_code"] for p in erp_services.get_all_products()] == ["B", "A"]
+    assert erp_services.get_filter_options()["brands"] == ["Dell", "HP"]
+    assert erp_services.get_product_by_code("A")["brand"] == "Dell"
+    assert catalog_status_context(rf.get("/"))["catalog_degraded"] is True
+    assert Down.calls == 1  # later requests are served the fallback, not retried
+
+    monkeypatch.setattr(erp_services, "get_erp_client", lambda: erp)
+    erp_services.sync_catalog()
+    assert not erp_services.catalog_degraded()
+    catalog_index.reset()
+
+
+def test_last_known_good_catalog_is_written_once_off_the_request_thread(erp, monkeypatch):
+    import threading
+
+    from web import catalog_lkg
+
+    writers = []
+    monkeypatch.setattr(catalog_lkg, "save", lambda products, options, signature: writers.append(
+        threading.current_thread()))
+    erp.items = [_item("A", "2026-01-01")]
+    erp_services.sync_catalog(full=True)
+    erp_services._lkg_thread.join()
+    assert len(writers) == 1 and writers[0] is not threading.current_thread()
+
+    # Another worker (nothing saved in-process) finds the signature in the cache.
+    thread = erp_services._lkg_thread
+    erp_services._publish_catalog_version(erp_services.get_all_products())
+    assert erp_services._lkg_thread is thread and len(writers) == 1
+
+    # A new catalog is not written while another worker holds the write.
+    cache.add(f"{erp_services.CATALOG_LKG_KEY}:lock", "other")
+    erp.items.append(_item("B", "2026-01-02"))
+    erp_services.sync_catalog(full=True)
+    assert erp_services._lkg_thread is thread and len(writers) == 1
+
+
+def test_boot_warm_up_fails_fast_to_the_last_known_good_catalog(erp, monkeypatch):
+    from integration import erp_client
+    from integration.erp_client import ERPNextUnavailable
+    from web import catalog_index, warmup
+
+    erp.items = [_item("A", "2026-01-01", brand="Dell")]
+    erp_services.sync_catalog(full=True)
+    erp_services._lkg_thread.join()
+    cache.clear()
+    catalog_index.reset()
+
+    budgets = []
+
+    class Down:
+        def iter_resource(self, doctype, **kwargs):
+            budgets.append(erp_client._fail_fast.get())
+            raise ERPNextUnavailable("connect timeout")
+
+    closed = []
+    monkeypatch.setattr(erp_services, "get_erp_client", lambda: Down())
+    monkeypatch.setattr(warmup.connections, "close_all", lambda: closed.append(True))
+    warmup.warm_on_boot()
+
+    assert budgets == [warmup.BOOT_CONNECT_TIMEOUT]
+    assert erp_services.catalog_degraded() and erp_services.get_catalog_index().get("A")
+    assert closed == [True]
+    catalog_index.reset()
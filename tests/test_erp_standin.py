@@ -0,0 +1,117 @@
+import threading
+
+import pytest
+import requests
+
+from integration import erp_client
+from integration.erp_client import ERPNextClient, ERPNextError, ERPNextUnavailable
+from integration.erp_standin import ERPNextStandIn, StandInAdapter, make_server
+from web import erp_services
+
+
+def _client(standin, **kwargs):
+    session = requests.Session()
+    session.mount("http://", StandInAdapter(standin))
+    return ERPNextClient(
+        base_url="http://erp.test", api_key="k", api_secret="s", session=session, **kwargs,
+    )
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers():
+    erp_client._reset_breakers()
+    yield
+    erp_client._reset_breakers()
+
+
+def test_item_list_pages_filters_and_projects_fields():
+    standin = ERPNextStandIn(catalog_size=25)
+    client = _client(standin)
+
+    rows = list(client.iter_resource(
+        "Item",
+        fields=["item_code", "standard_rate"],
+        filters=[["disabled", "=", 0]],
+        order_by="item_code asc",
+        page_length=10,
+    ))
+
+    enabled = [i for i in standin.rows("Item") if not i["disabled"]]
+    assert [r["item_code"] for r in rows] == sorted(i["item_code"] for i in enabled)
+    assert set(rows[0]) == {"item_code", "standard_rate"}
+    assert standin.calls == 3
+
+
+def test_count_matches_the_filtered_list():
+    standin = ERPNextStandIn(catalog_size=25)
+    client = _client(standin)
+
+    enabled = [i for i in standin.rows("Item") if not i["disabled"]]
+    assert client.count("Item") == 25
+    assert client.count("Item", filters=[["disabled", "=", 0]]) == len(enabled)
+
+
+def test_bin_lookup_by_item_codes():
+    standin = ERPNextStandIn(catalog_size=5)
+    client = _client(standin)
+
+    bins = list(client.iter_resource(
+        "Bin",
+        fields=["item_code", "actual_qty"],
+        filters=[["item_code", "in", ["LAP-00001", "LAP-00002"]]],
+    ))
+
+    assert {b["item_code"] for b in bins} == {"LAP-00001", "LAP-00002"}
+
+
+def test_checkout_creates_customer_once_and_submitting_bills_the_order(monkeypatch):
+    standin = ERPNextStandIn(catalog_size=3)
+    client = _client(standin)
+    monkeypatch.setattr(erp_services, "get_erp_client", lambda: client)
+    product = erp_services._map_erp_item(standin.get("Item", "LAP-00001"))
+
+    def checkout():
+        return erp_services.create_sales_order(
+            customer_name="Mona Ali", phone="01000000000", center="Nasr City",
+            address="1 Street", landmark="", notes="",
+            cart_items=[{"product": product, "quantity": 1, "line_total": product["priceEGP"]}],
+        )
+
+    first, second = checkout()["data"], checkout()["data"]
+    assert first["name"] != second["name"]
+    assert first["customer"] == second["customer"] == "Mona Ali"
+    assert len(standin.rows("Customer")) == 1
+    assert first["customer_address"] and first["contact_person"]
+
+    client.request("PUT", f"/api/resource/Sales Order/{first['name']}", json={"data": {"docstatus": 1}})
+    (invoice,) = standin.rows("Sales Invoice")
+    inv = client.request("GET", f"/api/resource/Sales Invoice/{invoice['name']}")["data"]
+    assert inv["items"][0]["sales_order"] == first["name"]
+    assert client.download_pdf("Sales Invoice", invoice["name"]).startswith(b"%PDF")
+
+
+def test_injected_errors_and_slow_responses_surface_as_client_errors():
+    with pytest.raises(ERPNextError, match="503"):
+        _client(ERPNextStandIn(catalog_size=1, error_rate=1.0)).request("GET", "/api/resource/Item")
+
+    slow = _client(ERPNextStandIn(catalog_size=1, latency_ms=200), timeout=0.05, max_retries=0)
+    with pytest.raises(ERPNextUnavailable):
+        slow.request("GET", "/api/resource/Item")
+
+
+def test_http_server_serves_the_same_api():
+    server = make_server(ERPNextStandIn(catalog_size=4), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        client = ERPNextClient(
+            base_url=f"http://127.0.0.1:{server.server_address[1]}",
+            api_key="k", api_secret="s", session=requests.Session(),
+        )
+        doc = client.request("GET", "/api/resource/Item/LAP-00002")["data"]
+        assert doc["item_code"] == "LAP-00002"
+        with pytest.raises(ERPNextError, match="not found"):
+            client.request("GET", "/api/resource/Item/NOPE")
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,59 @@
+from web.facets import FacetIndex, mask_from_positions, positions
+from web.erp_services import faceted_search, filter_products
+
+
+def _p(code, brand, grade="A", in_stock=True, gpu="", ram=""):
+    return {
+        "item_code": code,
+        "name": {"en": f"{brand} {code}", "ar": code},
+        "brand": brand,
+        "grade": grade,
+        "keyboardLayout": "",
+        "inStock": in_stock,
+        "includesCharger": False,
+        "priceEGP": 1000.0,
+        "specs": {"gpu": gpu, "ram": ram},
+    }
+
+
+PRODUCTS = [
+    _p("1", "Dell", "A", gpu="NVIDIA RTX 3060", ram="16GB"),
+    _p("2", "Dell", "B", in_stock=False, gpu="Intel Iris Xe", ram="8GB"),
+    _p("3", "HP", "A", gpu="Intel UHD", ram="16GB"),
+    _p("4", "Lenovo", "B", gpu="AMD Radeon RX 6600M", ram="32GB"),
+]
+
+
+def test_positions_roundtrip():
+    ids = [0, 3, 8, 9, 700]
+    assert positions(mask_from_positions(ids, 701)) == ids
+    assert positions(0) == []
+
+
+def test_select_ors_within_and_ands_across_facets():
+    index = FacetIndex(PRODUCTS)
+    pick = lambda sel: [PRODUCTS[i]["item_code"] for i in positions(index.select(sel))]
+    assert pick({"brand": ["Dell", "HP"]}) == ["1", "2", "3"]
+    assert pick({"brand": ["Dell", "HP"], "grade": ["A"]}) == ["1", "3"]
+    assert pick({"gpu_type": ["Dedicated"]}) == ["1", "4"]
+    assert pick({"in_stock": ["1"], "ram": ["16GB"]}) == ["1", "3"]
+    assert pick({"brand": ["Acer"]}) == []
+
+
+def test_counts_are_disjunctive_per_facet():
+    index = FacetIndex(PRODUCTS)
+    counts = index.counts({"brand": ["Dell"], "grade": ["A"]})
+    # brand counts ignore the brand selection but honour grade=A
+    assert counts["brand"] == {"Dell": 1, "HP": 1, "Lenovo": 0}
+    # grade counts honour brand=Dell only
+    assert counts["grade"] == {"A": 1, "B": 1}
+    assert counts["in_stock"] == {"1": 1}
+
+
+def test_faceted_search_combines_search_filters_and_counts():
+    page = faceted_search(PRODUCTS, q="dell", grade="B", counts=True)
+    counts = page.facet_counts
+    assert [p["item_code"] for p in page.products] == ["2"] and page.total == 1
+    assert counts["grade"] == {"A": 1, "B": 1}
+    assert counts["brand"] == {"Dell": 1, "HP": 0, "Lenovo": 0}
+    assert [p["item_code"] for p in filter_products(PRODUCTS, in_stock=True, gpu_type="Integrated")] == ["3"]
@@ -0,0 +1,62 @@
+import pickle
+
+from django.template import Context, Template
+
+from integration.erp_standin import synthetic_dataset
+from web.erp_services import _map_erp_item
+from web.product_record import KEYS, ProductRecord
+
+
+def _item(**extra):
+    return {
+        "item_code": "LAP-1",
+        "item_name": "Dell Latitude 5420",
+        "description": "<p>Intel Core i7-1185G7, 16GB RAM, 512GB SSD</p>",
+        "image": "/files/lap-1.png",
+        "brand": "Dell",
+        "item_group": "Laptops",
+        "standard_rate": 25000,
+        "modified": "2026-01-01 10:00:00",
+        **extra,
+    }
+
+
+def test_record_reads_like_the_product_dict():
+    p = _map_erp_item(_item(custom_tags="Hot Deal, New"))
+
+    assert list(p) == list(KEYS)
+    assert p["id"] == p["slug"] == p.item_code == "LAP-1"
+    assert p["name"] == {"en": "Dell Latitude 5420", "ar": "Dell Latitude 5420"}
+    assert p["image_url"].endswith("/files/lap-1.png") and p["images"] == [p["image_url"]]
+    assert p["shortSpecs"]["en"] == ["Intel Core i7-1185G7, 16GB RAM, 512GB SSD"]
+    assert p["specs"]["ram"] == "16GB" and p.ramGB == 16
+    assert p.get("tags") == ["Hot Deal", "New"]
+    assert p.get("missing", "-") == "-" and "missing" not in p and "ramGB" in p
+    assert ProductRecord.from_dict(p.to_dict()) == p
+
+
+def test_unknown_keys_are_kept():
+    p = ProductRecord.from_dict({**_map_erp_item(_item()).to_dict(), "badge": "new"})
+
+    assert p["badge"] == "new" and p.get("badge") == "new"
+    assert list(p)[-1] == "badge" and len(p) == len(KEYS) + 1
+
+
+def test_pickle_round_trip_shares_interned_strings():
+    products = [_map_erp_item(i) for i in synthetic_dataset(50, seed=2)["Item"]]
+    loaded = pickle.loads(pickle.dumps(products, pickle.HIGHEST_PROTOCOL))
+
+    assert loaded == products
+    by_brand = {}
+    for p in loaded:
+        assert by_brand.setdefault(p.brand, p.brand) is p.brand
+
+
+def test_templates_access_fields_by_name():
+    p = _map_erp_item(_item(custom_name_ar="ديل"))
+    html = Template(
+        "{% load web_tags %}{{ product.name|loc:'ar' }} {{ product.priceEGP|price }} "
+        "{{ product.specs|get_item:'storage' }} {{ product.slug }}"
+    ).render(Context({"product": p}))
+
+    assert html == "ديل 25,000 512GB SSD LAP-1"
@@ -0,0 +1,65 @@
+import time
+
+from web.search_index import SearchIndex, normalize, stem
+
+
+def _p(code, en="", ar="", brand="", group="Laptops", description=""):
+    return {
+        "item_code": code,
+        "name": {"en": en or code, "ar": ar or en or code},
+        "brand": brand,
+        "item_group": group,
+        "description": description,
+    }
+
+
+def test_normalize_folds_arabic_letter_variants_and_diacritics():
+    assert normalize("أَإِآٱ") == "اااا"
+    assert normalize("شاشة") == normalize("شاشه")
+    assert normalize("لابتوب مستعمل جديـــد") == "لابتوب مستعمل جديد"
+    assert normalize("ذكى") == normalize("ذكي")
+    assert normalize("رام ١٦") == "رام 16"
+
+
+def test_light_stemming():
+    assert stem(normalize("اللابتوبات")) == "لابتوب"
+    assert stem(normalize("والشاشات")) == "شاش"
+    assert stem("laptops") == "laptop"
+    assert stem("glass") == "glass"
+
+
+def test_search_matches_prefixes_subwords_and_arabic_variants():
+    index = SearchIndex([
+        _p("LAP-1", "HP EliteBook 840 G7", ar="لابتوب إتش بي", brand="HP",
+           description="<p>Core i7 16GB RAM</p>"),
+        _p("LAP-2", "Dell Latitude 5420", ar="لابتوب ديل والشاشة لمس", brand="Dell"),
+        _p("MOUSE-1", "Logitech Mouse", ar="ماوس", brand="Logitech", group="Accessories"),
+    ])
+
+    codes = lambda q: [p["item_code"] for p in index.search(q)]
+    assert codes("dell lat") == ["LAP-2"]
+    assert codes("book") == ["LAP-1"]
+    assert codes("16gb") == ["LAP-1"]
+    assert codes("i7 16") == ["LAP-1"]
+    assert codes("اللابتوب") == ["LAP-1", "LAP-2"]
+    assert codes("شاشه") == ["LAP-2"]
+    assert codes("لاب") == ["LAP-1", "LAP-2"]
+    assert codes("accessories") == ["MOUSE-1"]
+    assert codes("lap-2") == ["LAP-2"]
+    assert codes("dell mouse") == []
+    assert codes("  ") == []
+
+
+def test_search_is_fast_on_large_catalogs():
+    products = [
+        _p(f"LAP-{i:05d}", f"Brand{i % 50} Model{i % 700} Core i{3 + i % 3} {8 * (1 + i % 4)}GB",
+           ar=f"لابتوب موديل {i % 700}", brand=f"Brand{i % 50}")
+        for i in range(20000)
+    ]
+    index = SearchIndex(products)
+    index.search("brand7 model")  # warm the prefix cache
+
+    started = time.perf_counter()
+    for _ in range(100):
+        index.search("brand7 model")
+    assert (time.perf_counter() - started) / 100 < 0.005
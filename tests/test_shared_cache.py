@@ -0,0 +1,105 @@
+import time
+
+import pytest
+
+from web.shared_cache import SharedCache
+
+
+def _worker(path):
+    """One SharedCache instance = one worker process's view of the cache."""
+    return SharedCache(str(path), {"OPTIONS": {"L1_MAX_ENTRIES": 3}})
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "cache.sqlite3"
+
+
+def test_values_are_shared_between_workers(path):
+    a, b = _worker(path), _worker(path)
+    a.set("catalog", [1, 2, 3], timeout=60)
+
+    assert b.get("catalog") == [1, 2, 3]
+    assert b.get("catalog") == [1, 2, 3]
+    assert b.layer_stats()["l2_hits"] == 1
+    assert b.layer_stats()["l1_hits"] == 1
+    assert b.get("missing", "default") == "default"
+    assert b.layer_stats()["l2_misses"] == 1
+
+
+def test_writes_invalidate_other_workers_l1(path):
+    a, b = _worker(path), _worker(path)
+    a.set("k", "v1")
+    assert b.get("k") == "v1"  # now in b's L1
+
+    a.set("k", "v2")
+    assert b.get("k") == "v2"
+    a.delete("k")
+    assert b.get("k") is None
+    a.set_many({"x": 1, "y": 2})
+    assert b.get_many(["x", "y", "z"]) == {"x": 1, "y": 2}
+    a.clear()
+    assert b.get_many(["x", "y"]) == {}
+    assert b.layer_stats()["l1_invalidations"] >= 3
+
+
+def test_add_is_exclusive_across_workers(path):
+    a, b = _worker(path), _worker(path)
+    assert a.add("lock", "a", timeout=60)
+    assert not b.add("lock", "b", timeout=60)
+    assert b.get("lock") == "a"
+
+    a.set("short", 1, timeout=0.05)
+    time.sleep(0.1)
+    assert b.add("short", 2, timeout=60)
+    assert a.get("short") == 2
+
+
+def test_incr_and_expiry(path):
+    a, b = _worker(path), _worker(path)
+    a.set("n", 1)
+    assert b.incr("n", 5) == 6
+    assert a.get("n") == 6
+
+    a.set("gone", 1, timeout=0.05)
+    time.sleep(0.1)
+    assert b.get("gone") is None and a.get("gone") is None
+
+
+def test_l1_is_bounded_and_returns_copies(path):
+    a = _worker(path)
+    for i in range(5):
+        a.set(f"k{i}", {"i": i})
+    assert a.layer_stats()["l1_entries"] == 3
+
+    value = a.get("k4")
+    value["i"] = "mutated"
+    assert a.get("k4") == {"i": 4}
+
+
+def test_cull_evicts_soonest_expiring_entries_first(path, monkeypatch):
+    from web import shared_cache
+
+    monkeypatch.setattr(shared_cache, "_CULL_EVERY", 1)
+    a = SharedCache(str(path), {"OPTIONS": {"MAX_ENTRIES": 4, "CULL_FREQUENCY": 2}})
+    a.set("version", 1, timeout=None)
+    a.set("catalog", [1], timeout=3600)
+    for i in range(4):
+        a.set(f"stock:{i}", i, timeout=60 + i)
+    a.set("catalog", [2], timeout=3600)  # rewritten: keeps its old rowid
+
+    b = _worker(path)
+    assert b.get_many(["version", "catalog"]) == {"version": 1, "catalog": [2]}
+    assert b.get("stock:0") is None
+
+
+def test_own_writes_stay_in_l1(path):
+    a, b = _worker(path), _worker(path)
+    b.set("other", 1)
+    a.set("k", "v")
+    b.set("other", 2)
+
+    assert a.get("k") == "v"
+    assert a.get("other") == 2
+    assert a.layer_stats()["l1_hits"] == 1
+    assert a.layer_stats()["l1_invalidations"] == 1
@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from web.erp_services import faceted_search
+from web.facets import mask_from_positions
+from web.sort_orders import SortOrders
+
+
+def _products(n, seed=1):
+    rng = random.Random(seed)
+    return [
+        {
+            "item_code": f"P{i}",
+            "name": {"en": f"Model {rng.randint(0, 50)}", "ar": f"موديل {rng.randint(0, 50)}"},
+            "brand": rng.choice(["Dell", "HP"]),
+            "priceEGP": float(rng.randrange(1000, 5000, 500)),
+        }
+        for i in range(n)
+    ]
+
+
+def _expected(products, ids, sort):
+    ids = sorted(ids)
+    if sort == "price_asc":
+        ids.sort(key=lambda i: products[i]["priceEGP"])
+    elif sort == "price_desc":
+        ids.sort(key=lambda i: products[i]["priceEGP"], reverse=True)
+    elif sort == "name_en":
+        ids.sort(key=lambda i: products[i]["name"]["en"].casefold())
+    return ids
+
+
+@pytest.mark.parametrize("sort", ["newest", "price_asc", "price_desc", "name_en"])
+@pytest.mark.parametrize("share", [0.02, 0.5])  # sparse and dense paths
+def test_window_matches_sorting_the_filtered_list(sort, share):
+    products = _products(400)
+    rng = random.Random(2)
+    ids = [i for i in range(len(products)) if rng.random() < share]
+    orders = SortOrders(products)
+    mask = mask_from_positions(ids, len(products))
+    expected = _expected(products, ids, sort)
+
+    assert orders.window(mask, sort) == expected
+    assert orders.window(mask, sort, 3, 8) == expected[3:8]
+    assert orders.window(mask, sort, len(ids) + 5, len(ids) + 10) == []
+
+
+def test_faceted_search_pages_in_sorted_order():
+    products = _products(50)
+    page = faceted_search(products, brand="Dell", sort_by="price_desc", offset=2, limit=5)
+    dell = [p for p in products if p["brand"] == "Dell"]
+    expected = sorted(dell, key=lambda p: p["priceEGP"], reverse=True)[2:7]
+    assert page.total == len(dell)
+    assert page.products == expected
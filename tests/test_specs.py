@@ -0,0 +1,86 @@
+import pytest
+
+from integration.erp_standin import synthetic_dataset
+from web.erp_services import _build_filter_options, _map_erp_item, faceted_search
+from web.specs import extract_specs, spec_fields
+
+
+@pytest.mark.parametrize("text, family, cpu", [
+    ("Dell Latitude 5420 Core i7-1185G7 16GB RAM", "i7", "Intel Core i7-1185G7"),
+    ("HP ProBook i5 11th Gen", "i5", "Intel Core i5"),
+    ("Lenovo Yoga Core Ultra 7 155H", "Ultra 7", "Intel Core Ultra 7 155H"),
+    ("ASUS TUF AMD Ryzen 5 5600H", "Ryzen 5", "AMD Ryzen 5 5600H"),
+    ("MacBook Air Apple M2 Pro", "Apple M2", "Apple M2 Pro"),
+    ("Acer Aspire Celeron N4020", "Celeron", "Intel Celeron"),
+    ("ThinkPad T480", "", ""),
+])
+def test_cpu_family(text, family, cpu):
+    parsed = extract_specs({"item_name": text})
+    assert parsed["cpuFamily"] == family
+    assert parsed["specs"]["cpu"] == cpu
+
+
+def test_parses_description_text():
+    parsed = extract_specs({
+        "item_name": "Dell Precision 5550",
+        "description": "<ul><li>CPU: Intel Core i7-10850H</li><li>RAM: 32GB</li>"
+                       "<li>Storage: 1TB SSD</li><li>GPU: NVIDIA Quadro T1000</li>"
+                       "<li>Screen: 15.6 inch</li></ul>",
+    })
+    assert parsed["ramGB"] == 32
+    assert (parsed["storageGB"], parsed["storageType"]) == (1024, "SSD")
+    assert parsed["gpuClass"] == "Dedicated"
+    assert parsed["screenInches"] == 15.6
+    assert parsed["specs"]["storage"] == "1TB SSD"
+    assert parsed["specs"]["screen"] == '15.6"'
+
+
+def test_storage_size_is_not_taken_for_ram():
+    parsed = extract_specs({"item_name": "HP 840 G8 i5 256GB SSD 8GB 14\""})
+    assert parsed["ramGB"] == 8
+    assert parsed["storageGB"] == 256
+    assert parsed["screenInches"] == 14
+
+
+def test_arabic_and_integrated_gpu():
+    parsed = extract_specs({"item_name": "لابتوب رام 16 شاشة 13.3 بوصة Intel Iris Xe"})
+    assert parsed["ramGB"] == 16
+    assert parsed["screenInches"] == 13.3
+    assert parsed["gpuClass"] == "Integrated"
+
+
+def test_variant_attributes_win_over_text():
+    parsed = extract_specs({
+        "item_name": "Laptop 8GB RAM",
+        "attributes": [{"attribute": "RAM", "attribute_value": "16"},
+                       {"attribute": "Screen Size", "attribute_value": "14"}],
+    })
+    assert parsed["ramGB"] == 16
+    assert parsed["screenInches"] == 14
+
+
+def test_unrecognised_item_has_empty_fields():
+    parsed = extract_specs({"item_name": "USB-C Charger 65W"})
+    assert parsed["specs"] == {"cpu": "", "ram": "", "storage": "", "gpu": "", "screen": ""}
+    assert parsed["ramGB"] is None and parsed["gpuClass"] == ""
+
+
+def test_spec_fields_fall_back_to_display_strings():
+    fields = spec_fields({"specs": {"cpu": "Intel Core i7-1185G7", "ram": "16GB DDR4",
+                                    "storage": "512GB NVMe SSD", "gpu": "Intel Iris Xe Graphics",
+                                    "screen": "15.6\" FHD IPS (1920x1080)"}})
+    assert fields == {"cpuFamily": "i7", "ramGB": 16, "storageGB": 512, "storageType": "SSD",
+                      "gpuClass": "Integrated", "screenInches": 15.6}
+
+
+def test_synced_items_feed_facets_and_filter_options():
+    products = [_map_erp_item(item) for item in synthetic_dataset(200, seed=3)["Item"]]
+    assert all(p["ramGB"] and p["cpuFamily"] and p["screenInches"] for p in products)
+
+    options = _build_filter_options(products)
+    assert options["rams"] == sorted(options["rams"], key=lambda r: int(r[:-2]))
+
+    ram = options["rams"][0]
+    page = faceted_search(products, ram=[ram], gpu_type="Dedicated", counts=True)
+    assert page.total == sum(1 for p in products if f"{p['ramGB']}GB" == ram and p["gpuClass"] == "Dedicated")
+    assert sum(page.facet_counts["storage"].values()) == page.total
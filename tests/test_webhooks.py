@@ -0,0 +1,83 @@
+import pytest
+
+from orders import webhooks
+
+URL = "/api/webhooks/erpnext/item/"
+
+
+class _Inline:
+    """Runs the webhook's background task in the request thread."""
+
+    def __init__(self, target, args, daemon):
+        self.target, self.args = target, args
+
+    def start(self):
+        self.target(*self.args)
+
+
+@pytest.fixture
+def applied(monkeypatch):
+    calls = []
+    monkeypatch.setattr(webhooks.threading, "Thread", _Inline)
+    monkeypatch.setattr(webhooks, "catalog_patches_are_shared", lambda: True)
+    monkeypatch.setattr(webhooks, "apply_item_change", lambda code, deleted=False: calls.append((code, deleted)))
+    return calls
+
+
+def test_item_webhook_applies_updates_and_deletes(api_client, applied):
+    assert api_client.post(URL, {"name": "LAP-1"}, format="json").status_code == 200
+    response = api_client.post(URL, {"name": "LAP-2", "event": "on_trash"}, format="json")
+
+    assert response.json() == {"status": "accepted", "item": "LAP-2", "event": "on_trash"}
+    assert applied == [("LAP-1", False), ("LAP-2", True)]
+
+
+def test_item_webhook_checks_secret_and_payload(api_client, applied, settings):
+    settings.ERPNEXT_WEBHOOK_SECRET = "s3cret"
+    assert api_client.post(URL, {"name": "LAP-1"}, format="json").status_code == 403
+
+    api_client.credentials(HTTP_X_WEBHOOK_SECRET="s3cret")
+    assert api_client.post(URL, {}, format="json").status_code == 400
+    assert api_client.post(URL, {"name": "LAP-1", "event": "on_submit"}, format="json").status_code == 400
+    assert api_client.post(URL, {"name": "LAP-1"}, format="json").status_code == 200
+    assert applied == [("LAP-1", False)]
+
+
+def test_item_webhook_requires_a_catalog_shared_by_all_workers(api_client, applied, monkeypatch):
+    monkeypatch.setattr(webhooks, "catalog_patches_are_shared", lambda: False)
+
+    assert api_client.post(URL, {"name": "LAP-1"}, format="json").status_code == 503
+    assert applied == []
+
+
+STOCK_URL = "/api/webhooks/erpnext/stock/"
+
+
+@pytest.fixture
+def queued(monkeypatch, settings):
+    codes = []
+    settings.STOCK_PUSH = True
+    monkeypatch.setattr(webhooks, "stock_pushes_are_shared", lambda: True)
+    monkeypatch.setattr(webhooks, "queue_stock_refresh", codes.extend)
+    return codes
+
+
+def test_stock_webhook_queues_a_refresh(api_client, queued):
+    assert api_client.post(STOCK_URL, {}, format="json").status_code == 400
+    response = api_client.post(STOCK_URL, {"item_code": "LAP-1"}, format="json")
+    assert response.json() == {"status": "accepted", "item": "LAP-1"}
+    assert queued == ["LAP-1"]
+
+
+def test_stock_webhook_requires_stock_push(api_client, queued, settings):
+    settings.STOCK_PUSH = False
+
+    assert api_client.post(STOCK_URL, {"item_code": "LAP-1"}, format="json").status_code == 503
+    assert queued == []
+
+
+def test_stock_webhook_requires_a_cache_shared_by_all_workers(api_client, queued, monkeypatch):
+    monkeypatch.setattr(webhooks, "stock_pushes_are_shared", lambda: False)
+
+    assert api_client.post(STOCK_URL, {"item_code": "LAP-1"}, format="json").status_code == 503
+    assert queued == []
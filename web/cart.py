@@ -28,19 +28,17 @@ def _get_cart(session):
 
 def get_cart_items(session):
     """Return list of cart items with product data from ERPNext."""
-    from .erp_services import get_all_products
+    from .erp_services import get_catalog_index
 
     cart = _get_cart(session)
     if not cart:
         return []
 
-    # Build a lookup from the cached products list
-    products = get_all_products()
-    product_map = {p["item_code"]: p for p in products}
+    index = get_catalog_index()
 
     items = []
     for entry in cart:
-        product = product_map.get(entry["item_code"])
+        product = index.get(entry["item_code"])
         if product:
             items.append({
                 "product": product,
@@ -0,0 +1,531 @@
+"""
+Cache helpers for catalog data pulled from ERPNext.
+
+``get_or_fetch`` replaces the plain ``cache.get`` → ERPNext → ``cache.set``
+pattern with a stale-while-revalidate cache:
+
+* every value is stored in an envelope carrying a soft and a hard expiry;
+* before the soft expiry the value is simply returned;
+* between soft and hard expiry the stale value is returned immediately and
+  a background thread refreshes it;
+* past the hard expiry the request blocks on the refresh — unless the
+  entry is *degraded* (the last refresh failed), in which case the stale
+  value keeps being served while refreshes are retried in the background.
+
+Refreshes are single-flight: inside one process concurrent callers share a
+single fetch, and across processes the fetching worker holds a short
+``cache.add`` lock while the others serve the previous value (or poll the
+cache when they have none).  The cross-process lock only helps when the
+cache backend is shared between workers (``CACHE_BACKEND=shared``, see
+``web.shared_cache``).
+
+Inside a request (``request_memo``, entered by
+``web.middleware.CatalogMemoMiddleware``) each key is read from the cache
+backend — and unpickled — at most once; later reads of the same key in
+that request get the same object back.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set
+
+from django.conf import settings
+from django.core.cache import cache
+
+from integration.erp_client import BACKGROUND, ERPNextError, erp_priority
+
+logger = logging.getLogger(__name__)
+
+FETCH_LOCK_TTL = getattr(settings, "CATALOG_FETCH_LOCK_SECONDS", 60)
+# Stale values are kept this long so they can be served while ERPNext is down.
+RETAIN_TTL = getattr(settings, "CATALOG_STALE_SECONDS", 86400)
+# While degraded, wait this long between background refresh attempts.
+DEGRADED_RETRY_SECONDS = getattr(settings, "CATALOG_DEGRADED_RETRY_SECONDS", 30)
+_LOCK_POLL_SECONDS = 0.05
+
+
+# ---------------------------------------------------------------------------
+# Counters
+# ---------------------------------------------------------------------------
+
+class _Stats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + n
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+_stats = _Stats()
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """Per-process counters.
+
+    ``fetches``            ERPNext fetches actually performed
+    ``fetch_errors``       fetches that raised ``ERPNextError``
+    ``coalesced``          in-process callers that waited on another thread's fetch
+    ``lock_waits``         callers that waited on another worker's fetch
+    ``served_previous``    callers answered with the previous value instead
+    ``served_stale``       soft-expired values served while refreshing
+    ``served_degraded``    values served after a failed refresh
+    ``background_refreshes`` refreshes started off the request path
+    ``memo_hits``          cache reads answered by the request memo
+    """
+    return _stats.snapshot()
+
+
+def get_layer_stats() -> Optional[Dict[str, int]]:
+    """Hit / miss counters per cache layer, if the backend keeps them (``web.shared_cache``)."""
+    layer_stats = getattr(cache, "layer_stats", None)
+    return layer_stats() if layer_stats else None
+
+
+# ---------------------------------------------------------------------------
+# Request memo
+# ---------------------------------------------------------------------------
+
+class _Memo:
+    __slots__ = ("values", "saved")
+
+    def __init__(self) -> None:
+        self.values: Dict[str, Any] = {}
+        self.saved = 0
+
+
+# Not inherited by background refresh threads (new threads start with an
+# empty context), so they always read the backend.
+_memo: ContextVar[Optional[_Memo]] = ContextVar("catalog_cache_memo", default=None)
+_MISSING = object()
+
+
+@contextmanager
+def request_memo():
+    """Memoize cache reads for the duration of the block; yields the memo.
+
+    ``memo.saved`` counts the backend reads it answered.  Values are shared
+    between callers of the same request: treat them as read-only, like the
+    products handed out by the catalog index.
+    """
+    memo = _Memo()
+    token = _memo.set(memo)
+    try:
+        yield memo
+    finally:
+        _memo.reset(token)
+
+
+def _read(key: str) -> Any:
+    """``cache.get(key)`` through the request memo (misses are memoized too)."""
+    memo = _memo.get()
+    if memo is None:
+        return cache.get(key)
+    value = memo.values.get(key, _MISSING)
+    if value is _MISSING:
+        value = memo.values[key] = cache.get(key)
+    else:
+        memo.saved += 1
+        _stats.incr("memo_hits")
+    return value
+
+
+def _read_many(keys: List[str]) -> Dict[str, Any]:
+    """``cache.get_many(keys)`` through the request memo."""
+    memo = _memo.get()
+    if memo is None:
+        return cache.get_many(keys)
+    todo = [k for k in keys if k not in memo.values]
+    if len(todo) < len(keys):
+        memo.saved += len(keys) - len(todo)
+        _stats.incr("memo_hits", len(keys) - len(todo))
+    if todo:
+        found = cache.get_many(todo)
+        for key in todo:
+            memo.values[key] = found.get(key)
+    return {k: memo.values[k] for k in keys if memo.values[k] is not None}
+
+
+def _remember(key: str, value: Any) -> None:
+    """Keep the request memo in step with a write made by this request."""
+    memo = _memo.get()
+    if memo is not None:
+        memo.values[key] = value
+
+
+# ---------------------------------------------------------------------------
+# In-process single flight
+# ---------------------------------------------------------------------------
+
+class _Flight:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+_flights_lock = threading.Lock()
+_flights: Dict[str, _Flight] = {}
+# Keys being refreshed by background batch refreshes (guarded by _flights_lock).
+_batch_refreshes: Set[str] = set()
+
+
+def single_flight(key: str, fn: Callable[[], Any]) -> Any:
+    """Run ``fn`` once per ``key`` at a time; concurrent callers share the result."""
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        _stats.incr("coalesced")
+        if flight.event.wait(FETCH_LOCK_TTL):
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        # Leader is stuck — do the work ourselves rather than hang the request.
+        return fn()
+
+    try:
+        flight.result = fn()
+        return flight.result
+    except BaseException as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.event.set()
+
+
+def _reset_after_fork() -> None:
+    global _flights_lock, _flights, _batch_refreshes
+    _flights_lock = threading.Lock()
+    _flights = {}
+    _batch_refreshes = set()
+    _stats.__init__()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# ---------------------------------------------------------------------------
+# Envelopes
+# ---------------------------------------------------------------------------
+
+def _envelope(value: Any, soft_ttl: float, hard_ttl: float, degraded: bool = False) -> Dict[str, Any]:
+    now = time.time()
+    return {
+        "value": value,
+        "fresh_until": now + soft_ttl,
+        "stale_until": now + max(hard_ttl, soft_ttl),
+        "degraded": degraded,
+    }
+
+
+def _retain_ttl(hard_ttl: float) -> int:
+    return int(max(hard_ttl, RETAIN_TTL))
+
+
+def _stamp_key(key: str) -> str:
+    return f"{key}:version"
+
+
+def store(key: str, value: Any, soft_ttl: float, hard_ttl: float, degraded: bool = False) -> Any:
+    """Write a fresh value for ``key`` (e.g. a derived cache rebuilt in place).
+
+    A small version stamp is written *after* the value (see ``get_stamp``).
+    ``degraded`` stores a fallback value (e.g. read from disk while ERPNext
+    is down) that keeps being served while refreshes are retried.
+    """
+    env = _envelope(value, soft_ttl, hard_ttl, degraded)
+    stamp = {"version": uuid.uuid4().hex, "fresh_until": env["fresh_until"], "degraded": degraded}
+    cache.set(key, env, timeout=_retain_ttl(hard_ttl))
+    cache.set(_stamp_key(key), stamp, timeout=_retain_ttl(hard_ttl))
+    _remember(key, env)
+    _remember(_stamp_key(key), stamp)
+    return value
+
+
+def get_stamp(key: str) -> Optional[Dict[str, Any]]:
+    """Return ``{"version", "fresh_until", "degraded"}`` for the value last stored under ``key``.
+
+    Lets a process keep structures derived from a large value (indexes)
+    and check them against one tiny cache read instead of loading the
+    value again.  Read the stamp *before* the value: the stamp is written
+    after it, so a value read later is never older than its stamp.
+    """
+    return _read(_stamp_key(key))
+
+
+def get_value(key: str) -> Any:
+    """Plain ``cache.get`` through the request memo (small bookkeeping values)."""
+    return _read(key)
+
+
+def set_value(key: str, value: Any, timeout: Optional[float] = None) -> None:
+    """Plain ``cache.set`` that keeps the request memo in step."""
+    cache.set(key, value, timeout=timeout)
+    _remember(key, value)
+
+
+def _mark_degraded(key: str, env: Dict[str, Any], hard_ttl: float) -> None:
+    retry = _envelope(env["value"], DEGRADED_RETRY_SECONDS, DEGRADED_RETRY_SECONDS, degraded=True)
+    # Keep the original hard expiry so callers can tell how old the data is.
+    retry["stale_until"] = env["stale_until"]
+    cache.set(key, retry, timeout=_retain_ttl(hard_ttl))
+    _remember(key, retry)
+    stamp = cache.get(_stamp_key(key))
+    if stamp is not None:
+        stamp = {**stamp, "fresh_until": retry["fresh_until"], "degraded": True}
+        cache.set(_stamp_key(key), stamp, timeout=_retain_ttl(hard_ttl))
+        _remember(_stamp_key(key), stamp)
+
+
+def is_degraded(key: str) -> bool:
+    """True when ``key`` is being served from a failed-refresh fallback."""
+    env = _read(key)
+    return bool(env and env.get("degraded"))
+
+
+# ---------------------------------------------------------------------------
+# Refresh
+# ---------------------------------------------------------------------------
+
+def _lock_key(key: str) -> str:
+    return f"{key}:lock"
+
+
+@contextmanager
+def refresh_lock(key: str):
+    """Hold the cross-process refresh lock of ``key`` for the block.
+
+    Waits while a refresh (in any worker) holds it, so a value patched in
+    place inside the block is not overwritten by a refresh that started
+    earlier.  Gives up waiting after ``FETCH_LOCK_TTL``, like a refresh does.
+    """
+    lock_key = _lock_key(key)
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + FETCH_LOCK_TTL
+    while not cache.add(lock_key, token, timeout=FETCH_LOCK_TTL):
+        if time.monotonic() >= deadline:
+            logger.warning("Cache lock for %s held too long; proceeding", key)
+            break
+        time.sleep(_LOCK_POLL_SECONDS)
+    try:
+        yield
+    finally:
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+
+def _refresh(key, fetch, soft_ttl, hard_ttl, force, on_store=None) -> Any:
+    env = cache.get(key)
+    _remember(key, env)
+    if env is not None and not force and time.time() < env["fresh_until"]:
+        # Another thread or worker refreshed it meanwhile.
+        return env["value"]
+
+    lock_key = _lock_key(key)
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, timeout=FETCH_LOCK_TTL):
+        try:
+            try:
+                value = fetch()
+            except ERPNextError:
+                _stats.incr("fetch_errors")
+                if env is None:
+                    raise
+                _mark_degraded(key, env, hard_ttl)
+                _stats.incr("served_degraded")
+                logger.warning("Refresh of %s failed; serving stale value", key)
+                return env["value"]
+            _stats.incr("fetches")
+            return _store_fetched(key, value, soft_ttl, hard_ttl, on_store)
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    # Another worker is refreshing this key.
+    if env is not None:
+        _stats.incr("served_previous")
+        return env["value"]
+
+    _stats.incr("lock_waits")
+    deadline = time.monotonic() + FETCH_LOCK_TTL
+    while time.monotonic() < deadline:
+        time.sleep(_LOCK_POLL_SECONDS)
+        env = cache.get(key)
+        if env is not None:
+            _remember(key, env)
+            return env["value"]
+        if cache.get(lock_key) is None:
+            break
+    logger.warning("Cache lock for %s expired without a value; fetching", key)
+    value = fetch()
+    _stats.incr("fetches")
+    return _store_fetched(key, value, soft_ttl, hard_ttl, on_store)
+
+
+def _store_fetched(key, value, soft_ttl, hard_ttl, on_store) -> Any:
+    store(key, value, soft_ttl, hard_ttl)
+    if on_store is not None:
+        on_store(value)
+    return value
+
+
+def _refresh_in_background(key, fetch, soft_ttl, hard_ttl, on_store=None) -> None:
+    with _flights_lock:
+        if key in _flights:
+            return  # a refresh is already running in this process
+
+    def run():
+        try:
+            with erp_priority(BACKGROUND):
+                single_flight(key, lambda: _refresh(key, fetch, soft_ttl, hard_ttl, False, on_store))
+        except Exception as exc:
+            logger.warning("Background refresh of %s failed: %s", key, exc)
+
+    _stats.incr("background_refreshes")
+    threading.Thread(target=run, daemon=True).start()
+
+
+def get_or_fetch(
+    key: str,
+    fetch: Callable[[], Any],
+    soft_ttl: float,
+    hard_ttl: float,
+    force: bool = False,
+    on_store: Optional[Callable[[Any], None]] = None,
+) -> Any:
+    """Return the value cached under ``key`` with stale-while-revalidate.
+
+    ``fetch`` may raise ``ERPNextError``: when a previous value exists it
+    is served (and the entry marked degraded), otherwise the exception is
+    re-raised in every caller that was waiting on that fetch.
+    ``force=True`` always blocks on a fresh fetch.
+    ``on_store`` is called with every newly fetched value right after it
+    is stored, in the fetching thread (e.g. to publish a version).
+    """
+    if not force:
+        env = _read(key)
+        if env is not None:
+            now = time.time()
+            if now < env["fresh_until"]:
+                return env["value"]
+            if now < env["stale_until"] or env["degraded"]:
+                _stats.incr("served_degraded" if env["degraded"] else "served_stale")
+                _refresh_in_background(key, fetch, soft_ttl, hard_ttl, on_store)
+                return env["value"]
+    return single_flight(key, lambda: _refresh(key, fetch, soft_ttl, hard_ttl, force, on_store))
+
+
+# ---------------------------------------------------------------------------
+# Batched variant (many keys, one fetch)
+# ---------------------------------------------------------------------------
+
+def store_many(values: Dict[str, Any], soft_ttl: float, hard_ttl: float) -> None:
+    """Write fresh values for many keys in one ``cache.set_many`` call."""
+    if values:
+        envs = {key: _envelope(value, soft_ttl, hard_ttl) for key, value in values.items()}
+        cache.set_many(envs, timeout=_retain_ttl(hard_ttl))
+        for key, env in envs.items():
+            _remember(key, env)
+
+
+def get_many_or_fetch(
+    ids: Iterable[Hashable],
+    key_fn: Callable[[Any], str],
+    fetch_many: Callable[[List[Any]], Dict[Any, Any]],
+    soft_ttl: float,
+    hard_ttl: float,
+) -> Dict[Any, Any]:
+    """Stale-while-revalidate lookup of many ids with one cache round trip.
+
+    Fresh and soft-expired entries are answered from a single
+    ``cache.get_many``; soft-expired ones are refreshed together in one
+    background ``fetch_many`` call.  Missing / hard-expired ids are fetched
+    with one blocking ``fetch_many`` call and written back with
+    ``cache.set_many``.  If that fetch raises ``ERPNextError`` hard-expired
+    ids fall back to their stale value and missing ids are left out of the
+    result.  Blocking fetches are not single-flight; background refreshes
+    skip ids this process is already refreshing, so one stale id costs at
+    most one refresh in flight however many requests see it.
+    """
+    ids = list(dict.fromkeys(ids))
+    keys = {key_fn(i): i for i in ids}
+    envs = _read_many(list(keys))
+    now = time.time()
+    result: Dict[Any, Any] = {}
+    missing: List[Any] = []
+    stale: List[Any] = []
+    expired: Dict[Any, Any] = {}
+
+    for key, ident in keys.items():
+        env = envs.get(key)
+        if env is None:
+            missing.append(ident)
+        elif now < env["fresh_until"]:
+            result[ident] = env["value"]
+        elif now < env["stale_until"] or env["degraded"]:
+            result[ident] = env["value"]
+            stale.append(ident)
+        else:
+            missing.append(ident)
+            expired[ident] = env["value"]
+
+    def fetch_and_store(batch: List[Any]) -> Dict[Any, Any]:
+        values = fetch_many(batch)
+        _stats.incr("fetches")
+        store_many({key_fn(i): v for i, v in values.items()}, soft_ttl, hard_ttl)
+        return values
+
+    if stale:
+        _stats.incr("served_stale", len(stale))
+        with _flights_lock:
+            batch = [i for i in stale if key_fn(i) not in _batch_refreshes]
+            batch_keys = {key_fn(i) for i in batch}
+            _batch_refreshes.update(batch_keys)
+
+        def run():
+            try:
+                with erp_priority(BACKGROUND):
+                    fetch_and_store(batch)
+            except Exception as exc:
+                logger.warning("Background batch refresh failed: %s", exc)
+            finally:
+                with _flights_lock:
+                    _batch_refreshes.difference_update(batch_keys)
+
+        if batch:
+            _stats.incr("background_refreshes")
+            threading.Thread(target=run, daemon=True).start()
+
+    if missing:
+        try:
+            result.update(fetch_and_store(missing))
+        except ERPNextError as exc:
+            _stats.incr("fetch_errors")
+            logger.warning("Batch fetch of %d keys failed: %s", len(missing), exc)
+            if expired:
+                _stats.incr("served_degraded", len(expired))
+                result.update(expired)
+    return result
@@ -0,0 +1,158 @@
+"""
+In-process lookup tables over the cached product list.
+
+``CatalogIndex`` is built once per catalog version (see
+``web.erp_services.get_catalog_index``) and kept by each worker process, so
+lookups by item_code, tag, brand or item group no longer scan — or even
+load — the whole catalog on every request.
+
+Products held by the index are shared by every request in the process:
+treat them as read-only.  ``products`` may be a plain list or a lazy
+sequence (``web.catalog_snapshot.SnapshotProducts``); the tables below hold
+catalog positions, so only the products a caller asks for are built.
+"""
+
+import json
+import threading
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+from .facets import FacetIndex
+from .search_index import SearchIndex
+from .sort_orders import SortOrders
+
+# ``ProductRecord`` or a plain product dict (read-only).
+Product = Mapping[str, Any]
+
+
+class CatalogIndex:
+    """Product list plus position indexes; list order (``modified desc``) is kept."""
+
+    def __init__(self, products: Sequence[Product], version: Optional[str] = None) -> None:
+        self.version = version
+        self.products = products
+        self.by_code: Dict[str, int] = {}
+        self.by_tag: Dict[str, List[int]] = {}
+        self.by_brand: Dict[str, List[int]] = {}
+        self.by_group: Dict[str, List[int]] = {}
+        self._offers: List[int] = []
+        self._search: Optional[SearchIndex] = None
+        self._facets: Optional[FacetIndex] = None
+        self._orders: Optional[SortOrders] = None
+        self._suggestions: Dict[str, str] = {}
+        self._build_lock = threading.Lock()
+
+        for i, p in enumerate(products):
+            self.by_code[p["item_code"]] = i
+            tags = p.get("tags") or []
+            for tag in tags:
+                self.by_tag.setdefault(tag, []).append(i)
+            self.by_brand.setdefault(p.get("brand") or "", []).append(i)
+            self.by_group.setdefault(p.get("item_group") or "", []).append(i)
+            if p.get("oldPriceEGP") or "Hot Deal" in tags:
+                self._offers.append(i)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def _rows(self, positions: List[int]) -> List[Product]:
+        products = self.products
+        return [products[i] for i in positions]
+
+    def get(self, item_code: str) -> Optional[Product]:
+        i = self.by_code.get(item_code)
+        return None if i is None else self.products[i]
+
+    def tagged(self, tag: str) -> List[Product]:
+        return self._rows(self.by_tag.get(tag, []))
+
+    def brand(self, brand: str) -> List[Product]:
+        return self._rows(self.by_brand.get(brand, []))
+
+    def group(self, item_group: str) -> List[Product]:
+        return self._rows(self.by_group.get(item_group, []))
+
+    def offers(self) -> List[Product]:
+        """Products on sale (old price set) or tagged "Hot Deal"."""
+        return self._rows(self._offers)
+
+    def suggestions_json(self, lang: str) -> str:
+        """JSON list of name / slug / brand / group of every product (header autosuggest)."""
+        cached = self._suggestions.get(lang)
+        if cached is None:
+            cached = self._suggestions[lang] = json.dumps([
+                {
+                    "name": p["name"][lang] if lang in p["name"] else p["name"]["en"],
+                    "slug": p["slug"],
+                    "brand": p["brand"],
+                    "item_group": p.get("item_group", ""),
+                }
+                for p in self.products
+            ], ensure_ascii=False)
+        return cached
+
+    @property
+    def search_index(self) -> SearchIndex:
+        """Inverted search index, built on first use for this catalog version."""
+        if self._search is None:
+            with self._build_lock:
+                if self._search is None:
+                    self._search = SearchIndex(self.products)
+        return self._search
+
+    @property
+    def facets(self) -> FacetIndex:
+        """Facet bitsets, built on first use for this catalog version."""
+        if self._facets is None:
+            with self._build_lock:
+                if self._facets is None:
+                    self._facets = FacetIndex(self.products)
+        return self._facets
+
+    @property
+    def orders(self) -> SortOrders:
+        """Pre-sorted permutations, built on first use for this catalog version."""
+        if self._orders is None:
+            with self._build_lock:
+                if self._orders is None:
+                    self._orders = SortOrders(self.products)
+        return self._orders
+
+    def search(self, query: str) -> List[Product]:
+        return self.search_index.search(query)
+
+    def related(self, product: Product, limit: int = 4) -> List[Product]:
+        """Same-brand products other than ``product``."""
+        out = []
+        for i in self.by_brand.get(product["brand"], []):
+            p = self.products[i]
+            if p["item_code"] != product["item_code"]:
+                out.append(p)
+                if len(out) >= limit:
+                    break
+        return out
+
+
+_lock = threading.Lock()
+_current: Optional[CatalogIndex] = None
+
+
+def index_for(version: Optional[str], load: Callable[[], Sequence[Product]]) -> CatalogIndex:
+    """Return this process's index for ``version``, building it from ``load()``.
+
+    Unversioned catalogs (``version`` is None) are indexed but not kept.
+    """
+    global _current
+    idx = _current
+    if idx is not None and version is not None and idx.version == version:
+        return idx
+    idx = CatalogIndex(load(), version)
+    if version is not None:
+        with _lock:
+            _current = idx
+    return idx
+
+
+def reset() -> None:
+    global _current
+    with _lock:
+        _current = None
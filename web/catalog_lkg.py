@@ -0,0 +1,96 @@
+"""
+Last known good catalog, persisted to local disk.
+
+The cached catalog only lives as long as the cache: after a restart or a
+deploy during an ERPNext outage every worker starts empty and has nothing
+to serve.  Whenever a catalog with new content is stored (see
+``web.erp_services._publish_catalog_version``) it is also written, with its
+filter options, to ``CATALOG_LKG_PATH`` — off the request path, by one
+worker (``web.erp_services._save_last_known_good``).  The file is written to a
+temporary name and renamed into place, so readers — other workers, the
+next process — only ever see a complete catalog.
+
+``load()`` is used by ``web.erp_services.get_all_products`` when ERPNext
+fails and no cached catalog exists; the loaded catalog is served in
+degraded mode until a refresh succeeds.
+"""
+
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+FORMAT = 1
+
+_lock = threading.Lock()
+# Signature of the catalog this process last wrote or read.
+_signature: Optional[str] = None
+
+
+def path() -> str:
+    return getattr(settings, "CATALOG_LKG_PATH", "") or os.path.join(
+        tempfile.gettempdir(), "hdstore-catalog-lkg.pickle"
+    )
+
+
+def is_saved(signature: str) -> bool:
+    """True when this process already wrote (or read) the catalog with ``signature``."""
+    return signature == _signature
+
+
+def save(products: List[Any], filter_options: Dict[str, list], signature: str) -> None:
+    """Atomically replace the saved catalog; raises ``OSError``."""
+    global _signature
+    data = {
+        "format": FORMAT,
+        "saved_at": time.time(),
+        "signature": signature,
+        "products": list(products),
+        "filter_options": filter_options,
+    }
+    target = path()
+    with _lock:
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+        _signature = signature
+    logger.info("Saved last known good catalog (%d products) to %s", len(data["products"]), target)
+
+
+def load() -> Optional[Dict[str, Any]]:
+    """The saved ``{"saved_at", "signature", "products", "filter_options"}``, or None."""
+    global _signature
+    target = path()
+    try:
+        with open(target, "rb") as f:
+            data = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError) as exc:
+        logger.warning("Ignoring unreadable last known good catalog %s: %s", target, exc)
+        return None
+    if not isinstance(data, dict) or data.get("format") != FORMAT:
+        logger.warning("Ignoring last known good catalog %s in an unknown format", target)
+        return None
+    _signature = data["signature"]
+    return data
+
+
+def reset() -> None:
+    global _signature
+    _signature = None
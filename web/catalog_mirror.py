@@ -0,0 +1,273 @@
+"""
+Database mirror of the ERPNext catalog (``integration.models.Product`` /
+``ProductStock``).
+
+Filled by ``manage.py sync_catalog_mirror`` (see
+``web.erp_services.sync_mirror``).  With ``CATALOG_SOURCE=db`` the cached
+catalog and stock are loaded from these tables instead of ERPNext; with
+``CATALOG_SOURCE=sql`` product lookups and the products page query the
+tables directly too, so filtering, counting, sorting and paging run in
+SQL rather than over the whole catalog in every worker.
+
+This module only talks to the database; fetching from ERPNext stays in
+``web.erp_services``.
+"""
+
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.db import transaction
+from django.db.models import Count, Max, Q, QuerySet
+
+from integration.models import Product, ProductStock
+
+from .product_record import ProductRecord, as_record
+from .search_index import normalize, tokenize
+from .specs import spec_fields, storage_label
+
+ProductDict = Dict[str, Any]
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+# Facet → (column, facet value → column value, column value → facet value)
+_FACET_COLUMNS: Dict[str, Tuple[str, Callable[[str], Any], Callable[[Any], str]]] = {
+    "brand": ("brand", str, str),
+    "grade": ("grade", str, str),
+    "keyboard": ("keyboard_layout", str, str),
+    "cpu": ("cpu_family", str, str),
+    "gpu_type": ("gpu_class", str, str),
+    "ram": ("ram_gb", lambda v: int(v.upper().removesuffix("GB")), lambda gb: f"{gb}GB"),
+    "storage": (
+        "storage_gb",
+        lambda v: int(float(v[:-2]) * (1024 if v.upper().endswith("TB") else 1)),
+        storage_label,
+    ),
+    "screen": ("screen_inches", Decimal, lambda inches: f"{float(inches):g}"),
+    "in_stock": ("disabled", lambda v: v != "1", lambda disabled: "" if disabled else "1"),
+    "charger": ("includes_charger", lambda v: v == "1", lambda charger: "1" if charger else ""),
+}
+
+# Sort key → ORDER BY (ties: newest first, like the in-process permutations)
+_ORDERINGS = {
+    "newest": ("-modified", "-id"),
+    "price_asc": ("price", "-modified", "-id"),
+    "price_desc": ("-price", "-modified", "-id"),
+    "name_en": ("sort_name_en", "-modified", "-id"),
+    "name_ar": ("sort_name_ar", "-modified", "-id"),
+}
+
+
+def _search_text(p: ProductDict) -> str:
+    name = p.get("name") or {}
+    parts = [
+        name.get("en") or "", name.get("ar") or "", p.get("brand") or "",
+        p.get("item_code") or "", p.get("item_group") or "",
+        _TAG_RE.sub(" ", p.get("description") or ""),
+    ]
+    return " ".join(dict.fromkeys(tokenize(" ".join(parts))))
+
+
+def _row(p: ProductDict, disabled: bool) -> Product:
+    name = p.get("name") or {}
+    spec = spec_fields(p)
+    return Product(
+        item_code=p["item_code"],
+        item_name=(name.get("en") or "")[:255],
+        name_ar=(name.get("ar") or "")[:255],
+        brand=(p.get("brand") or "")[:140],
+        item_group=(p.get("item_group") or "")[:140],
+        price=Decimal(str(p.get("priceEGP") or 0)),
+        disabled=disabled,
+        modified=p.get("modified") or "",
+        grade=p.get("grade") or "",
+        keyboard_layout=p.get("keyboardLayout") or "",
+        includes_charger=bool(p.get("includesCharger")),
+        cpu_family=spec["cpuFamily"] or "",
+        ram_gb=spec["ramGB"],
+        storage_gb=spec["storageGB"],
+        gpu_class=spec["gpuClass"] or "",
+        screen_inches=Decimal(str(spec["screenInches"])) if spec["screenInches"] else None,
+        search_text=_search_text(p),
+        sort_name_en=normalize(name.get("en") or "")[:255],
+        sort_name_ar=normalize(name.get("ar") or name.get("en") or "")[:255],
+        data=dict(p),
+    )
+
+
+_UPDATE_FIELDS = [
+    f.name for f in Product._meta.concrete_fields
+    if f.name not in ("id", "item_code", "synced_at")
+]
+
+
+@transaction.atomic
+def upsert(products: Iterable[ProductDict], disabled_codes: Iterable[str] = ()) -> int:
+    """Insert or update mapped products; ``disabled_codes`` are flagged disabled."""
+    disabled = set(disabled_codes)
+    # One row per item_code: parallel paging may repeat Items.
+    unique = {p["item_code"]: p for p in reversed(list(products))}
+    rows = [_row(p, code in disabled) for code, p in unique.items()]
+    if rows:
+        Product.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=["item_code"],
+            update_fields=_UPDATE_FIELDS,
+        )
+    return len(rows)
+
+
+def remove(item_codes: Iterable[str]) -> int:
+    codes = list(item_codes)
+    if not codes:
+        return 0
+    ProductStock.objects.filter(item_code__in=codes).delete()
+    return Product.objects.filter(item_code__in=codes).delete()[0]
+
+
+def remove_missing(item_codes: Iterable[str]) -> int:
+    """Delete mirrored products not in ``item_codes`` (after a full sync)."""
+    keep = set(item_codes)
+    stale = [c for c in Product.objects.values_list("item_code", flat=True) if c not in keep]
+    return remove(stale)
+
+
+def high_water() -> Optional[str]:
+    """Latest ERPNext ``modified`` timestamp in the mirror."""
+    return Product.objects.aggregate(m=Max("modified"))["m"] or None
+
+
+def save_stock(quantities: Dict[str, float]) -> None:
+    rows = [ProductStock(item_code=code, actual_qty=qty) for code, qty in quantities.items()]
+    if rows:
+        ProductStock.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=["item_code"],
+            update_fields=["actual_qty", "updated_at"],
+        )
+
+
+def stock_rows() -> Dict[str, float]:
+    """Every mirrored stock row (``item_code`` → ``actual_qty``)."""
+    return dict(ProductStock.objects.values_list("item_code", "actual_qty"))
+
+
+def stock_map(item_codes: Sequence[str]) -> Dict[str, float]:
+    """Mirrored stock; items without a stock row report 0."""
+    found = dict(
+        ProductStock.objects.filter(item_code__in=item_codes).values_list("item_code", "actual_qty")
+    )
+    return {code: max(found.get(code, 0), 0) for code in item_codes}
+
+
+# ---------------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------------
+
+def _listed() -> QuerySet:
+    return Product.objects.filter(disabled=False)
+
+
+def load_products() -> List[ProductRecord]:
+    """Every enabled product, ``modified desc`` (the cached catalog order)."""
+    rows = _listed().order_by(*_ORDERINGS["newest"]).values_list("data", flat=True)
+    return [ProductRecord.from_dict(data) for data in rows]
+
+
+def get_product(item_code: str) -> Optional[ProductRecord]:
+    return as_record(_listed().filter(item_code=item_code).values_list("data", flat=True).first())
+
+
+def _facet_q(facet: str, values: Sequence[str]) -> Q:
+    column, to_db, _ = _FACET_COLUMNS[facet]
+    parsed = []
+    for v in values:
+        try:
+            parsed.append(to_db(v))
+        except (ValueError, InvalidOperation):
+            continue  # unknown option label: matches nothing
+    return Q(**{f"{column}__in": parsed})
+
+
+def _search_q(query: str) -> Q:
+    tokens = dict.fromkeys(tokenize(query))
+    if not tokens:
+        return Q(pk__in=[])
+    q = Q()
+    for token in tokens:
+        q &= Q(search_text__contains=token)
+    return q
+
+
+def query(
+    *,
+    q: Optional[str] = None,
+    sort_by: str = "newest",
+    offset: int = 0,
+    limit: Optional[int] = None,
+    counts: bool = False,
+    selection: Optional[Dict[str, List[str]]] = None,
+) -> Tuple[List[ProductRecord], int, Optional[Dict[str, Dict[str, int]]]]:
+    """One products page in SQL: ``(products, total, facet_counts)``.
+
+    Same contract as ``web.erp_services.faceted_search``.  Search is a
+    substring match per normalized token (no stemming).  Counts are
+    disjunctive: one ``GROUP BY`` per facet over the other facets' filters.
+    """
+    selection = {f: v for f, v in (selection or {}).items() if v}
+    base = _listed()
+    if q:
+        base = base.filter(_search_q(q))
+    filters = {facet: _facet_q(facet, values) for facet, values in selection.items()}
+
+    matching = base
+    for cond in filters.values():
+        matching = matching.filter(cond)
+    total = matching.count()
+    ordered = matching.order_by(*_ORDERINGS.get(sort_by, _ORDERINGS["newest"]))
+    stop = None if limit is None else offset + limit
+    products = [ProductRecord.from_dict(data) for data in ordered.values_list("data", flat=True)[offset:stop]]
+
+    facet_counts = None
+    if counts:
+        facet_counts = {}
+        for facet, (column, _, to_label) in _FACET_COLUMNS.items():
+            qs = base
+            for other, cond in filters.items():
+                if other != facet:
+                    qs = qs.filter(cond)
+            rows = qs.exclude(**{f"{column}__isnull": True}).values(column).annotate(n=Count("id")).order_by()
+            by_value = {}
+            for row in rows:
+                label = to_label(row[column])
+                if label:
+                    by_value[label] = row["n"]
+            facet_counts[facet] = by_value
+    return products, total, facet_counts
+
+
+def filter_options() -> Dict[str, list]:
+    """Sidebar option lists, from ``DISTINCT`` column values."""
+    def distinct(column: str) -> list:
+        return list(
+            _listed().exclude(**{column: ""}).values_list(column, flat=True).distinct().order_by(column)
+        )
+
+    def distinct_numbers(column: str) -> list:
+        return list(
+            _listed().filter(**{f"{column}__isnull": False}).values_list(column, flat=True).distinct().order_by(column)
+        )
+
+    return {
+        "brands": [b for b in distinct("brand") if b != "—"],
+        "grades": distinct("grade"),
+        "rams": [f"{gb}GB" for gb in distinct_numbers("ram_gb")],
+        "storages": [storage_label(gb) for gb in distinct_numbers("storage_gb")],
+        "cpus": distinct("cpu_family"),
+        "screens": [f"{float(inches):g}" for inches in distinct_numbers("screen_inches")],
+        "keyboards": distinct("keyboard_layout"),
+    }
@@ -0,0 +1,364 @@
+"""
+Memory-mapped binary snapshot of the catalog, shared by all workers.
+
+Each catalog sync (``web.erp_services._sync_catalog``) writes the product
+list to ``CATALOG_SNAPSHOT_DIR/catalog-<version>.bin`` and then atomically
+points ``CURRENT`` at it.  Workers ``mmap`` the file read-only — the pages
+live once in the OS page cache no matter how many workers map them — and
+notice a new version with one ``stat`` of ``CURRENT`` per request.
+
+File layout (native byte order, recorded in the directory)::
+
+    b"HDCS" | format u16 | reserved u16 | directory length u32 | directory (JSON)
+    sections, 8-byte aligned:
+      price, old_price           float64 per row (old_price NaN = none)
+      flags                      uint8 per row (in stock, charger)
+      ram_gb, screen_x10         uint16 per row (0 = unknown)
+      storage_gb                 uint32 per row (0 = unknown)
+      <field>.id                 uint32 per row, index into the string table
+                                 (brand, item_group, grade, ... — few distinct values)
+      strings.offsets/.data      the string table
+      <text>.offsets/.data       per-row UTF-8 text (item_code, names, description, ...)
+
+Fixed-width columns are read in place through ``memoryview.cast``; a
+``ProductRecord`` is only built when ``SnapshotProducts[i]`` is asked for
+it (and then kept), so a worker materializes just the rows its pages render.
+"""
+
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+import uuid
+from array import array
+from collections.abc import Sequence
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from .product_record import SPEC_KEYS, ProductRecord
+
+logger = logging.getLogger(__name__)
+
+Product = Mapping[str, Any]
+
+MAGIC = b"HDCS"
+FORMAT_VERSION = 2
+POINTER = "CURRENT"
+# Snapshot files kept on disk (older ones may still be mapped by workers
+# that have not switched yet; unlinking a mapped file is safe on POSIX).
+KEEP = 3
+
+_HEADER = struct.Struct("<4sHHI")
+_ALIGN = 8
+_SEP = "\x1f"
+
+_FLAG_IN_STOCK = 1
+_FLAG_CHARGER = 2
+
+# Product keys held in string-table columns
+_INTERNED = (
+    "brand", "item_group", "grade", "keyboardLayout", "condition",
+    "cpuFamily", "gpuClass", "storageType", "stock_uom",
+)
+# Per-row text columns
+_TEXT = (
+    "item_code", "name_en", "name_ar", "images", "modified", "description",
+    "tags", "specs", "extra",
+)
+# Keys rebuilt from the columns; anything else goes to "extra" as JSON.
+_KNOWN = frozenset(_INTERNED) | {
+    "id", "item_code", "slug", "name", "priceEGP", "oldPriceEGP", "images", "image_url",
+    "inStock", "includesCharger", "shortSpecs", "specs", "tags", "description",
+    "modified", "ramGB", "storageGB", "screenInches",
+}
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+def _extra(p: Product) -> str:
+    # id, slug, image_url and shortSpecs are derived by ProductRecord.
+    extra = {k: v for k, v in p.items() if k not in _KNOWN}
+    return json.dumps(extra, ensure_ascii=False) if extra else ""
+
+
+def encode(products: List[Product], version: str, signature: str = "") -> bytes:
+    """Serialize ``products`` (``_map_erp_item`` records) into the snapshot format."""
+    n = len(products)
+    strings: Dict[str, int] = {}
+    fixed = {
+        "price": array("d"), "old_price": array("d"), "flags": array("B"),
+        "ram_gb": array("H"), "screen_x10": array("H"), "storage_gb": array("I"),
+    }
+    ids = {key: array("I") for key in _INTERNED}
+    texts: Dict[str, List[str]] = {key: [] for key in _TEXT}
+
+    for p in products:
+        fixed["price"].append(float(p.get("priceEGP") or 0))
+        old = p.get("oldPriceEGP")
+        fixed["old_price"].append(float(old) if old is not None else math.nan)
+        fixed["flags"].append(
+            (_FLAG_IN_STOCK if p.get("inStock") else 0) | (_FLAG_CHARGER if p.get("includesCharger") else 0)
+        )
+        fixed["ram_gb"].append(int(p.get("ramGB") or 0))
+        fixed["screen_x10"].append(int(round((p.get("screenInches") or 0) * 10)))
+        fixed["storage_gb"].append(int(p.get("storageGB") or 0))
+        for key in _INTERNED:
+            ids[key].append(strings.setdefault(str(p.get(key) or ""), len(strings)))
+
+        name = p.get("name") or {}
+        texts["item_code"].append(p.get("item_code") or "")
+        texts["name_en"].append(name.get("en") or "")
+        texts["name_ar"].append(name.get("ar") or "")
+        texts["images"].append(_SEP.join(p.get("images") or []))
+        texts["modified"].append(p.get("modified") or "")
+        texts["description"].append(p.get("description") or "")
+        texts["tags"].append(_SEP.join(p.get("tags") or []))
+        specs = p.get("specs") or {}
+        texts["specs"].append(json.dumps(specs, ensure_ascii=False) if specs else "")
+        texts["extra"].append(_extra(p))
+
+    sections: List[Tuple[str, str, bytes]] = [(k, a.typecode, a.tobytes()) for k, a in fixed.items()]
+    sections += [(f"{k}.id", "I", a.tobytes()) for k, a in ids.items()]
+
+    def text_sections(name: str, values: List[str]) -> None:
+        offsets = array("I", [0])
+        chunks = []
+        total = 0
+        for value in values:
+            data = value.encode("utf-8")
+            chunks.append(data)
+            total += len(data)
+            offsets.append(total)
+        sections.append((f"{name}.offsets", "I", offsets.tobytes()))
+        sections.append((f"{name}.data", "B", b"".join(chunks)))
+
+    text_sections("strings", sorted(strings, key=strings.__getitem__))
+    for key in _TEXT:
+        text_sections(key, texts[key])
+
+    # Directory offsets are relative to the end of header + directory.
+    layout: Dict[str, List[Any]] = {}
+    pos = 0
+    for name, typecode, data in sections:
+        layout[name] = [typecode, pos, len(data)]
+        pos += len(data) + (-len(data) % _ALIGN)
+    directory = json.dumps({
+        "version": version,
+        "signature": signature,
+        "count": n,
+        "byteorder": sys.byteorder,
+        "sections": layout,
+    }).encode()
+    head = _HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(directory)) + directory
+    head += b"\0" * (-len(head) % _ALIGN)
+
+    out = [head]
+    for _, _, data in sections:
+        out.append(data)
+        out.append(b"\0" * (-len(data) % _ALIGN))
+    return b"".join(out)
+
+
+def _prune(directory: str, keep: str) -> None:
+    files = [f for f in os.listdir(directory) if f.startswith("catalog-") and f.endswith(".bin")]
+    files.sort(key=lambda f: os.path.getmtime(os.path.join(directory, f)), reverse=True)
+    for name in files[KEEP:]:
+        if name != keep:
+            try:
+                os.unlink(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def publish(products: List[Product], directory: str, signature: str = "") -> str:
+    """Write a new snapshot of ``products`` and make it current; return its version.
+
+    With a content ``signature`` (``web.erp_services._catalog_signature``)
+    nothing is written when the current snapshot has the same one, so
+    workers keep their mapping and indexes instead of rebuilding them for
+    an unchanged catalog.
+    """
+    if signature:
+        snapshot = current(directory)
+        if snapshot is not None and snapshot.signature == signature:
+            return snapshot.version
+    os.makedirs(directory, exist_ok=True)
+    version = uuid.uuid4().hex
+    name = f"catalog-{version}.bin"
+    path = os.path.join(directory, name)
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(encode(products, version, signature))
+    os.replace(tmp, path)
+
+    pointer_tmp = os.path.join(directory, f"{POINTER}.{version}.tmp")
+    with open(pointer_tmp, "w") as f:
+        f.write(name)
+    os.replace(pointer_tmp, os.path.join(directory, POINTER))
+
+    _prune(directory, keep=name)
+    return version
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+class CatalogSnapshot:
+    """A read-only mapping of one snapshot file."""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        magic, fmt, _, dir_len = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError(f"{path}: not a catalog snapshot (format {fmt})")
+        directory = json.loads(bytes(buf[_HEADER.size:_HEADER.size + dir_len]))
+        if directory["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path}: written with {directory['byteorder']}-endian byte order")
+
+        self.path = path
+        self.version: str = directory["version"]
+        self.signature: str = directory.get("signature", "")
+        self.count: int = directory["count"]
+        base = _HEADER.size + dir_len
+        base += -base % _ALIGN
+        self._cols: Dict[str, memoryview] = {}
+        for name, (typecode, offset, size) in directory["sections"].items():
+            self._cols[name] = buf[base + offset:base + offset + size].cast(typecode)
+
+        offsets, data = self._cols["strings.offsets"], self._cols["strings.data"]
+        self._strings = [
+            sys.intern(str(data[offsets[i]:offsets[i + 1]], "utf-8")) for i in range(len(offsets) - 1)
+        ]
+        self.products = SnapshotProducts(self)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def text(self, column: str, i: int) -> str:
+        offsets = self._cols[f"{column}.offsets"]
+        return str(self._cols[f"{column}.data"][offsets[i]:offsets[i + 1]], "utf-8")
+
+    def interned(self, key: str, i: int) -> str:
+        return self._strings[self._cols[f"{key}.id"][i]]
+
+    def price(self, i: int) -> float:
+        return self._cols["price"][i]
+
+    def product(self, i: int) -> ProductRecord:
+        """Build the product record of row ``i``."""
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        cols = self._cols
+        images_text = self.text("images", i)
+        tags_text = self.text("tags", i)
+        specs_text = self.text("specs", i)
+        specs = json.loads(specs_text) if specs_text else {}
+        extra_text = self.text("extra", i)
+        old = cols["old_price"][i]
+        flags = cols["flags"][i]
+        screen = cols["screen_x10"][i]
+        return ProductRecord(
+            item_code=self.text("item_code", i),
+            name_en=self.text("name_en", i),
+            name_ar=self.text("name_ar", i),
+            priceEGP=cols["price"][i],
+            oldPriceEGP=None if math.isnan(old) else old,
+            images=images_text.split(_SEP) if images_text else [],
+            inStock=bool(flags & _FLAG_IN_STOCK),
+            includesCharger=bool(flags & _FLAG_CHARGER),
+            spec_texts=tuple(sys.intern(specs.get(k) or "") for k in SPEC_KEYS),
+            ramGB=cols["ram_gb"][i] or None,
+            storageGB=cols["storage_gb"][i] or None,
+            screenInches=screen / 10 if screen else None,
+            tags=tags_text.split(_SEP) if tags_text else [],
+            description=self.text("description", i),
+            modified=self.text("modified", i),
+            extra=json.loads(extra_text) if extra_text else None,
+            **{key: self.interned(key, i) for key in _INTERNED},
+        )
+
+
+class SnapshotProducts(Sequence):
+    """Lazy product list over a snapshot.
+
+    Indexing materializes a row once and keeps it (shared, read-only —
+    like every product of the catalog index).  Iterating builds rows that
+    are not kept unless already materialized, so one pass over the catalog
+    (index builds) does not pin every record in memory.
+    """
+
+    def __init__(self, snapshot: CatalogSnapshot) -> None:
+        self._snapshot = snapshot
+        self._rows: Dict[int, ProductRecord] = {}
+
+    def __len__(self) -> int:
+        return self._snapshot.count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        row = self._rows.get(i)
+        if row is None:
+            row = self._rows[i] = self._snapshot.product(i)
+        return row
+
+    def __iter__(self) -> Iterator[ProductRecord]:
+        rows, product = self._rows, self._snapshot.product
+        for i in range(len(self)):
+            row = rows.get(i)
+            yield row if row is not None else product(i)
+
+    def materialized(self) -> int:
+        """Number of rows built and kept so far."""
+        return len(self._rows)
+
+
+_lock = threading.Lock()
+_loaded: Optional[Tuple[Tuple[Any, ...], CatalogSnapshot]] = None
+
+
+def current(directory: str) -> Optional[CatalogSnapshot]:
+    """The snapshot ``CURRENT`` points at, mapped once per version per process.
+
+    Costs one ``stat`` when nothing changed.  Returns the previously mapped
+    snapshot (or None) when the new one cannot be read.
+    """
+    global _loaded
+    pointer = os.path.join(directory, POINTER)
+    try:
+        st = os.stat(pointer)
+    except FileNotFoundError:
+        return None
+    key = (pointer, st.st_ino, st.st_mtime_ns, st.st_size)
+    loaded = _loaded
+    if loaded is not None and loaded[0] == key:
+        return loaded[1]
+    with _lock:
+        if _loaded is not None and _loaded[0] == key:
+            return _loaded[1]
+        try:
+            with open(pointer) as f:
+                name = f.read().strip()
+            snapshot = CatalogSnapshot(os.path.join(directory, name))
+        except (OSError, ValueError) as exc:
+            logger.warning("Cannot map catalog snapshot %s: %s", pointer, exc)
+            return _loaded[1] if _loaded is not None else None
+        _loaded = (key, snapshot)
+        return snapshot
+
+
+def reset() -> None:
+    global _loaded
+    with _lock:
+        _loaded = None
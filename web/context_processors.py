@@ -1,5 +1,6 @@
 """Context processors for the web app."""
 from .cart import get_cart_count
+from .erp_services import catalog_degraded
 from .translations import get_translations
 # Note: cart now uses erp_services internally for product lookups
 
@@ -24,3 +25,10 @@ def translations_context(request):
         "other_lang": "ar" if lang == "en" else "en",
         "other_lang_label": "العربية" if lang == "en" else "English",
     }
+
+
+def catalog_status_context(request):
+    """Flag pages rendered from a fallback catalog (ERPNext unreachable)."""
+    return {
+        "catalog_degraded": catalog_degraded(),
+    }
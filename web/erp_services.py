@@ -5,30 +5,77 @@ Replaces the static data.py.  All product / stock / order data now
 comes from the live ERPNext instance via integration.erp_client.
 """
 
-import json
+import hashlib
 import logging
-import re
+import threading
+import time
 from datetime import date, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
 from urllib.parse import quote
 
 from django.conf import settings
-from django.core.cache import cache
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
 
 from integration.erp_client import (
+    BACKGROUND,
     ERPNextAuthError,
     ERPNextError,
+    ERPNextNotFound,
     ERPNextUnavailable,
+    erp_priority,
     get_erp_client,
 )
 
+from . import catalog_lkg, catalog_mirror, catalog_snapshot
+from .catalog_cache import (
+    DEGRADED_RETRY_SECONDS,
+    FETCH_LOCK_TTL,
+    get_many_or_fetch,
+    get_or_fetch,
+    get_stamp,
+    get_value,
+    refresh_lock,
+    set_value,
+    single_flight,
+    store,
+    store_many,
+)
+from .catalog_index import CatalogIndex, index_for
+from .facets import FACETS, FacetIndex, mask_from_positions
+from .product_record import ProductRecord
+from .search_index import SearchIndex
+from .sort_orders import SortOrders
+from .specs import extract_specs, spec_fields, storage_label
+
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
 # Cache TTLs (seconds)
 # ---------------------------------------------------------------------------
+# Soft TTLs: after these, cached values are served stale while a background
+# refresh runs.  Hard TTLs: after these, requests block on the refresh.
 PRODUCTS_CACHE_TTL = getattr(settings, "CATALOG_CACHE_SECONDS", 300)
+PRODUCTS_HARD_TTL = getattr(settings, "CATALOG_MAX_STALE_SECONDS", 3600)
 STOCK_CACHE_TTL = getattr(settings, "STOCK_CACHE_SECONDS", 30)
+STOCK_HARD_TTL = getattr(settings, "STOCK_MAX_STALE_SECONDS", 300)
+# Max item codes per Bin "in" query (keeps the GET URL short)
+STOCK_BULK_CHUNK = getattr(settings, "STOCK_BULK_CHUNK", 100)
+# Catalog refreshes only fetch Items modified since the last sync; a full
+# resync runs this often to drop deleted Items and repair drift.
+FULL_SYNC_INTERVAL = getattr(settings, "CATALOG_FULL_SYNC_SECONDS", 3600)
+CATALOG_FETCH_WORKERS = getattr(settings, "CATALOG_FETCH_WORKERS", 2)
+# Where catalog / stock reads come from: "erpnext" (default), "db" (the
+# local mirror, see web.catalog_mirror) or "sql" (the mirror, with product
+# lookups and the products page queried in SQL).
+CATALOG_SOURCE = getattr(settings, "CATALOG_SOURCE", "erpnext")
+# When set, each sync also writes a memory-mapped snapshot here that every
+# worker serves the catalog index from (see web.catalog_snapshot).
+CATALOG_SNAPSHOT_DIR = getattr(settings, "CATALOG_SNAPSHOT_DIR", "")
+# Stock pushed by webhooks into the cache and ProductStock; misses read the
+# table (see push_stock / reconcile_stock).
+STOCK_PUSH = getattr(settings, "STOCK_PUSH", False)
+STOCK_PUSH_BATCH_SECONDS = getattr(settings, "STOCK_PUSH_BATCH_SECONDS", 0.5)
 
 # ---------------------------------------------------------------------------
 # Store constants (kept here so templates/checkout can reference them)
@@ -81,13 +128,14 @@ def _image_url(path: str) -> str:
     return f"{base}{path}"
 
 
-def _map_erp_item(item: Dict[str, Any]) -> Dict[str, Any]:
+def _map_erp_item(item: Dict[str, Any]) -> ProductRecord:
     """
-    Map an ERPNext Item dict → the product dict format templates expect.
+    Map an ERPNext Item dict → the product record templates expect.
 
     Works with ANY ERPNext item — laptops, clothing, electronics, etc.
     Only relies on standard ERPNext fields.  If custom fields happen to
-    exist they are picked up as bonuses.
+    exist they are picked up as bonuses.  ``id``, ``slug``, ``image_url``
+    and ``shortSpecs`` are derived by the record (see ``web.product_record``).
     """
     item_code = item.get("item_code", "")
     item_name = item.get("item_name") or item_code
@@ -103,34 +151,32 @@ def _map_erp_item(item: Dict[str, Any]) -> Dict[str, Any]:
     raw_tags = item.get("custom_tags") or ""
     tags = [t.strip() for t in raw_tags.split(",") if t.strip()] if raw_tags else []
 
-    # Clean description for short display
-    desc_clean = re.sub(r"<[^>]+>", "", description).strip()
-    short_desc = [desc_clean[:120]] if desc_clean else []
-
     image = _image_url(image_raw)
 
-    return {
-        "id": item_code,
+    # Parsed once here, at sync time: display strings + typed facet fields.
+    parsed = extract_specs(item)
+    specs = parsed.pop("specs")
+
+    return ProductRecord.from_dict({
         "item_code": item_code,
-        "slug": item_code,
         "name": {"en": item_name, "ar": name_ar},
         "brand": brand or item_group,
         "priceEGP": float(standard_rate),
         "oldPriceEGP": float(old_price) if old_price else None,
         "images": [image] if image else [],
-        "image_url": image,
         "inStock": not item.get("disabled", False),
         "condition": item.get("custom_condition") or "",
         "grade": item.get("custom_grade") or "",
         "includesCharger": bool(item.get("custom_includes_charger", False)),
         "keyboardLayout": item.get("custom_keyboard_layout") or "",
-        "shortSpecs": {"en": short_desc, "ar": short_desc},
-        "specs": {},
+        "specs": specs,
+        **parsed,
         "tags": tags,
         "item_group": item_group,
         "description": description,
         "stock_uom": item.get("stock_uom") or "Nos",
-    }
+        "modified": str(item.get("modified") or ""),
+    })
 
 
 # ---------------------------------------------------------------------------
@@ -150,60 +196,528 @@ _LIST_ITEM_FIELDS = [
     "is_stock_item",
     "disabled",
     "stock_uom",
+    "modified",
 ]
 
 
+ALL_PRODUCTS_KEY = "web:all_products"
+FILTER_OPTIONS_KEY = "web:filter_options"
+CATALOG_SYNC_KEY = "web:catalog_sync"
+CATALOG_VERSION_KEY = "web:catalog_version"
+# Signature of the catalog last saved to CATALOG_LKG_PATH by any worker
+CATALOG_LKG_KEY = "web:catalog_lkg"
+
+_sync_stats_lock = threading.Lock()
+_sync_stats: Dict[str, Any] = {
+    "full_syncs": 0,
+    "delta_syncs": 0,
+    "items_fetched": 0,
+    "last": None,
+}
+
+
+def get_sync_stats() -> Dict[str, Any]:
+    """Per-process catalog sync counters (``last`` describes the latest sync)."""
+    with _sync_stats_lock:
+        return dict(_sync_stats)
+
+
+def _record_sync(mode: str, fetched: int, upserted: int, removed: int, total: int) -> None:
+    with _sync_stats_lock:
+        _sync_stats[f"{mode}_syncs"] += 1
+        _sync_stats["items_fetched"] += fetched
+        _sync_stats["last"] = {
+            "mode": mode,
+            "fetched": fetched,
+            "upserted": upserted,
+            "removed": removed,
+            "catalog_size": total,
+            "at": time.time(),
+        }
+    logger.info(
+        "Catalog %s sync: fetched %d items (%d upserted, %d removed, %d total)",
+        mode, fetched, upserted, removed, total,
+    )
+
+
+def _scan_items(filters: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+    """Every Item matching ``filters``, each once.
+
+    Pages are fetched in parallel at fixed offsets, so the scan is ordered
+    by ``name`` — an Item saved mid-scan keeps its place — and a row
+    repeated because an Item was created mid-scan is kept once (the newest
+    copy).
+    """
+    client = get_erp_client()
+    items: Dict[str, Dict[str, Any]] = {}
+    for item in client.iter_resource(
+        "Item",
+        fields=_LIST_ITEM_FIELDS,
+        filters=filters,
+        order_by="name asc",
+        workers=CATALOG_FETCH_WORKERS,
+    ):
+        seen = items.get(item.get("item_code"))
+        if seen is None or (item.get("modified") or "") >= (seen.get("modified") or ""):
+            items[item.get("item_code")] = item
+    return list(items.values())
+
+
+def _fetch_all_products() -> List[Dict[str, Any]]:
+    """Every enabled Item, newest first (see ``_scan_items``)."""
+    products = [_map_erp_item(i) for i in _scan_items([["disabled", "=", 0]])]
+    products.sort(key=lambda p: p["modified"], reverse=True)
+    return products
+
+
+def _fetch_changed_items(since: str) -> List[Dict[str, Any]]:
+    """Items (disabled ones included) modified at or after ``since``, oldest first.
+
+    Paged by key rather than by offset: each page asks again for
+    ``modified >= <last modified received>`` in ``modified asc, name asc``
+    order, so an Item saved during the fetch moves to the end of the range
+    — where a later page reads it — instead of shifting an unread row
+    behind an earlier page boundary.  Rows of the boundary timestamp are
+    read twice and kept once; only a run of more than a page of Items with
+    the very same timestamp is paged by offset.  Each Item is returned once
+    (its newest row).
+    """
+    client = get_erp_client()
+    page_length = getattr(settings, "ERPNEXT_PAGE_LENGTH", 500)
+    items: Dict[str, Dict[str, Any]] = {}
+    cursor, start = since, 0
+    while True:
+        rows = client.list_page(
+            "Item",
+            fields=_LIST_ITEM_FIELDS,
+            filters=[["modified", ">=", cursor]],
+            order_by="modified asc, name asc",
+            start=start,
+            page_length=page_length,
+        )
+        for row in rows:
+            items.pop(row.get("item_code"), None)
+            items[row.get("item_code")] = row
+        if len(rows) < page_length:
+            return list(items.values())
+        last = rows[-1].get("modified")
+        start = start + page_length if last == cursor else 0
+        cursor = last
+
+
+def _apply_item_changes(
+    products: List[Dict[str, Any]], items: List[Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], int, int]:
+    """Patch a ``modified desc`` product list with changed ERPNext Items.
+
+    Disabled Items are removed; the rest are upserted at the front (they
+    were modified after everything already in the list).  Items whose
+    ``modified`` matches the cached product are left alone — the ``>=``
+    delta query always returns the newest Item again.
+    Returns ``(products, upserted, removed)``.
+    """
+    cached = {p["item_code"]: p["modified"] for p in products}
+    items = [
+        i for i in items
+        if i.get("disabled") or cached.get(i.get("item_code")) != i.get("modified")
+    ]
+    if not items:
+        return products, 0, 0
+    changed_codes = {i.get("item_code") for i in items}
+    existing_codes = {p["item_code"] for p in products}
+    upserts = [_map_erp_item(i) for i in items if not i.get("disabled")]
+    upserts.sort(key=lambda p: p["modified"], reverse=True)
+    kept = [p for p in products if p["item_code"] not in changed_codes]
+    removed = len(existing_codes & {i.get("item_code") for i in items if i.get("disabled")})
+    return upserts + kept, len(upserts), removed
+
+
+def _sync_catalog(full: bool = False) -> List[Dict[str, Any]]:
+    """Refresh the catalog, fetching only Items modified since the last sync.
+
+    Falls back to a full fetch when there is no cached catalog or sync
+    state, or when the last full sync is older than FULL_SYNC_INTERVAL.
+    With a mirror ``CATALOG_SOURCE`` the catalog is read from the database.
+    Once the result is stored, ``_publish_catalog_version`` bumps the
+    catalog version if anything changed.
+    """
+    if CATALOG_SOURCE != "erpnext":
+        products = catalog_mirror.load_products()
+        _publish_snapshot(products)
+        return products
+
+    now = time.time()
+    state = cache.get(CATALOG_SYNC_KEY) or {}
+    env = cache.get(ALL_PRODUCTS_KEY)
+    current = env["value"] if env else None
+    delta = (
+        not full
+        and current is not None
+        and state.get("high_water")
+        and now - state.get("last_full", 0) < FULL_SYNC_INTERVAL
+    )
+
+    if delta:
+        # ">=" so Items saved within the same timestamp are not missed;
+        # the ones already cached are skipped by _apply_item_changes.
+        items = _fetch_changed_items(state["high_water"])
+        products, upserted, removed = _apply_item_changes(current, items)
+        _record_sync("delta", len(items), upserted, removed, len(products))
+        last_full = state.get("last_full", now)
+        changed = bool(upserted or removed) and _catalog_signature(products) != _catalog_signature(current)
+        # Only as far as the rows actually received (the last one is newest).
+        high_water = items[-1]["modified"] if items else state["high_water"]
+        high_water = max(high_water, state["high_water"])
+    else:
+        products = _fetch_all_products()
+        _record_sync("full", len(products), len(products), 0, len(products))
+        last_full = now
+        changed = True
+        high_water = max((p["modified"] for p in products), default=state.get("high_water", ""))
+
+    cache.set(
+        CATALOG_SYNC_KEY,
+        {"high_water": high_water, "last_full": last_full},
+        timeout=None,
+    )
+    if changed or (CATALOG_SNAPSHOT_DIR and catalog_snapshot.current(CATALOG_SNAPSHOT_DIR) is None):
+        _publish_snapshot(products)
+    return products
+
+
+def _publish_snapshot(products: List[Dict[str, Any]]) -> None:
+    if not CATALOG_SNAPSHOT_DIR:
+        return
+    try:
+        catalog_snapshot.publish(products, CATALOG_SNAPSHOT_DIR, _catalog_signature(products))
+    except OSError as exc:
+        # Workers keep serving the previous snapshot (or the cached list).
+        logger.warning("Writing catalog snapshot to %s failed: %s", CATALOG_SNAPSHOT_DIR, exc)
+
+
+# ---------------------------------------------------------------------------
+# Catalog version
+# ---------------------------------------------------------------------------
+# Every cache entry derived from the catalog embeds the catalog version in
+# its key (``versioned_key``), so one bump switches all of them at once and
+# the old entries simply age out.  The per-process catalog index is keyed
+# by it as well.
+
+def catalog_version() -> int:
+    """Version of the cached catalog (0 before the first sync)."""
+    return (get_value(CATALOG_VERSION_KEY) or {}).get("version", 0)
+
+
+def versioned_key(key: str, version: Optional[int] = None) -> str:
+    """``key`` for the current (or given) catalog version."""
+    return f"{key}:v{catalog_version() if version is None else version}"
+
+
+def _catalog_signature(products: List[Dict[str, Any]]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for p in products:
+        digest.update(f"{p['item_code']}\x1f{p['modified']}\n".encode())
+    return digest.hexdigest()
+
+
+def bump_catalog_version(products: Optional[List[Dict[str, Any]]] = None, signature: str = "") -> int:
+    """Publish a new catalog version and return it.
+
+    Versions only grow — they are seeded from the clock, so they keep
+    growing even if the cache was cleared.  With ``products``, the derived
+    entries that are cheap to build now (filter options) are written under
+    the new version before it is published.
+    """
+    previous = catalog_version()
+    version = max(previous + 1, time.time_ns() // 1_000_000)
+    if products is not None:
+        store(versioned_key(FILTER_OPTIONS_KEY, version), _build_filter_options(products),
+              soft_ttl=PRODUCTS_CACHE_TTL, hard_ttl=PRODUCTS_HARD_TTL)
+    set_value(CATALOG_VERSION_KEY, {"version": version, "signature": signature})
+    logger.info("Catalog version %s -> %s", previous, version)
+    return version
+
+
+def _publish_catalog_version(products: List[Dict[str, Any]]) -> None:
+    """``on_store`` of the catalog: bump the version if the content changed.
+
+    A changed catalog is also saved as the last known good one on disk
+    (see ``_save_last_known_good``).
+    """
+    signature = _catalog_signature(products)
+    if (get_value(CATALOG_VERSION_KEY) or {}).get("signature") != signature:
+        bump_catalog_version(products, signature)
+    _save_last_known_good(products, signature)
+
+
+_lkg_thread: Optional[threading.Thread] = None
+
+
+def _save_last_known_good(products: List[Dict[str, Any]], signature: str) -> None:
+    """Write ``products`` to ``CATALOG_LKG_PATH`` once, in a background thread.
+
+    The saved signature is kept in the cache and the write is claimed with
+    ``cache.add``, so with a shared cache one worker pickles and fsyncs each
+    new catalog instead of every worker; the caller never waits for the disk.
+    """
+    global _lkg_thread
+    if catalog_lkg.is_saved(signature) or get_value(CATALOG_LKG_KEY) == signature:
+        return
+    lock_key = f"{CATALOG_LKG_KEY}:lock"
+    if not cache.add(lock_key, signature, timeout=FETCH_LOCK_TTL):
+        return  # being written (by this or another worker); retried on the next store
+
+    def run():
+        try:
+            catalog_lkg.save(products, get_filter_options(), signature)
+            set_value(CATALOG_LKG_KEY, signature, timeout=None)
+        except OSError as exc:
+            logger.warning("Saving the last known good catalog failed: %s", exc)
+        finally:
+            cache.delete(lock_key)
+
+    _lkg_thread = threading.Thread(target=run, daemon=True)
+    _lkg_thread.start()
+
+
+def _serve_last_known_good() -> List[Dict[str, Any]]:
+    """Cache the catalog saved on disk as a degraded entry and return it.
+
+    Used when ERPNext fails with nothing cached (e.g. a restart during an
+    outage): instead of every request retrying the full fetch, the saved
+    catalog is served and ERPNext is retried in the background every
+    ``CATALOG_DEGRADED_RETRY_SECONDS``.  Returns ``[]`` if nothing was saved.
+    """
+    saved = catalog_lkg.load()
+    if saved is None:
+        return []
+    products = saved["products"]
+    store(ALL_PRODUCTS_KEY, products, soft_ttl=DEGRADED_RETRY_SECONDS, hard_ttl=0, degraded=True)
+    _publish_catalog_version(products)
+    store(versioned_key(FILTER_OPTIONS_KEY), saved["filter_options"],
+          soft_ttl=PRODUCTS_CACHE_TTL, hard_ttl=PRODUCTS_HARD_TTL)
+    logger.warning(
+        "ERPNext unavailable; serving the last known good catalog (%d products, saved %s)",
+        len(products), time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(saved["saved_at"])),
+    )
+    return products
+
+
+def catalog_degraded() -> bool:
+    """True while the catalog is served from a fallback because ERPNext failed."""
+    return bool((get_stamp(ALL_PRODUCTS_KEY) or {}).get("degraded"))
+
+
 def get_all_products(force_refresh: bool = False) -> List[Dict[str, Any]]:
     """
-    Fetch ALL non-disabled items from ERPNext in one call, cache them.
+    Fetch ALL non-disabled items from ERPNext (paged), cache them.
     Every view that needs product data calls this.
-    """
-    cache_key = "web:all_products"
-    if not force_refresh:
-        cached = cache.get(cache_key)
-        if cached is not None:
-            return cached
 
+    Served stale-while-revalidate (see ``web.catalog_cache``): an expired
+    catalog is returned immediately while a background refresh runs, and
+    the last good catalog keeps being served while ERPNext is down.
+    Refreshes are incremental (see ``_sync_catalog``).
+    When ERPNext fails and nothing is cached, the last known good catalog
+    saved on disk is served (``_serve_last_known_good``); returns ``[]``
+    only if there is none.
+    """
     try:
-        client = get_erp_client()
-        params = {
-            "fields": json.dumps(_LIST_ITEM_FIELDS),
-            "filters": json.dumps([["disabled", "=", 0]]),
-            "limit_page_length": "500",
-            "order_by": "modified desc",
-        }
-        data = client.request("GET", "/api/resource/Item", params=params)
-        items = data.get("data", [])
-        products = [_map_erp_item(i) for i in items]
-        cache.set(cache_key, products, timeout=PRODUCTS_CACHE_TTL)
-        return products
+        return get_or_fetch(
+            ALL_PRODUCTS_KEY,
+            _sync_catalog,
+            soft_ttl=PRODUCTS_CACHE_TTL,
+            hard_ttl=PRODUCTS_HARD_TTL,
+            force=force_refresh,
+            on_store=_publish_catalog_version,
+        )
     except ERPNextError as exc:
         logger.error("ERPNext get_all_products failed: %s", exc)
-        return []
+        return single_flight(f"{ALL_PRODUCTS_KEY}:lkg", _serve_last_known_good)
+
+
+def sync_catalog(full: bool = False) -> List[Dict[str, Any]]:
+    """Refresh the cached catalog now (delta unless ``full``); raises ERPNextError."""
+    return get_or_fetch(
+        ALL_PRODUCTS_KEY,
+        lambda: _sync_catalog(full=full),
+        soft_ttl=PRODUCTS_CACHE_TTL,
+        hard_ttl=PRODUCTS_HARD_TTL,
+        force=True,
+        on_store=_publish_catalog_version,
+    )
 
 
-def get_product_by_code(item_code: str) -> Optional[Dict[str, Any]]:
-    """Return a single product dict, trying cache first then single-item fetch."""
-    # Try the all-products cache
-    for p in get_all_products():
-        if p["item_code"] == item_code:
-            return p
+def apply_item_change(item_code: str, deleted: bool = False) -> str:
+    """Apply one changed or deleted ERPNext Item to the cached catalog.
 
-    # Fallback: fresh single fetch
-    cache_key = f"web:product:{item_code}"
-    cached = cache.get(cache_key)
-    if cached is not None:
-        return cached
+    Used by the Item webhook (``orders.webhooks.ERPNextItemWebhook``)
+    instead of waiting for the next poll: the Item is fetched and upserted
+    into — or, when disabled or ``deleted``, removed from — the cached list
+    (and the mirror tables when the site reads from them), then the
+    snapshot and a new catalog version are published as after a sync.
+    Runs under the catalog refresh lock, so a sync in progress finishes
+    first and is patched on top of.  Returns "upserted", "removed" or
+    "unchanged".  An Item ERPNext no longer has (deleted before the
+    webhook was delivered) is removed.  Raises ERPNextError.
 
+    Only reaches every worker when ``catalog_patches_are_shared()``; the
+    webhook refuses Items otherwise.
+    """
+    item = None if deleted else _fetch_item(item_code)
+    if item is None:
+        item = {"item_code": item_code, "disabled": 1}
+
+    with refresh_lock(ALL_PRODUCTS_KEY):
+        if CATALOG_SOURCE != "erpnext":
+            if deleted:
+                catalog_mirror.remove([item_code])
+            else:
+                catalog_mirror.upsert(
+                    [_map_erp_item(item)],
+                    disabled_codes=[item_code] if item.get("disabled") else [],
+                )
+
+        env = cache.get(ALL_PRODUCTS_KEY)
+        if env is None:
+            # Nothing cached yet: the next read loads the catalog anyway;
+            # still drop single-product entries derived from the old one.
+            bump_catalog_version()
+            return "unchanged"
+        products, upserted, removed = _apply_item_changes(env["value"], [item])
+        if not (upserted or removed):
+            return "unchanged"
+        store(ALL_PRODUCTS_KEY, products, soft_ttl=PRODUCTS_CACHE_TTL, hard_ttl=PRODUCTS_HARD_TTL)
+        _publish_snapshot(products)
+        _publish_catalog_version(products)
+
+    outcome = "upserted" if upserted else "removed"
+    logger.info("Item %s %s from webhook", item_code, outcome)
+    return outcome
+
+
+def catalog_patches_are_shared() -> bool:
+    """True when a catalog patched by one worker is served by all of them.
+
+    The cached list lives in the cache backend, so that needs a backend
+    shared between processes (``CACHE_BACKEND=shared``, or any non-local
+    backend) or the memory-mapped snapshot (``CATALOG_SNAPSHOT_DIR``); with
+    the default per-process LocMemCache only the patching worker would
+    see the change until the other workers' next poll.
+    """
+    return bool(CATALOG_SNAPSHOT_DIR) or not isinstance(caches["default"], LocMemCache)
+
+
+def stock_pushes_are_shared() -> bool:
+    """True when stock pushed by one worker is served by all of them.
+
+    Like ``catalog_patches_are_shared``, but the stock cache always lives in
+    the cache backend: the catalog snapshot does not help.
+    """
+    return not isinstance(caches["default"], LocMemCache)
+
+
+def sync_mirror(full: bool = False) -> Dict[str, Any]:
+    """Copy ERPNext Items and Bin totals into the local mirror tables.
+
+    Incremental by default: only Items modified since the newest mirrored
+    one are fetched (disabled ones are kept, flagged) and only their stock
+    is refreshed.  ``full`` (or an empty mirror) fetches every Item, drops
+    mirrored Items that no longer exist and refreshes all stock.  Items are
+    only dropped when the scan is known to be complete — ERPNext counted
+    as many Items before and after it as were received — since an Item
+    created or deleted mid-scan shifts the pages and may hide another.
+    When the site reads from the mirror the cached catalog is reloaded
+    afterwards.  Raises ERPNextError.
+    """
+    client = get_erp_client()
+    high_water = None if full else catalog_mirror.high_water()
+    if high_water:
+        items = _fetch_changed_items(high_water)
+    else:
+        expected = client.count("Item")
+        items = _scan_items()
+        complete = len(items) == expected == client.count("Item")
+    upserted = catalog_mirror.upsert(
+        [_map_erp_item(i) for i in items],
+        disabled_codes=[i.get("item_code") for i in items if i.get("disabled")],
+    )
+    removed = 0
+    if not high_water and complete:
+        removed = catalog_mirror.remove_missing(i.get("item_code") for i in items)
+    elif not high_water:
+        logger.warning(
+            "Catalog mirror full sync received %d Items but ERPNext counts %d; "
+            "not removing missing Items this time", len(items), expected,
+        )
+    codes = [i["item_code"] for i in items if i.get("item_code")]
+    catalog_mirror.save_stock(_fetch_stock_quantities(codes) if codes else {})
+
+    stats = {
+        "mode": "delta" if high_water else "full",
+        "fetched": len(items),
+        "upserted": upserted,
+        "removed": removed,
+    }
+    logger.info("Catalog mirror %(mode)s sync: %(fetched)d fetched, %(upserted)d upserted, %(removed)d removed", stats)
+    if CATALOG_SOURCE != "erpnext" and (upserted or removed):
+        get_all_products(force_refresh=True)
+    return stats
+
+
+def get_catalog_index() -> CatalogIndex:
+    """Return the lookup index over the cached catalog (see ``web.catalog_index``).
+
+    Rebuilt only when the catalog version changes.  While the catalog
+    is fresh this costs one small cache read; once it goes stale the list is
+    requested again so the usual background refresh still kicks in.
+    With ``CATALOG_SNAPSHOT_DIR`` the index is built over the current
+    memory-mapped snapshot instead of an unpickled copy of the list.
+    """
+    stamp = get_stamp(ALL_PRODUCTS_KEY) or {}
+    version = catalog_version() or stamp.get("version")
+    products = None
+    if time.time() >= stamp.get("fresh_until", 0):
+        products = get_all_products()
+    if CATALOG_SNAPSHOT_DIR:
+        snapshot = catalog_snapshot.current(CATALOG_SNAPSHOT_DIR)
+        if snapshot is not None:
+            return index_for(snapshot.version, lambda: snapshot.products)
+    if products is not None:
+        return index_for(version, lambda: products)
+    return index_for(version, get_all_products)
+
+
+def _fetch_item(item_code: str) -> Optional[Dict[str, Any]]:
+    """The full Item document, or None if it does not exist (any more)."""
+    client = get_erp_client()
     try:
-        client = get_erp_client()
         data = client.request("GET", f"/api/resource/Item/{item_code}")
-        item = data.get("data")
-        if not item:
-            return None
-        product = _map_erp_item(item)
-        cache.set(cache_key, product, timeout=PRODUCTS_CACHE_TTL)
+    except ERPNextNotFound:
+        return None
+    return data.get("data")
+
+
+def _fetch_product(item_code: str) -> Optional[Dict[str, Any]]:
+    item = _fetch_item(item_code)
+    return _map_erp_item(item) if item else None
+
+
+def get_product_by_code(item_code: str) -> Optional[Dict[str, Any]]:
+    """Return a single product dict, trying cache first then single-item fetch."""
+    if CATALOG_SOURCE == "sql":
+        return catalog_mirror.get_product(item_code)
+    product = get_catalog_index().get(item_code)
+    if product is not None or CATALOG_SOURCE == "db":
         return product
+
+    # Fallback: fresh single fetch
+    try:
+        return get_or_fetch(
+            versioned_key(f"web:product:{item_code}"),
+            lambda: _fetch_product(item_code),
+            soft_ttl=PRODUCTS_CACHE_TTL,
+            hard_ttl=PRODUCTS_HARD_TTL,
+        )
     except ERPNextError as exc:
         logger.error("ERPNext get_product_by_code(%s) failed: %s", item_code, exc)
         return None
@@ -215,43 +729,241 @@ def get_product_by_slug(slug: str) -> Optional[Dict[str, Any]]:
 
 
 def get_products_by_tag(tag: str) -> List[Dict[str, Any]]:
-    return [p for p in get_all_products() if tag in (p.get("tags") or [])]
+    return list(get_catalog_index().tagged(tag))
+
+
+def get_related_products(product: Dict[str, Any], limit: int = 4) -> List[Dict[str, Any]]:
+    """Same-brand products, excluding ``product`` itself."""
+    return get_catalog_index().related(product, limit)
 
 
 # ---------------------------------------------------------------------------
 # Stock
 # ---------------------------------------------------------------------------
 
+def _stock_key(item_code: str) -> str:
+    return f"web:stock:{item_code}"
+
+
+def _fetch_stock_quantities(item_codes: List[str]) -> Dict[str, float]:
+    """Sum Bin ``actual_qty`` per item with one query per chunk of codes."""
+    client = get_erp_client()
+    totals: Dict[str, float] = {code: 0 for code in item_codes}
+    for i in range(0, len(item_codes), STOCK_BULK_CHUNK):
+        chunk = item_codes[i:i + STOCK_BULK_CHUNK]
+        bins = client.iter_resource(
+            "Bin",
+            fields=["item_code", "actual_qty"],
+            filters=[["item_code", "in", chunk]],
+        )
+        for b in bins:
+            code = b.get("item_code")
+            if code in totals:
+                totals[code] += b.get("actual_qty") or 0
+    return {code: max(total, 0) for code, total in totals.items()}
+
+
+def _local_stock() -> bool:
+    return STOCK_PUSH or CATALOG_SOURCE != "erpnext"
+
+
+def fetch_stock_map(item_codes: List[str]) -> Dict[str, float]:
+    """Stock for many items: one cache read, one Bin query for the misses.
+
+    With ``STOCK_PUSH`` or a mirror ``CATALOG_SOURCE`` misses are read from
+    ``ProductStock`` instead.
+
+    Items whose stock cannot be determined (ERPNext down, nothing cached)
+    report 0, like ``fetch_stock_qty``.
+    """
+    codes = [c for c in dict.fromkeys(item_codes) if c]
+    if not codes:
+        return {}
+    found = get_many_or_fetch(
+        codes,
+        _stock_key,
+        catalog_mirror.stock_map if _local_stock() else _fetch_stock_quantities,
+        soft_ttl=STOCK_CACHE_TTL,
+        hard_ttl=STOCK_HARD_TTL,
+    )
+    return {code: found.get(code, 0) for code in codes}
+
+
 def fetch_stock_qty(item_code: str) -> float:
-    cache_key = f"web:stock:{item_code}"
-    cached = cache.get(cache_key)
-    if cached is not None:
-        return cached
+    return fetch_stock_map([item_code]).get(item_code, 0)
+
+
+def push_stock(quantities: Dict[str, float]) -> None:
+    """Write known stock totals into the stock cache and ``ProductStock``."""
+    if not quantities:
+        return
+    catalog_mirror.save_stock(quantities)
+    store_many(
+        {_stock_key(code): qty for code, qty in quantities.items()},
+        soft_ttl=STOCK_CACHE_TTL,
+        hard_ttl=STOCK_HARD_TTL,
+    )
+
+
+_stock_queue_lock = threading.Lock()
+_stock_queue: Set[str] = set()
+_stock_flush_timer: Optional[threading.Timer] = None
+
+
+def queue_stock_refresh(item_codes: List[str]) -> None:
+    """Refresh the stock of ``item_codes`` shortly, off the request path.
+
+    Called by the Bin / Stock Ledger Entry webhook.  Codes queued within
+    ``STOCK_PUSH_BATCH_SECONDS`` share one Bin query (a submitted Stock
+    Entry fires one webhook per line), whose totals go to ``push_stock``.
+    """
+    global _stock_flush_timer
+    with _stock_queue_lock:
+        _stock_queue.update(c for c in item_codes if c)
+        if _stock_flush_timer is not None or not _stock_queue:
+            return
+        _stock_flush_timer = threading.Timer(STOCK_PUSH_BATCH_SECONDS, flush_stock_queue)
+        _stock_flush_timer.daemon = True
+        _stock_flush_timer.start()
+
+
+def flush_stock_queue() -> int:
+    """Refresh every queued item now; returns how many were refreshed."""
+    global _stock_flush_timer
+    with _stock_queue_lock:
+        codes = sorted(_stock_queue)
+        _stock_queue.clear()
+        timer, _stock_flush_timer = _stock_flush_timer, None
+    if timer is not None:
+        timer.cancel()  # flushed early (no-op when called by the timer)
+    if not codes:
+        return 0
     try:
-        client = get_erp_client()
-        params = {
-            "fields": json.dumps(["actual_qty"]),
-            "filters": json.dumps([["item_code", "=", item_code]]),
-            "limit_page_length": "500",
-        }
-        data = client.request("GET", "/api/resource/Bin", params=params)
-        bins = data.get("data", [])
-        total = sum((b.get("actual_qty") or 0) for b in bins)
-        cache.set(cache_key, max(total, 0), timeout=STOCK_CACHE_TTL)
-        return max(total, 0)
+        with erp_priority(BACKGROUND):
+            push_stock(_fetch_stock_quantities(codes))
     except ERPNextError as exc:
-        logger.error("ERPNext stock for %s: %s", item_code, exc)
+        # reconcile_stock (or the cache TTL, without STOCK_PUSH) catches up.
+        logger.warning("Stock refresh of %d items failed: %s", len(codes), exc)
         return 0
+    return len(codes)
+
+
+def reconcile_stock() -> Dict[str, int]:
+    """Recompute every item's stock from all ERPNext Bins and fix drift.
+
+    Rows of ``ProductStock`` that differ (or are missing) are rewritten
+    along with their cache entries; items whose Bins are all gone drop to
+    0.  Returns ``{"items", "changed"}``.  Raises ERPNextError.
+
+    Bins change constantly while stock moves and pages are read in
+    parallel at fixed offsets, so the scan is ordered by ``name`` (stable
+    under updates) and each Bin is counted once by name — a row repeated
+    because a Bin was created mid-scan is not added twice.
+    """
+    quantities: Dict[str, Tuple[str, float]] = {}
+    bins = get_erp_client().iter_resource(
+        "Bin",
+        fields=["name", "item_code", "actual_qty"],
+        order_by="name asc",
+        workers=CATALOG_FETCH_WORKERS,
+    )
+    for b in bins:
+        if b.get("item_code"):
+            quantities[b.get("name")] = (b["item_code"], b.get("actual_qty") or 0)
+    totals: Dict[str, float] = {}
+    for code, qty in quantities.values():
+        totals[code] = totals.get(code, 0) + qty
+    current = catalog_mirror.stock_rows()
+    fresh = {code: max(total, 0) for code, total in totals.items()}
+    fresh.update({code: 0 for code in current if code not in fresh})
+    changed = {code: qty for code, qty in fresh.items() if current.get(code) != qty}
+    push_stock(changed)
+    stats = {"items": len(fresh), "changed": len(changed)}
+    logger.info("Stock reconciled: %(items)d items, %(changed)d changed", stats)
+    return stats
 
 
 # ---------------------------------------------------------------------------
-# Filtering (in-Python, same logic as old data.py but on ERPNext data)
+# Filtering (facet bitsets + search index over the cached catalog)
 # ---------------------------------------------------------------------------
 
+def _facet_selection(filters: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Turn ``filter_products`` keyword filters into a facet selection."""
+    selection: Dict[str, List[str]] = {}
+    for facet, value in filters.items():
+        if not value:
+            continue
+        if value is True:
+            selection[facet] = ["1"]
+        else:
+            values = value if isinstance(value, (list, tuple)) else [value]
+            selection[facet] = [str(v) for v in values]
+    return selection
+
+
+class CatalogPage(NamedTuple):
+    products: List[Dict[str, Any]]
+    total: int
+    facet_counts: Optional[Dict[str, Dict[str, int]]]
+
+
+def faceted_search(
+    products: Optional[List[Dict]] = None,
+    *,
+    q: Optional[str] = None,
+    sort_by: str = "newest",
+    offset: int = 0,
+    limit: Optional[int] = None,
+    counts: bool = False,
+    **filters: Any,
+) -> CatalogPage:
+    """Filter, search and sort products, materializing one page of them.
+
+    ``filters`` are the facets of ``web.facets.FACETS`` (brand, grade, ram,
+    storage, cpu, screen, keyboard, gpu_type, in_stock, charger); list values are
+    OR-ed within a facet.  ``sort_by`` is one of ``web.sort_orders.SORTS``
+    ("name" means English name).  Only ``[offset:offset + limit]`` of the
+    ordered result is built; ``total`` counts every match.  With
+    ``counts=True`` ``facet_counts`` maps facet → option → number of
+    results the option would give with the rest of the selection.
+    """
+    unknown = set(filters) - set(FACETS)
+    if unknown:
+        raise TypeError(f"Unknown product filters: {', '.join(sorted(unknown))}")
+
+    if products is None and CATALOG_SOURCE == "sql":
+        return CatalogPage(*catalog_mirror.query(
+            q=q, sort_by="name_en" if sort_by == "name" else sort_by,
+            offset=offset, limit=limit, counts=counts, selection=_facet_selection(filters),
+        ))
+
+    if products is None:
+        index = get_catalog_index()
+        products, facets, orders = index.products, index.facets, index.orders
+        search = index.search_index if q else None
+    else:
+        facets, orders = FacetIndex(products), SortOrders(products)
+        search = SearchIndex(products) if q else None
+
+    base = mask_from_positions(search.match_ids(q), facets.size) if search else None
+    selection = _facet_selection(filters)
+    mask = facets.select(selection, base)
+    total = mask.bit_count()
+    stop = None if limit is None else offset + limit
+    window = orders.window(mask, "name_en" if sort_by == "name" else sort_by, offset, stop, total)
+
+    return CatalogPage(
+        products=[products[i] for i in window],
+        total=total,
+        facet_counts=facets.counts(selection, base) if counts else None,
+    )
+
+
 def filter_products(
     products: Optional[List[Dict]] = None,
     brand=None,
     ram=None,
+    storage=None,
     cpu=None,
     screen=None,
     grade=None,
@@ -262,135 +974,71 @@ def filter_products(
     q=None,
     sort_by="newest",
 ) -> List[Dict[str, Any]]:
-    """Filter and sort the product list (works on cached ERPNext items)."""
-    results = list(products if products is not None else get_all_products())
-
-    if q:
-        q_lower = q.lower()
-        results = [
-            p for p in results
-            if q_lower in p["name"]["en"].lower()
-            or q_lower in p["name"]["ar"].lower()
-            or q_lower in p["brand"].lower()
-            or q_lower in p.get("item_code", "").lower()
-            or q_lower in p.get("description", "").lower()
-            or q_lower in p.get("item_group", "").lower()
-        ]
-
-    if brand:
-        brands_list = brand if isinstance(brand, list) else [brand]
-        results = [p for p in results if p["brand"] in brands_list]
-
-    if ram:
-        rams = ram if isinstance(ram, list) else [ram]
-        results = [
-            p for p in results
-            if p.get("specs", {}).get("ram", "").startswith(tuple(rams))
-        ]
-
-    if cpu:
-        cpus = cpu if isinstance(cpu, list) else [cpu]
-        results = [
-            p for p in results
-            if any(c.lower() in p.get("specs", {}).get("cpu", "").lower() for c in cpus)
-        ]
-
-    if screen:
-        screens = screen if isinstance(screen, list) else [screen]
-        results = [
-            p for p in results
-            if any(s in p.get("specs", {}).get("screen", "") for s in screens)
-        ]
-
-    if grade:
-        grades = grade if isinstance(grade, list) else [grade]
-        results = [p for p in results if p["grade"] in grades]
-
-    if keyboard:
-        kbs = keyboard if isinstance(keyboard, list) else [keyboard]
-        results = [p for p in results if p["keyboardLayout"] in kbs]
-
-    if in_stock:
-        results = [p for p in results if p["inStock"]]
-
-    if charger:
-        results = [p for p in results if p["includesCharger"]]
-
-    if gpu_type:
-        gpu_field = lambda p: p.get("specs", {}).get("gpu", "")
-        if gpu_type == "Dedicated":
-            results = [
-                p for p in results
-                if "NVIDIA" in gpu_field(p) or "Radeon" in gpu_field(p)
-            ]
-        elif gpu_type == "Integrated":
-            results = [
-                p for p in results
-                if "Intel" in gpu_field(p) and "NVIDIA" not in gpu_field(p)
-            ]
-
-    # Sort
-    if sort_by == "price_asc":
-        results.sort(key=lambda p: p["priceEGP"])
-    elif sort_by == "price_desc":
-        results.sort(key=lambda p: p["priceEGP"], reverse=True)
-    # newest = default order (ERPNext returns modified desc)
-
-    return results
+    """Filter and sort the product list (works on cached ERPNext items).
+
+    See ``faceted_search``; an explicit ``products`` list is indexed on the fly.
+    """
+    return faceted_search(
+        products,
+        q=q,
+        sort_by=sort_by,
+        brand=brand,
+        ram=ram,
+        storage=storage,
+        cpu=cpu,
+        screen=screen,
+        grade=grade,
+        keyboard=keyboard,
+        in_stock=in_stock,
+        charger=charger,
+        gpu_type=gpu_type,
+    ).products
 
 
 # ---------------------------------------------------------------------------
 # Dynamic filter options (derived from whatever items ERPNext returns)
 # ---------------------------------------------------------------------------
 
-def get_filter_options() -> Dict[str, list]:
-    """
-    Build filter-option lists from the actual products so the sidebar
-    always reflects what's in ERPNext rather than hard-coded lists.
-    """
-    cache_key = "web:filter_options"
-    cached = cache.get(cache_key)
-    if cached is not None:
-        return cached
-
-    products = get_all_products()
+def _build_filter_options(products: Optional[List[Dict]] = None) -> Dict[str, list]:
+    if products is None:
+        products = get_all_products()
 
     brands = sorted({p["brand"] for p in products if p["brand"] and p["brand"] != "—"})
     grades = sorted({p["grade"] for p in products if p["grade"]})
     keyboards = sorted({p["keyboardLayout"] for p in products if p["keyboardLayout"]})
 
-    # RAM / CPU / Screen — pull from specs (may be empty for non-laptop items)
-    rams = sorted({
-        p["specs"]["ram"]
-        for p in products
-        if p.get("specs", {}).get("ram") and p["specs"]["ram"] != "—"
-    })
-    cpus: set = set()
-    for p in products:
-        c = p.get("specs", {}).get("cpu", "")
-        if not c or c == "—":
-            continue
-        for fam in ("i3", "i5", "i7", "i9", "Ryzen 3", "Ryzen 5", "Ryzen 7", "Ryzen 9"):
-            if fam.lower() in c.lower():
-                cpus.add(fam)
-    screens = sorted({
-        p["specs"]["screen"]
-        for p in products
-        if p.get("specs", {}).get("screen") and p["specs"]["screen"] != "—"
-    })
+    # RAM / storage / CPU / screen — typed spec fields (empty for non-laptop items)
+    fields = [spec_fields(p) for p in products]
+    rams = sorted({f["ramGB"] for f in fields if f["ramGB"]})
+    storages = sorted({f["storageGB"] for f in fields if f["storageGB"]})
+    cpus = sorted({f["cpuFamily"] for f in fields if f["cpuFamily"]})
+    screens = sorted({f["screenInches"] for f in fields if f["screenInches"]})
 
     opts = {
         "brands": brands,
         "grades": grades,
-        "rams": rams,
-        "cpus": sorted(cpus),
-        "screens": screens,
+        "rams": [f"{gb}GB" for gb in rams],
+        "storages": [storage_label(gb) for gb in storages],
+        "cpus": cpus,
+        "screens": [f"{inches:g}" for inches in screens],
         "keyboards": keyboards,
     }
-    cache.set(cache_key, opts, timeout=PRODUCTS_CACHE_TTL)
     return opts
 
 
+def get_filter_options() -> Dict[str, list]:
+    """
+    Build filter-option lists from the actual products so the sidebar
+    always reflects what's in ERPNext rather than hard-coded lists.
+    """
+    return get_or_fetch(
+        versioned_key(FILTER_OPTIONS_KEY),
+        catalog_mirror.filter_options if CATALOG_SOURCE == "sql" else _build_filter_options,
+        soft_ttl=PRODUCTS_CACHE_TTL,
+        hard_ttl=PRODUCTS_HARD_TTL,
+    )
+
+
 # ---------------------------------------------------------------------------
 # Sales Order creation (ERPNext)
 # ---------------------------------------------------------------------------
@@ -431,15 +1079,13 @@ def create_sales_order(
 
     def _find_customer_by_name(name: str) -> str:
         try:
-            params = {
-                "fields": json.dumps(["name", "customer_name"]),
-                "filters": json.dumps([["customer_name", "=", name]]),
-                "limit_page_length": "1",
-            }
-            data = client.request("GET", "/api/resource/Customer", params=params)
-            results = data.get("data") or []
-            if results:
-                return results[0].get("name", "")
+            for row in client.iter_resource(
+                "Customer",
+                fields=["name", "customer_name"],
+                filters=[["customer_name", "=", name]],
+                limit=1,
+            ):
+                return row.get("name", "")
         except ERPNextError as exc:
             logger.warning("ERPNext customer lookup failed: %s", exc)
         return ""
@@ -0,0 +1,114 @@
+"""
+Bitset facet index for the products page filters.
+
+Each facet value (brand "Dell", grade "A", in_stock "1", ...) owns one
+Python ``int`` used as a bitset: bit *i* is set when the product at
+position *i* of the catalog list has that value.  A selection is evaluated
+with bitwise OR inside a facet and AND across facets, and the sidebar
+counts come from ``int.bit_count()`` — no per-request pass over products.
+
+Counts are *disjunctive*: the counts of a facet are computed against the
+selection of every other facet, so ticking "Dell" still shows how many HP
+laptops there are.
+"""
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from .specs import spec_fields, storage_label
+
+Product = Mapping[str, Any]
+Selection = Mapping[str, Sequence[str]]
+
+FACETS = (
+    "brand", "grade", "ram", "storage", "cpu", "screen", "keyboard", "gpu_type", "in_stock", "charger",
+)
+
+# Bit positions set in each byte value, for turning a bitset into positions.
+_BYTE_BITS = tuple(tuple(b for b in range(8) if byte >> b & 1) for byte in range(256))
+
+
+def facet_values(p: Product) -> Dict[str, List[str]]:
+    """The facet values a product is listed under (spec facets use the typed fields)."""
+    spec = spec_fields(p)
+    return {
+        "brand": [p["brand"]] if p.get("brand") and p["brand"] != "—" else [],
+        "grade": [p["grade"]] if p.get("grade") else [],
+        "keyboard": [p["keyboardLayout"]] if p.get("keyboardLayout") else [],
+        "ram": [f"{spec['ramGB']}GB"] if spec["ramGB"] else [],
+        "storage": [storage_label(spec["storageGB"])] if spec["storageGB"] else [],
+        "cpu": [spec["cpuFamily"]] if spec["cpuFamily"] else [],
+        "screen": [f"{spec['screenInches']:g}"] if spec["screenInches"] else [],
+        "gpu_type": [spec["gpuClass"]] if spec["gpuClass"] else [],
+        "in_stock": ["1"] if p.get("inStock") else [],
+        "charger": ["1"] if p.get("includesCharger") else [],
+    }
+
+
+def mask_from_positions(positions: Iterable[int], size: int) -> int:
+    """Build a bitset from catalog positions."""
+    buf = bytearray((size + 7) // 8)
+    for i in positions:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+def positions(mask: int) -> List[int]:
+    """Catalog positions set in ``mask``, ascending."""
+    out: List[int] = []
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    for byte_index, byte in enumerate(data):
+        if byte:
+            base = byte_index << 3
+            out.extend(base + b for b in _BYTE_BITS[byte])
+    return out
+
+
+class FacetIndex:
+    """Bitsets per facet value over one catalog list."""
+
+    def __init__(self, products: List[Product]) -> None:
+        self.size = len(products)
+        self.all = (1 << self.size) - 1
+        bits: Dict[str, Dict[str, List[int]]] = {f: {} for f in FACETS}
+        for i, p in enumerate(products):
+            for facet, vals in facet_values(p).items():
+                for v in vals:
+                    bits[facet].setdefault(v, []).append(i)
+        self.bitsets: Dict[str, Dict[str, int]] = {
+            facet: {v: mask_from_positions(ids, self.size) for v, ids in by_value.items()}
+            for facet, by_value in bits.items()
+        }
+
+    def values(self, facet: str) -> List[str]:
+        return sorted(self.bitsets.get(facet, {}))
+
+    def _facet_mask(self, facet: str, selected: Sequence[str]) -> int:
+        by_value = self.bitsets.get(facet, {})
+        mask = 0
+        for v in selected:
+            mask |= by_value.get(v, 0)
+        return mask
+
+    def select(self, selection: Selection, base: Optional[int] = None, exclude: Optional[str] = None) -> int:
+        """Bitset of products matching ``selection`` (within ``base``)."""
+        mask = self.all if base is None else base
+        for facet, selected in selection.items():
+            if selected and facet != exclude:
+                mask &= self._facet_mask(facet, selected)
+                if not mask:
+                    break
+        return mask
+
+    def counts(self, selection: Selection, base: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+        """Per facet value: how many products the selection would yield with it."""
+        out: Dict[str, Dict[str, int]] = {}
+        full = None
+        for facet, by_value in self.bitsets.items():
+            if selection.get(facet):
+                others = self.select(selection, base, exclude=facet)
+            else:
+                if full is None:
+                    full = self.select(selection, base)
+                others = full
+            out[facet] = {v: (bits & others).bit_count() for v, bits in by_value.items()}
+        return out
@@ -0,0 +1,33 @@
+"""
+Request middleware for the storefront.
+"""
+
+import logging
+
+from django.conf import settings
+
+from .catalog_cache import request_memo
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogMemoMiddleware:
+    """Read each catalog cache entry at most once per request.
+
+    A page asks for the same catalog artifacts from several places (view,
+    context processors, templates); inside the request they are served from
+    ``web.catalog_cache.request_memo`` instead of being fetched and
+    unpickled again.  With ``DEBUG`` on, the number of cache reads saved is
+    returned in the ``X-Catalog-Reads-Saved`` response header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with request_memo() as memo:
+            response = self.get_response(request)
+        if settings.DEBUG:
+            response["X-Catalog-Reads-Saved"] = str(memo.saved)
+            logger.debug("%s: %d catalog cache reads saved", request.path, memo.saved)
+        return response
@@ -0,0 +1,200 @@
+"""
+Compact record for the products of the cached catalog.
+
+``_map_erp_item`` used to return a plain dict of ~27 keys, holding a
+``name`` dict, a ``shortSpecs`` dict of two lists, a ``specs`` dict and
+the same code under ``id`` / ``slug`` / ``item_code``.  The whole list is
+pickled into the cache on every sync and unpickled whenever a worker
+loads it.  ``ProductRecord`` keeps only the underlying values in slots:
+
+* ``id``, ``slug``, ``name``, ``image_url``, ``shortSpecs`` and ``specs``
+  are derived on access;
+* low-cardinality strings (brand, group, UOM, grade, spec texts, tags)
+  are interned, so the catalog holds — and pickles — one copy of each;
+* pickling writes one flat tuple per product.
+
+Records behave as read-only mappings with the old dict keys
+(``p["priceEGP"]``, ``p.get("brand")``, ``dict(p)``), and templates can
+use the same names as attributes (``product.priceEGP``).
+
+``python manage.py catalog_footprint`` compares both layouts.
+"""
+
+import re
+import sys
+from collections.abc import Mapping
+from operator import attrgetter
+from typing import Any, Dict, Iterator, Optional
+
+# Display strings of ``specs`` (see ``web.specs.extract_specs``), in order.
+SPEC_KEYS = ("cpu", "ram", "storage", "gpu", "screen")
+
+# Keys of the dict layout, in ``_map_erp_item`` order.
+KEYS = (
+    "id", "item_code", "slug", "name", "brand", "priceEGP", "oldPriceEGP",
+    "images", "image_url", "inStock", "condition", "grade", "includesCharger",
+    "keyboardLayout", "shortSpecs", "specs", "cpuFamily", "ramGB", "storageGB",
+    "storageType", "gpuClass", "screenInches", "tags", "item_group",
+    "description", "stock_uom", "modified",
+)
+_KEYSET = frozenset(KEYS)
+
+_INTERNED = (
+    "brand", "item_group", "condition", "grade", "keyboardLayout",
+    "cpuFamily", "storageType", "gpuClass", "stock_uom",
+)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+def short_specs(description: str) -> Dict[str, list]:
+    """``{"en", "ar"}`` one-line summary of an HTML description (cards)."""
+    desc_clean = _TAG_RE.sub("", description or "").strip()
+    short = [desc_clean[:120]] if desc_clean else []
+    return {"en": short, "ar": short}
+
+
+class ProductRecord(Mapping):
+    __slots__ = (
+        "item_code", "name_en", "name_ar", "brand", "item_group", "priceEGP",
+        "oldPriceEGP", "images", "inStock", "condition", "grade",
+        "includesCharger", "keyboardLayout", "spec_texts", "cpuFamily", "ramGB",
+        "storageGB", "storageType", "gpuClass", "screenInches", "tags",
+        "description", "stock_uom", "modified", "extra",
+    )
+
+    def __init__(
+        self, item_code, name_en, name_ar, brand, item_group, priceEGP,
+        oldPriceEGP, images, inStock, condition, grade, includesCharger,
+        keyboardLayout, spec_texts, cpuFamily, ramGB, storageGB, storageType,
+        gpuClass, screenInches, tags, description, stock_uom, modified, extra=None,
+    ):
+        # Positional, in slot order: this is also the unpickling path.
+        self.item_code = item_code
+        self.name_en = name_en
+        self.name_ar = name_ar
+        self.brand = brand
+        self.item_group = item_group
+        self.priceEGP = priceEGP
+        self.oldPriceEGP = oldPriceEGP
+        self.images = images
+        self.inStock = inStock
+        self.condition = condition
+        self.grade = grade
+        self.includesCharger = includesCharger
+        self.keyboardLayout = keyboardLayout
+        self.spec_texts = spec_texts
+        self.cpuFamily = cpuFamily
+        self.ramGB = ramGB
+        self.storageGB = storageGB
+        self.storageType = storageType
+        self.gpuClass = gpuClass
+        self.screenInches = screenInches
+        self.tags = tags
+        self.description = description
+        self.stock_uom = stock_uom
+        self.modified = modified
+        # Keys outside the standard layout (None when there are none).
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "ProductRecord":
+        """Build a record from the dict layout (``_map_erp_item``, mirror rows)."""
+        if isinstance(data, cls):
+            return data
+        name = data.get("name") or {}
+        specs = data.get("specs") or {}
+        fields = {key: _intern(data.get(key) or "") for key in _INTERNED}
+        extra = {k: v for k, v in data.items() if k not in _KEYSET}
+        return cls(
+            item_code=data.get("item_code") or "",
+            name_en=name.get("en") or "",
+            name_ar=name.get("ar") or "",
+            priceEGP=data.get("priceEGP") or 0.0,
+            oldPriceEGP=data.get("oldPriceEGP"),
+            images=list(data.get("images") or []),
+            inStock=bool(data.get("inStock")),
+            includesCharger=bool(data.get("includesCharger")),
+            spec_texts=tuple(_intern(specs.get(k, "")) for k in SPEC_KEYS),
+            ramGB=data.get("ramGB"),
+            storageGB=data.get("storageGB"),
+            screenInches=data.get("screenInches"),
+            tags=[_intern(t) for t in data.get("tags") or []],
+            description=data.get("description") or "",
+            modified=data.get("modified") or "",
+            extra=extra or None,
+            **fields,
+        )
+
+    def __reduce__(self):
+        return (ProductRecord, _state(self))
+
+    # -- derived fields -------------------------------------------------------
+
+    @property
+    def id(self) -> str:
+        return self.item_code
+
+    @property
+    def slug(self) -> str:
+        return self.item_code
+
+    @property
+    def name(self) -> Dict[str, str]:
+        return {"en": self.name_en, "ar": self.name_ar}
+
+    @property
+    def image_url(self) -> str:
+        return self.images[0] if self.images else ""
+
+    @property
+    def shortSpecs(self) -> Dict[str, list]:
+        return short_specs(self.description)
+
+    @property
+    def specs(self) -> Dict[str, str]:
+        return dict(zip(SPEC_KEYS, self.spec_texts))
+
+    # -- mapping --------------------------------------------------------------
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _KEYSET:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _KEYSET:
+            return getattr(self, key)
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def __contains__(self, key: object) -> bool:
+        return key in _KEYSET or bool(self.extra and key in self.extra)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from KEYS
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return len(KEYS) + len(self.extra or ())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The dict layout (JSON columns, comparisons)."""
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"<ProductRecord {self.item_code}>"
+
+
+_state = attrgetter(*ProductRecord.__slots__)
+
+
+def as_record(product: Optional[Mapping]) -> Optional[ProductRecord]:
+    return None if product is None else ProductRecord.from_dict(product)
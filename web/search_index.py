@@ -0,0 +1,156 @@
+"""
+Token / prefix inverted index for storefront search.
+
+Indexes the English and Arabic names, brand, item_code, item group and
+description of every product.  Text is normalized so that queries match
+regardless of case, Arabic diacritics / tatweel, alef and hamza forms
+(أ إ آ ٱ → ا, ؤ → و, ئ → ي), ta marbuta (ة → ه), alef maqsura (ى → ي) or
+Arabic-Indic digits, and a light stemmer strips common Arabic affixes
+(و, ال / بال / لل ..., ات / ون / ين ...) and English plurals.
+
+Every query token must match (AND); a token matches a term that starts
+with it, or whose stem equals the token's stem.  Results keep catalog
+order so the usual sorting applies afterwards.
+"""
+
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Set, Tuple
+
+Product = Mapping[str, Any]
+
+_DIACRITICS_RE = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]")
+_CHAR_MAP = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ؤ": "و", "ئ": "ي",
+    "ة": "ه",
+    "ى": "ي",
+    **{chr(0x0660 + d): str(d) for d in range(10)},  # Arabic-Indic digits
+    **{chr(0x06F0 + d): str(d) for d in range(10)},  # Eastern Arabic-Indic digits
+})
+_ARABIC_RE = re.compile(r"[\u0600-\u06FF]")
+_TAG_RE = re.compile(r"<[^>]+>")
+_TOKEN_RE = re.compile(r"[^\W_]+")
+# Sub-words of mixed tokens: "EliteBook" → Elite, Book; "16GB" → 16, GB.
+_PART_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+|[^\W\d_A-Za-z]+")
+
+_AR_PREFIXES = ("بال", "كال", "فال", "لل", "ال")
+_AR_SUFFIXES = ("ات", "ون", "ين", "ان", "ها", "يه", "ه", "ي")
+
+_PREFIX_CACHE_SIZE = 1024
+
+
+def normalize(text: str) -> str:
+    """Case-fold and fold Arabic letter variants / diacritics."""
+    return _DIACRITICS_RE.sub("", text).translate(_CHAR_MAP).casefold()
+
+
+def stem(token: str) -> str:
+    """Light stemming of one normalized token."""
+    if _ARABIC_RE.search(token):
+        if token.startswith("و") and len(token) > 3:  # conjunction "and"
+            token = token[1:]
+        for prefix in _AR_PREFIXES:
+            if token.startswith(prefix) and len(token) - len(prefix) >= 2:
+                token = token[len(prefix):]
+                break
+        for suffix in _AR_SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+                return token[: -len(suffix)]
+        return token
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss") and not token.isdigit():
+        return token[:-1]
+    return token
+
+
+@lru_cache(maxsize=65536)
+def _token_forms(raw: str) -> Tuple[str, ...]:
+    forms = [normalize(raw)]
+    parts = _PART_RE.findall(raw)
+    if len(parts) > 1:
+        forms.extend(normalize(p) for p in parts if len(p) >= 2)
+    return tuple(forms)
+
+
+@lru_cache(maxsize=65536)
+def _index_terms(raw: str) -> FrozenSet[str]:
+    forms = _token_forms(raw)
+    return frozenset(forms) | {stem(f) for f in forms}
+
+
+def _raw_tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(_DIACRITICS_RE.sub("", text or ""))
+
+
+def tokenize(text: str) -> List[str]:
+    """Split ``text`` into normalized tokens (plus sub-words of mixed tokens)."""
+    out: List[str] = []
+    for raw in _raw_tokens(text):
+        out.extend(_token_forms(raw))
+    return out
+
+
+def _document_text(p: Product) -> Iterable[str]:
+    name = p.get("name") or {}
+    yield name.get("en") or ""
+    yield name.get("ar") or ""
+    yield p.get("brand") or ""
+    yield p.get("item_code") or ""
+    yield p.get("item_group") or ""
+    yield _TAG_RE.sub(" ", p.get("description") or "")
+
+
+class SearchIndex:
+    """Inverted index over a product list (positions in the list are doc ids)."""
+
+    def __init__(self, products: List[Product]) -> None:
+        self._products = products
+        postings: Dict[str, Set[int]] = {}
+        for doc_id, p in enumerate(products):
+            terms: Set[str] = set()
+            for text in _document_text(p):
+                for raw in _raw_tokens(text):
+                    terms |= _index_terms(raw)
+            for term in terms:
+                postings.setdefault(term, set()).add(doc_id)
+        self._postings: Dict[str, FrozenSet[int]] = {t: frozenset(ids) for t, ids in postings.items()}
+        self._terms = sorted(self._postings)
+        self._prefix_cache: Dict[str, FrozenSet[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def _with_prefix(self, prefix: str) -> FrozenSet[int]:
+        cached = self._prefix_cache.get(prefix)
+        if cached is not None:
+            return cached
+        ids: Set[int] = set()
+        terms = self._terms
+        i = bisect_left(terms, prefix)
+        while i < len(terms) and terms[i].startswith(prefix):
+            ids |= self._postings[terms[i]]
+            i += 1
+        result = frozenset(ids)
+        if len(self._prefix_cache) >= _PREFIX_CACHE_SIZE:
+            self._prefix_cache.clear()
+        self._prefix_cache[prefix] = result
+        return result
+
+    def match_ids(self, query: str) -> FrozenSet[int]:
+        # Query tokens are not split into sub-words: "macbook" must not
+        # match every product mentioning "mac" and "book".
+        tokens = {normalize(t) for t in _raw_tokens(query)}
+        if not tokens:
+            return frozenset()
+        result = None
+        for token in sorted(tokens, key=len, reverse=True):  # most selective first
+            hits = self._with_prefix(token) | self._postings.get(stem(token), frozenset())
+            result = hits if result is None else result & hits
+            if not result:
+                return frozenset()
+        return result
+
+    def search(self, query: str) -> List[Product]:
+        """Products matching every token of ``query``, in catalog order."""
+        return [self._products[i] for i in sorted(self.match_ids(query))]
@@ -0,0 +1,332 @@
+"""
+Django cache backend shared by all worker processes of one host.
+
+``SharedCache`` keeps values in a SQLite file (L2) that every gunicorn
+worker opens, with an in-process LRU (L1) in front of it, so the catalog,
+filter options and stock entries are fetched from ERPNext once per host
+instead of once per worker — and the cross-process ``cache.add`` fetch
+lock of ``web.catalog_cache`` actually spans workers.  No external
+service is needed.
+
+Invalidation: every write also appends the key to an invalidation log in
+the same transaction.  Before answering from L1 a process checks SQLite's
+``PRAGMA data_version`` (changes only when *another* connection commits)
+and, when it moved, evicts the keys logged since it last looked.  A value
+written by one worker is therefore never served stale from another
+worker's L1.
+
+Values are pickled, like ``LocMemCache``: callers get their own copy.
+
+Settings::
+
+    CACHES = {"default": {
+        "BACKEND": "web.shared_cache.SharedCache",
+        "LOCATION": "/tmp/hdstore-cache.sqlite3",
+        "OPTIONS": {"MAX_ENTRIES": 20000, "L1_MAX_ENTRIES": 2000},
+    }}
+"""
+
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL
+);
+CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (expires);
+CREATE TABLE IF NOT EXISTS cache_invalidations (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL
+);
+"""
+# Invalidation log entry that clears every L1 (written by ``clear()``).
+_ALL = "*"
+# Writes between two passes that drop expired entries / old log rows.
+_CULL_EVERY = 200
+# Log rows kept; a process further behind than this drops its whole L1.
+_LOG_KEEP = 10000
+
+
+class SharedCache(BaseCache):
+    def __init__(self, location: str, params: Dict[str, Any]) -> None:
+        super().__init__(params)
+        self._path = location or os.path.join(tempfile.gettempdir(), "hdstore-cache.sqlite3")
+        options = params.get("OPTIONS") or {}
+        self._l1_max = int(options.get("L1_MAX_ENTRIES", 1000))
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._l1: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._seq = 0
+        self._data_version: Optional[int] = None
+        self._writes = 0
+        self._stats: Dict[str, int] = {}
+
+    # -- connection / invalidation ------------------------------------------
+
+    def _db(self) -> sqlite3.Connection:
+        """This process's connection (reopened after a fork)."""
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self._path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+            self._l1.clear()
+            self._stats = {}
+            self._seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM cache_invalidations").fetchone()[0]
+            self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        return self._conn
+
+    def _sync(self, conn: sqlite3.Connection) -> None:
+        """Evict L1 entries other processes have written since the last sync."""
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return
+        self._data_version = version
+        rows = conn.execute(
+            "SELECT seq, key FROM cache_invalidations WHERE seq > ? ORDER BY seq", (self._seq,)
+        ).fetchall()
+        if not rows:
+            return
+        if rows[0][0] > self._seq + 1 and self._seq:
+            # Log rows we never saw were pruned: anything may have changed.
+            self._l1.clear()
+        for seq, key in rows:
+            if key == _ALL:
+                self._l1.clear()
+            else:
+                self._l1.pop(key, None)
+        self._seq = rows[-1][0]
+        self._incr("l1_invalidations", len(rows))
+
+    def _write(self, statements: Iterable[Tuple[str, tuple]], keys: Iterable[str]) -> List[int]:
+        """Run ``statements`` and log ``keys`` in one transaction; return rowcounts.
+
+        The log is synced inside the write transaction, when no other
+        process can commit, so this process can then skip past its own log
+        rows instead of replaying them against the L1 it is about to fill.
+        """
+        conn = self._db()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._sync(conn)
+            counts = [conn.execute(sql, args).rowcount for sql, args in statements]
+            conn.executemany("INSERT INTO cache_invalidations (key) VALUES (?)", [(k,) for k in keys])
+            seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM cache_invalidations").fetchone()[0]
+            self._writes += 1
+            if self._writes % _CULL_EVERY == 0:
+                self._cull(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._seq = seq
+        return counts
+
+    def _cull(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM cache_entries WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+        count = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        if count > self._max_entries:
+            drop = count // self._cull_frequency if self._cull_frequency else count
+            # Soonest-expiring first, entries without expiry last: an upsert
+            # keeps its rowid, so rowid order would evict the oldest — and
+            # hottest, constantly rewritten — keys (catalog, version, sync state).
+            conn.execute(
+                "DELETE FROM cache_entries WHERE rowid IN "
+                "(SELECT rowid FROM cache_entries ORDER BY expires IS NULL, expires LIMIT ?)",
+                (drop,),
+            )
+        conn.execute(
+            "DELETE FROM cache_invalidations WHERE seq <= (SELECT MAX(seq) FROM cache_invalidations) - ?",
+            (_LOG_KEEP,),
+        )
+
+    # -- L1 -----------------------------------------------------------------
+
+    def _l1_get(self, key: str, now: float) -> Optional[bytes]:
+        entry = self._l1.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= now:
+            del self._l1[key]
+            return None
+        self._l1.move_to_end(key)
+        return entry[0]
+
+    def _l1_put(self, key: str, blob: bytes, expires: Optional[float]) -> None:
+        self._l1[key] = (blob, expires)
+        self._l1.move_to_end(key)
+        while len(self._l1) > self._l1_max:
+            self._l1.popitem(last=False)
+
+    def _incr(self, name: str, n: int = 1) -> None:
+        self._stats[name] = self._stats.get(name, 0) + n
+
+    def layer_stats(self) -> Dict[str, int]:
+        """Per-process hit / miss counters of each layer."""
+        with self._lock:
+            return {**self._stats, "l1_entries": len(self._l1)}
+
+    # -- helpers ------------------------------------------------------------
+
+    def _expires(self, timeout) -> Optional[float]:
+        # Absolute expiry time (None = never), as BaseCache computes it.
+        return self.get_backend_timeout(timeout)
+
+    @staticmethod
+    def _dumps(value: Any) -> bytes:
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def _fetch(self, keys: List[str]) -> Dict[str, bytes]:
+        """Blobs for ``keys`` from L1, then L2 (caller holds the lock)."""
+        conn = self._db()
+        self._sync(conn)
+        now = time.time()
+        found: Dict[str, bytes] = {}
+        misses = []
+        for key in keys:
+            blob = self._l1_get(key, now)
+            if blob is None:
+                misses.append(key)
+            else:
+                found[key] = blob
+        self._incr("l1_hits", len(found))
+        if misses:
+            self._incr("l1_misses", len(misses))
+            placeholders = ",".join("?" * len(misses))
+            rows = conn.execute(
+                f"SELECT key, value, expires FROM cache_entries WHERE key IN ({placeholders})", misses
+            ).fetchall()
+            hits = 0
+            for key, blob, expires in rows:
+                if expires is None or expires > now:
+                    found[key] = blob
+                    self._l1_put(key, blob, expires)
+                    hits += 1
+            self._incr("l2_hits", hits)
+            self._incr("l2_misses", len(misses) - hits)
+        return found
+
+    # -- BaseCache API ------------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            blob = self._fetch([key]).get(key)
+        return default if blob is None else pickle.loads(blob)
+
+    def get_many(self, keys, version=None):
+        made = {self.make_and_validate_key(k, version=version): k for k in keys}
+        if not made:
+            return {}
+        with self._lock:
+            blobs = self._fetch(list(made))
+        return {made[k]: pickle.loads(blob) for k, blob in blobs.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expires(timeout)
+        rows = {self.make_and_validate_key(k, version=version): self._dumps(v) for k, v in data.items()}
+        if not rows:
+            return []
+        with self._lock:
+            self._write(
+                [(
+                    "INSERT INTO cache_entries (key, value, expires) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires",
+                    (key, blob, expires),
+                ) for key, blob in rows.items()],
+                rows,
+            )
+            for key, blob in rows.items():
+                self._l1_put(key, blob, expires)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        """Set ``key`` only if absent or expired — atomic across processes."""
+        key = self.make_and_validate_key(key, version=version)
+        blob, expires = self._dumps(value), self._expires(timeout)
+        with self._lock:
+            (changed,) = self._write(
+                [(
+                    "INSERT INTO cache_entries (key, value, expires) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires "
+                    "WHERE cache_entries.expires IS NOT NULL AND cache_entries.expires <= ?",
+                    (key, blob, expires, time.time()),
+                )],
+                [key],
+            )
+            if changed:
+                self._l1_put(key, blob, expires)
+        return bool(changed)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            (changed,) = self._write(
+                [(
+                    "UPDATE cache_entries SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                    (self._expires(timeout), key, time.time()),
+                )],
+                [key],
+            )
+            self._l1.pop(key, None)
+        return bool(changed)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            conn = self._db()
+            self._sync(conn)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT value, expires FROM cache_entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None or (row[1] is not None and row[1] <= time.time()):
+                    raise ValueError(f"Key '{key}' not found")
+                value = pickle.loads(row[0]) + delta
+                blob = self._dumps(value)
+                conn.execute("UPDATE cache_entries SET value = ? WHERE key = ?", (blob, key))
+                conn.execute("INSERT INTO cache_invalidations (key) VALUES (?)", (key,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._l1_put(key, blob, row[1])
+        return value
+
+    def delete(self, key, version=None):
+        return bool(self.delete_many([key], version=version))
+
+    def delete_many(self, keys, version=None):
+        made = [self.make_and_validate_key(k, version=version) for k in keys]
+        if not made:
+            return 0
+        with self._lock:
+            counts = self._write([("DELETE FROM cache_entries WHERE key = ?", (k,)) for k in made], made)
+            for k in made:
+                self._l1.pop(k, None)
+        return sum(counts)
+
+    def clear(self):
+        with self._lock:
+            self._write([("DELETE FROM cache_entries", ())], [_ALL])
+            self._l1.clear()
+
+    def close(self, **kwargs):
+        # Keep the connection: one per process, reused across requests.
+        pass
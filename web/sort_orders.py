@@ -0,0 +1,93 @@
+"""
+Pre-sorted permutations of the catalog for the products page.
+
+``SortOrders`` holds, per sort key, the catalog positions in display order
+(plus the inverse rank array).  A filtered result — a bitset from
+``web.facets`` — is turned into one page of ordered positions without
+sorting products per request:
+
+* dense results walk the permutation and keep the positions whose bit is
+  set, stopping as soon as the page window is filled;
+* sparse results take their few positions and order them by rank.
+"""
+
+from array import array
+from typing import Any, Dict, List, Mapping, Optional
+
+from .facets import positions
+from .search_index import normalize
+
+Product = Mapping[str, Any]
+
+SORTS = ("newest", "price_asc", "price_desc", "name_en", "name_ar")
+DEFAULT_SORT = "newest"
+
+# Below this share of the catalog, sorting the hits by rank beats walking
+# the permutation.
+_SPARSE_RATIO = 16
+
+
+def _name(p: Product, lang: str) -> str:
+    name = p.get("name") or {}
+    return normalize(name.get(lang) or name.get("en") or "")
+
+
+class SortOrders:
+    """Permutations of catalog positions; ties keep catalog (newest) order."""
+
+    def __init__(self, products: List[Product]) -> None:
+        self.size = len(products)
+        newest = range(self.size)
+        # One pass over the products: the catalog may be a lazy sequence.
+        price, name_en, name_ar = [], [], []
+        for p in products:
+            price.append(p.get("priceEGP") or 0)
+            name_en.append(_name(p, "en"))
+            name_ar.append(_name(p, "ar"))
+        perms = {
+            "newest": list(newest),
+            "price_asc": sorted(newest, key=price.__getitem__),
+            "price_desc": sorted(newest, key=lambda i: -price[i]),
+            "name_en": sorted(newest, key=name_en.__getitem__),
+            "name_ar": sorted(newest, key=name_ar.__getitem__),
+        }
+        self.perms: Dict[str, array] = {k: array("l", v) for k, v in perms.items()}
+        self.ranks: Dict[str, array] = {}
+        for key, perm in self.perms.items():
+            rank = array("l", bytes(perm.itemsize * self.size))
+            for r, i in enumerate(perm):
+                rank[i] = r
+            self.ranks[key] = rank
+
+    def window(
+        self,
+        mask: int,
+        sort: str,
+        start: int = 0,
+        stop: Optional[int] = None,
+        total: Optional[int] = None,
+    ) -> List[int]:
+        """Positions set in ``mask`` ordered by ``sort``, sliced ``[start:stop]``."""
+        sort = sort if sort in self.perms else DEFAULT_SORT
+        total = mask.bit_count() if total is None else total
+        stop = total if stop is None else min(stop, total)
+        if start >= stop:
+            return []
+
+        if total * _SPARSE_RATIO < self.size:
+            hits = positions(mask)
+            hits.sort(key=self.ranks[sort].__getitem__)
+            return hits[start:stop]
+
+        bits = mask.to_bytes((self.size + 7) // 8, "little")
+        out: List[int] = []
+        want = stop - start
+        seen = 0
+        for i in self.perms[sort]:
+            if bits[i >> 3] >> (i & 7) & 1:
+                if seen >= start:
+                    out.append(i)
+                    if len(out) == want:
+                        break
+                seen += 1
+        return out
@@ -0,0 +1,225 @@
+"""
+Laptop spec extraction for catalog sync.
+
+``extract_specs`` reads an ERPNext Item once — its variant attributes when
+present (single-item GETs), otherwise item_name and description text — and
+returns display strings for the product page plus typed fields that the
+facet index and filters compare directly:
+
+    cpuFamily     "i7", "Ryzen 5", "Ultra 7", "Apple M2", "Celeron", ...
+    ramGB         16
+    storageGB     512            (1 TB = 1024)
+    storageType   "SSD" / "HDD" / "eMMC"
+    gpuClass      "Dedicated" / "Integrated"
+    screenInches  15.6
+
+Anything that cannot be recognised is left empty / ``None``.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+_INTEL_RE = re.compile(r"\b(?:intel\s+)?(?:core\s+)?(i[3579])(?:[-\s](\d{4,5}[a-z]{0,2}\d?))?\b", re.I)
+_ULTRA_RE = re.compile(r"\bcore\s+ultra\s+([579])(?:\s+(\d{3}[a-z]{0,2}))?\b", re.I)
+_RYZEN_RE = re.compile(r"\bryzen\s+([3579])(?:\s+(?:pro\s+)?(\d{4}[a-z]{0,2}))?\b", re.I)
+_APPLE_RE = re.compile(r"\b(?:apple\s+)?(m[1-4])(?:\s+(pro|max|ultra))?\b", re.I)
+_OTHER_CPU_RE = re.compile(r"\b(celeron|pentium|xeon|athlon)\b", re.I)
+
+_RAM_RES = (
+    re.compile(r"\b(\d{1,3})\s*gb\s*(?:(?:ddr\d|lpddr\d)x?\s*)?(?:ram|memory)\b", re.I),
+    re.compile(r"\b(?:ram|memory)\s*[:\-]?\s*(\d{1,3})\s*gb\b", re.I),
+    re.compile(r"(?:رام|ذاكرة)\s*[:\-]?\s*(\d{1,3})"),
+)
+# A bare "16GB" counts as RAM when it is not a storage size.
+_BARE_GB_RE = re.compile(r"\b(\d{1,3})\s*gb\b(?!\s*(?:ssd|hdd|nvme|emmc|m\.2|storage|hard))", re.I)
+_RAM_SIZES = {2, 4, 6, 8, 12, 16, 20, 24, 32, 36, 40, 48, 64, 96, 128}
+
+_STORAGE_RES = (
+    re.compile(r"\b(\d+(?:\.\d+)?)\s*(tb|gb)\s*(?:pcie\s*|nvme\s*|m\.2\s*)*(ssd|hdd|emmc)\b", re.I),
+    re.compile(r"\b(ssd|hdd|emmc)\s*[:\-]?\s*(\d+(?:\.\d+)?)\s*(tb|gb)\b", re.I),
+    re.compile(r"\bstorage\s*[:\-]?\s*(\d+(?:\.\d+)?)\s*(tb|gb)\b", re.I),
+)
+
+_DEDICATED_GPU_RES = (
+    re.compile(r"\b(?:nvidia\s+)?(?:geforce\s+)?(rtx|gtx|mx)\s*-?\s*(a?\d{3,4})(\s*ti)?\b", re.I),
+    re.compile(r"\b(?:nvidia\s+)?quadro\s+[a-z]{0,3}\d{3,4}\b|\bnvidia\s+t\d{3,4}\b", re.I),
+    re.compile(r"\b(?:amd\s+)?radeon\s+(?:rx|pro)\s*\w+\b", re.I),
+)
+_INTEGRATED_GPU_RE = re.compile(
+    r"\b(intel\s+(?:iris\s+xe|iris|uhd|hd)(?:\s+graphics)?(?:\s+\d{3})?|iris\s+xe|uhd\s+graphics"
+    r"|(?:amd\s+)?radeon(?:\s+(?:vega\s*\d*|graphics))?|intel\s+arc\s+graphics)\b",
+    re.I,
+)
+
+_SCREEN_RE = re.compile(r"\b(1\d(?:\.\d)?)\s*(?:\"|”|″|''|-?\s*inch(?:es)?\b|in\b|بوصة)", re.I)
+_SCREEN_LABEL_RE = re.compile(r"\b(?:screen|display)\s*(?:size)?\s*[:\-]?\s*(1\d(?:\.\d)?)\b", re.I)
+
+# Variant attribute names → spec they describe.
+_ATTRIBUTE_SPECS = {
+    "processor": "cpu", "cpu": "cpu",
+    "ram": "ram", "memory": "ram",
+    "storage": "storage", "ssd": "storage", "hdd": "storage", "hard disk": "storage",
+    "gpu": "gpu", "graphics": "gpu", "graphics card": "gpu",
+    "screen": "screen", "screen size": "screen", "display": "screen",
+}
+
+
+def _cpu(text: str) -> Tuple[str, str]:
+    m = _ULTRA_RE.search(text)
+    if m:
+        model = f" {m.group(2).upper()}" if m.group(2) else ""
+        return f"Ultra {m.group(1)}", f"Intel Core Ultra {m.group(1)}{model}"
+    m = _INTEL_RE.search(text)
+    if m:
+        fam = m.group(1).lower()
+        model = f"-{m.group(2).upper()}" if m.group(2) else ""
+        return fam, f"Intel Core {fam}{model}"
+    m = _RYZEN_RE.search(text)
+    if m:
+        model = f" {m.group(2).upper()}" if m.group(2) else ""
+        return f"Ryzen {m.group(1)}", f"AMD Ryzen {m.group(1)}{model}"
+    m = _APPLE_RE.search(text)
+    if m:
+        chip = m.group(1).upper() + (f" {m.group(2).title()}" if m.group(2) else "")
+        return f"Apple {m.group(1).upper()}", f"Apple {chip}"
+    m = _OTHER_CPU_RE.search(text)
+    if m:
+        return m.group(1).title(), f"Intel {m.group(1).title()}" if m.group(1).lower() != "athlon" else "AMD Athlon"
+    return "", ""
+
+
+def _ram(text: str) -> Optional[int]:
+    for rx in _RAM_RES:
+        m = rx.search(text)
+        if m:
+            return int(m.group(1))
+    for m in _BARE_GB_RE.finditer(text):
+        gb = int(m.group(1))
+        if gb in _RAM_SIZES:
+            return gb
+    return None
+
+
+def _storage(text: str) -> Tuple[Optional[int], str]:
+    m = _STORAGE_RES[0].search(text)
+    if m:
+        size, unit, kind = m.groups()
+    else:
+        m = _STORAGE_RES[1].search(text)
+        if m:
+            kind, size, unit = m.groups()
+        else:
+            m = _STORAGE_RES[2].search(text)
+            if not m:
+                return None, ""
+            (size, unit), kind = m.groups(), ""
+    gb = float(size) * (1024 if unit.lower() == "tb" else 1)
+    kind = {"ssd": "SSD", "hdd": "HDD", "emmc": "eMMC"}.get(kind.lower(), "")
+    return int(gb), kind
+
+
+def _gpu(text: str) -> Tuple[str, str]:
+    for rx in _DEDICATED_GPU_RES:
+        m = rx.search(text)
+        if m:
+            return "Dedicated", re.sub(r"\s+", " ", m.group(0)).strip()
+    m = _INTEGRATED_GPU_RE.search(text)
+    if m:
+        return "Integrated", re.sub(r"\s+", " ", m.group(0)).strip()
+    return "", ""
+
+
+def _screen(text: str) -> Optional[float]:
+    m = _SCREEN_RE.search(text) or _SCREEN_LABEL_RE.search(text)
+    if m:
+        inches = float(m.group(1))
+        if 10 <= inches < 19:
+            return inches
+    return None
+
+
+def _storage_label(gb: Optional[int], kind: str) -> str:
+    if not gb:
+        return ""
+    size = f"{gb // 1024:g}TB" if gb >= 1024 and gb % 1024 == 0 else f"{gb}GB"
+    return f"{size} {kind}".strip()
+
+
+def _attribute_texts(item: Dict[str, Any]) -> Dict[str, str]:
+    texts: Dict[str, str] = {}
+    for row in item.get("attributes") or []:
+        spec = _ATTRIBUTE_SPECS.get(str(row.get("attribute") or "").strip().lower())
+        value = str(row.get("attribute_value") or "").strip()
+        if spec and value:
+            texts[spec] = value
+    return texts
+
+
+def extract_specs(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Return ``{"specs": {...display strings...}, <typed fields>}`` for an Item."""
+    attrs = _attribute_texts(item)
+    parts: List[str] = [
+        str(item.get("item_name") or ""),
+        _TAG_RE.sub(" ", str(item.get("description") or "")),
+    ]
+    text = " \n ".join(parts)
+
+    def source(spec: str) -> str:
+        # Attribute values win; "16" alone is a valid RAM attribute value.
+        value = attrs.get(spec)
+        if value is None:
+            return text
+        if spec == "ram" and value.isdigit():
+            return f"{value}GB RAM"
+        if spec == "screen" and re.fullmatch(r"1\d(?:\.\d)?", value):
+            return f'{value}"'
+        return value
+
+    cpu_family, cpu = _cpu(source("cpu"))
+    ram_gb = _ram(source("ram"))
+    storage_gb, storage_type = _storage(source("storage"))
+    gpu_class, gpu = _gpu(source("gpu"))
+    if not gpu_class and cpu_family.startswith("Apple"):
+        gpu_class, gpu = "Integrated", f"{cpu} GPU"
+    screen = _screen(source("screen"))
+
+    return {
+        "specs": {
+            "cpu": cpu,
+            "ram": f"{ram_gb}GB" if ram_gb else "",
+            "storage": _storage_label(storage_gb, storage_type),
+            "gpu": gpu,
+            "screen": f'{screen:g}"' if screen else "",
+        },
+        "cpuFamily": cpu_family,
+        "ramGB": ram_gb,
+        "storageGB": storage_gb,
+        "storageType": storage_type,
+        "gpuClass": gpu_class,
+        "screenInches": screen,
+    }
+
+
+TYPED_FIELDS = ("cpuFamily", "ramGB", "storageGB", "storageType", "gpuClass", "screenInches")
+
+
+def spec_fields(product: Dict[str, Any]) -> Dict[str, Any]:
+    """Typed spec fields of a mapped product.
+
+    Products mapped at sync time carry them already; others (static data,
+    catalogs cached before the fields existed) are parsed from their
+    ``specs`` display strings.
+    """
+    if "ramGB" in product:
+        return {k: product.get(k) for k in TYPED_FIELDS}
+    specs = product.get("specs") or {}
+    rows = [{"attribute": k, "attribute_value": v} for k, v in specs.items() if v and v != "—"]
+    parsed = extract_specs({"attributes": rows})
+    return {k: parsed[k] for k in TYPED_FIELDS}
+
+
+def storage_label(gb: Optional[int]) -> str:
+    """Capacity facet label: 512 → "512GB", 1024 → "1TB"."""
+    return _storage_label(gb, "")
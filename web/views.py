@@ -5,7 +5,6 @@ Checkout creates a real Sales Order in ERPNext + a local Order record.
 Payment: **Cash on Delivery only**.
 """
 
-import json
 import logging
 from urllib.parse import quote
 
@@ -33,12 +32,14 @@ from .erp_services import (
     WORKING_HOURS,
     create_local_order,
     create_sales_order,
+    faceted_search,
     filter_products,
     format_price,
-    get_all_products,
+    get_catalog_index,
     get_filter_options,
     get_product_by_slug,
     get_products_by_tag,
+    get_related_products,
     get_whatsapp_link,
 )
 from .forms import CheckoutForm
@@ -55,18 +56,6 @@ logger = logging.getLogger(__name__)
 def _base_context(request, lang):
     """Build context variables available on every page."""
     t = get_translations(lang)
-    all_products = get_all_products()
-
-    # Lightweight list for header search autosuggest
-    search_data = [
-        {
-            "name": p["name"][lang] if lang in p["name"] else p["name"]["en"],
-            "slug": p["slug"],
-            "brand": p["brand"],
-            "item_group": p.get("item_group", ""),
-        }
-        for p in all_products
-    ]
     return {
         "lang": lang,
         "is_rtl": lang == "ar",
@@ -76,7 +65,8 @@ def _base_context(request, lang):
         "other_lang": "ar" if lang == "en" else "en",
         "other_lang_label": "العربية" if lang == "en" else "English",
         "t": t,
-        "search_products_json": json.dumps(search_data, ensure_ascii=False),
+        # Lightweight list for header search autosuggest (built once per catalog version)
+        "search_products_json": get_catalog_index().suggestions_json(lang),
         "whatsapp_link": get_whatsapp_link(),
         "whatsapp_display": WHATSAPP_DISPLAY,
         "working_hours": WORKING_HOURS,
@@ -196,7 +186,7 @@ def home_view(request, lang="en"):
         {"icon": "banknote", "title": t.home.whyCod, "desc": t.home.whyCodDesc},
     ]
 
-    all_products = get_all_products()
+    all_products = get_catalog_index().products
     hot_deals = get_products_by_tag("Hot Deal")[:6]
     best_sellers = get_products_by_tag("Best Seller")[:6]
 
@@ -251,6 +241,7 @@ def products_view(request, lang="en"):
     active_brands = request.GET.getlist("brand")
     active_grades = request.GET.getlist("grade")
     active_rams = request.GET.getlist("ram")
+    active_storages = request.GET.getlist("storage")
     active_cpus = request.GET.getlist("cpu")
     active_screens = request.GET.getlist("screen")
     active_keyboards = request.GET.getlist("keyboard")
@@ -261,9 +252,13 @@ def products_view(request, lang="en"):
     search_q = request.GET.get("q", "").strip()
     page = int(request.GET.get("page", "1"))
 
-    all_filtered = filter_products(
+    # "Load more" pagination: only the first page * PER_PAGE results are built.
+    result = faceted_search(
+        counts=True,
+        limit=page * PER_PAGE,
         brand=active_brands or None,
         ram=active_rams or None,
+        storage=active_storages or None,
         cpu=active_cpus or None,
         screen=active_screens or None,
         grade=active_grades or None,
@@ -272,11 +267,11 @@ def products_view(request, lang="en"):
         charger=active_charger or None,
         gpu_type=active_gpu_type or None,
         q=search_q or None,
-        sort_by=active_sort,
+        sort_by=f"name_{lang}" if active_sort == "name" else active_sort,
     )
 
-    total_count = len(all_filtered)
-    products = all_filtered[: page * PER_PAGE]
+    total_count = result.total
+    products = result.products
     has_more = len(products) < total_count
 
     # Build next page params
@@ -285,7 +280,7 @@ def products_view(request, lang="en"):
     next_page_qs = next_page_params.urlencode()
 
     has_active_filters = bool(
-        active_brands or active_grades or active_rams or active_cpus
+        active_brands or active_grades or active_rams or active_storages or active_cpus
         or active_screens or active_keyboards or active_in_stock
         or active_charger or active_gpu_type or search_q
     )
@@ -303,13 +298,17 @@ def products_view(request, lang="en"):
         "filter_brands": filter_opts.get("brands", []),
         "filter_grades": filter_opts.get("grades", []),
         "filter_rams": filter_opts.get("rams", []),
+        "filter_storages": filter_opts.get("storages", []),
         "filter_cpus": filter_opts.get("cpus", []),
         "filter_screens": filter_opts.get("screens", []),
         "filter_keyboards": filter_opts.get("keyboards", []),
+        # Option → result count for the current selection
+        "facet_counts": result.facet_counts,
         # Active selections
         "active_brands": active_brands,
         "active_grades": active_grades,
         "active_rams": active_rams,
+        "active_storages": active_storages,
         "active_cpus": active_cpus,
         "active_screens": active_screens,
         "active_keyboards": active_keyboards,
@@ -352,11 +351,7 @@ def product_detail_view(request, lang="en", slug=""):
     }
 
     # Related products: same brand, exclude self, max 4
-    all_products = get_all_products()
-    related = [
-        p for p in all_products
-        if p["brand"] == product["brand"] and p["item_code"] != product["item_code"]
-    ][:4]
+    related = get_related_products(product, limit=4)
 
     ctx = _base_context(request, lang)
     ctx.update({
@@ -578,15 +573,12 @@ def search_view(request, lang="en"):
 
 def offers_view(request, lang="en"):
     _set_lang(request, lang)
-    all_products = get_all_products()
+    index = get_catalog_index()
     # Products that have old prices (on sale) or tagged Hot Deal
-    products = [
-        p for p in all_products
-        if p.get("oldPriceEGP") or "Hot Deal" in (p.get("tags") or [])
-    ]
+    products = index.offers()
     # If nothing qualifies, show all products
     if not products:
-        products = all_products
+        products = index.products
 
     ctx = _base_context(request, lang)
     ctx.update({
@@ -0,0 +1,99 @@
+"""
+Catalog warm-up for new processes.
+
+A freshly started worker has an empty per-process cache and no catalog
+index, so its first visitors pay for fetching the catalog, building the
+search / facet / sort indexes and loading the translation files.
+``warm()`` does all of that up front and times each stage.  It is run by
+``python manage.py warm_catalog`` and, with ``CATALOG_WARM_ON_BOOT=1``, by
+``config.wsgi`` when the application is loaded — once in the gunicorn
+master with ``--preload`` (workers fork with everything in memory),
+otherwise in every worker before it accepts requests.
+
+At boot ERPNext calls fail fast (one attempt, ``CATALOG_WARM_CONNECT_TIMEOUT_SECONDS``
+to connect): with ERPNext unreachable the worker starts from the last known
+good catalog in seconds instead of outliving gunicorn's ``--timeout``.
+"""
+
+import logging
+import time
+from typing import Callable, List, Tuple
+
+from django.conf import settings
+from django.db import connections
+
+from integration.erp_client import erp_fail_fast
+
+from . import erp_services, translations
+
+logger = logging.getLogger(__name__)
+
+BOOT_CONNECT_TIMEOUT = getattr(settings, "CATALOG_WARM_CONNECT_TIMEOUT_SECONDS", 3)
+
+LANGS = ("en", "ar")
+
+
+def _stages(force: bool) -> List[Tuple[str, Callable[[], str]]]:
+    def products():
+        count = len(erp_services.get_all_products(force_refresh=force))
+        return f"{count} products" + (" (degraded: last known good)" if erp_services.catalog_degraded() else "")
+
+    def index():
+        idx = erp_services.get_catalog_index()
+        for lang in LANGS:
+            idx.suggestions_json(lang)
+        return f"version {idx.version}"
+
+    def filter_options():
+        opts = erp_services.get_filter_options()
+        return f"{sum(len(v) for v in opts.values())} options"
+
+    def load_translations():
+        translations.reload_translations()
+        return ", ".join(LANGS)
+
+    return [
+        ("translations", load_translations),
+        ("products", products),
+        ("index", index),
+        ("search", lambda: f"{len(erp_services.get_catalog_index().search_index)} documents"),
+        ("facets", lambda: f"{sum(map(len, erp_services.get_catalog_index().facets.bitsets.values()))} values"),
+        ("sort orders", lambda: f"{len(erp_services.get_catalog_index().orders.perms)} orders"),
+        ("filter options", filter_options),
+    ]
+
+
+def warm(force: bool = False) -> List[Tuple[str, float, str]]:
+    """Load everything a first request needs; returns ``(stage, seconds, detail)``.
+
+    ``force`` refetches the catalog from ERPNext instead of using the cache.
+    """
+    timings = []
+    for stage, run in _stages(force):
+        started = time.perf_counter()
+        detail = run()
+        timings.append((stage, time.perf_counter() - started, detail))
+    return timings
+
+
+def warm_on_boot() -> None:
+    """``warm()`` for process start-up: logs the timings, never raises.
+
+    Database connections opened by the warm-up (mirror sources) are closed
+    afterwards, so workers forked from a ``--preload`` master do not share
+    the master's socket.
+    """
+    started = time.perf_counter()
+    try:
+        with erp_fail_fast(BOOT_CONNECT_TIMEOUT):
+            timings = warm()
+    except Exception:
+        logger.exception("Catalog warm-up failed; serving cold")
+        return
+    finally:
+        connections.close_all()
+    logger.info(
+        "Catalog warm-up in %.2fs: %s",
+        time.perf_counter() - started,
+        ", ".join(f"{stage} {seconds * 1000:.0f}ms" for stage, seconds, _ in timings),
+    )
@@ -168,11 +168,12 @@ def _send_document_wasender(phone: str, document_url: str, filename: str, captio
 
 def _send_sales_order_pdf_task(phone: str, so_name: str) -> None:
     """Background task: fetch PDF from ERPNext → upload to WasenderAPI → send."""
-    from integration.erp_client import get_erp_client, ERPNextError
+    from integration.erp_client import BACKGROUND, erp_priority, get_erp_client, ERPNextError
 
     try:
         client = get_erp_client()
-        pdf_bytes = client.download_pdf(doctype="Sales Order", name=so_name)
+        with erp_priority(BACKGROUND):
+            pdf_bytes = client.download_pdf(doctype="Sales Order", name=so_name)
     except ERPNextError as exc:
         logger.warning("Failed to download Sales Order PDF (%s): %s", so_name, exc)
         return
@@ -215,23 +216,24 @@ def send_sales_order_pdf(*, phone: str, so_name: str) -> None:
 
 def _send_sales_invoice_pdf_task(phone: str, invoice_name: str) -> None:
     """Background task: fetch Sales Invoice data → generate PDF locally → upload → send."""
-    from integration.erp_client import get_erp_client, ERPNextError
+    from integration.erp_client import BACKGROUND, erp_priority, get_erp_client, ERPNextError
     from integration.pdf_generator import generate_sales_invoice_pdf
 
     try:
         client = get_erp_client()
 
         # Try ERPNext native PDF first; fall back to local generation
-        try:
-            pdf_bytes = client.download_pdf(doctype="Sales Invoice", name=invoice_name)
-            logger.info("Downloaded Sales Invoice PDF from ERPNext (%s)", invoice_name)
-        except ERPNextError:
-            logger.info(
-                "ERPNext PDF download failed for %s, generating locally", invoice_name
-            )
-            inv_resp = client.request("GET", f"/api/resource/Sales Invoice/{invoice_name}")
-            inv_data = inv_resp.get("data") or inv_resp
-            pdf_bytes = generate_sales_invoice_pdf(inv_data)
+        with erp_priority(BACKGROUND):
+            try:
+                pdf_bytes = client.download_pdf(doctype="Sales Invoice", name=invoice_name)
+                logger.info("Downloaded Sales Invoice PDF from ERPNext (%s)", invoice_name)
+            except ERPNextError:
+                logger.info(
+                    "ERPNext PDF download failed for %s, generating locally", invoice_name
+                )
+                inv_resp = client.request("GET", f"/api/resource/Sales Invoice/{invoice_name}")
+                inv_data = inv_resp.get("data") or inv_resp
+                pdf_bytes = generate_sales_invoice_pdf(inv_data)
 
     except ERPNextError as exc:
         logger.warning("Failed to get Sales Invoice data (%s): %s", invoice_name, exc)